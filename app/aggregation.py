@@ -0,0 +1,66 @@
+from enum import Enum
+from typing import Iterable, List
+
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+
+class TimeBucket(str, Enum):
+    '''Интервал агрегации результатов торгов'''
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class GroupField(str, Enum):
+    '''Поле группировки агрегатов'''
+    OIL_ID = "oil_id"
+    DELIVERY_TYPE_ID = "delivery_type_id"
+    DELIVERY_BASIS_ID = "delivery_basis_id"
+
+
+def group_fields(fields: Iterable[GroupField]) -> List[GroupField]:
+    '''Поля группировки без повторов в каноническом порядке (как в GroupField)'''
+    fields = set(fields)
+    return [field for field in GroupField if field in fields]
+
+
+class date_bucket(FunctionElement):
+    '''
+    Начало интервала, в который попадает момент времени: date_trunc в PostgreSQL,
+    strftime в SQLite. Недели начинаются с понедельника (как у date_trunc).
+
+        date_bucket(TimeBucket.WEEK, SpimexTradingResult.trading_date)
+    '''
+    type = DateTime()
+    name = "date_bucket"
+    # Интервал входит в ключ кеша компиляции: запросы с разными интервалами дают разный SQL
+    _traverse_internals = FunctionElement._traverse_internals + [("bucket", InternalTraversal.dp_string)]
+    inherit_cache = True
+
+    def __init__(self, bucket: TimeBucket, column):
+        self.bucket = TimeBucket(bucket).value
+        super().__init__(column)
+
+
+@compiles(date_bucket)
+def _date_trunc(element: date_bucket, compiler, **kw) -> str:
+    return f"date_trunc('{element.bucket}', {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(date_bucket, "sqlite")
+def _sqlite_bucket(element: date_bucket, compiler, **kw) -> str:
+    # Формат хранения DateTime в SQLite (с микросекундами): начала интервалов
+    # сравниваются со значениями колонок и параметров как строки
+    column = compiler.process(element.clauses, **kw)
+    if element.bucket == TimeBucket.MONTH.value:
+        return f"strftime('%Y-%m-01 00:00:00.000000', {column})"
+    if element.bucket == TimeBucket.WEEK.value:
+        # %w - день недели с воскресенья (0): сдвиг назад до понедельника
+        return (
+            f"strftime('%Y-%m-%d 00:00:00.000000', {column}, "
+            f"'-' || ((CAST(strftime('%w', {column}) AS INTEGER) + 6) % 7) || ' days')"
+        )
+    return f"strftime('%Y-%m-%d 00:00:00.000000', {column})"
@@ -1,11 +1,175 @@
-import json
-from datetime import datetime, time
-from typing import Any, Optional
+import asyncio
+import hashlib
+import logging
+from collections import Counter, OrderedDict, defaultdict
+from datetime import date, datetime, time, timedelta
+from time import monotonic, time as wall_time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+from uuid import uuid4
 import redis
-from fastapi import Depends
+import redis.asyncio as aioredis
+from fastapi import Depends, Request
 
+from app import encoders
+from app.cache_keys import trading_day
+from app.compression import compress, decompress, default_codec
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+# Снимает блокировку, только если она все еще принадлежит владельцу токена
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+# Отсортированное множество с популярностью запросов для прогрева кеша
+POPULARITY_KEY = "warmup:popularity"
+
+# Канал, через который воркеры узнают об удаленных ключах и чистят свой L1
+INVALIDATION_CHANNEL = "cache:invalidations"
+# Сообщение в канале, означающее полную очистку
+INVALIDATE_ALL_MESSAGE = "*"
+# Сколько ждать сообщения об инвалидации за одно чтение подписки (секунды)
+INVALIDATION_POLL_SECONDS = 1.0
+
+
+# Номер поколения ключей ответов API; его увеличение разом делает недоступными все старые ключи
+GENERATION_KEY = "cache:generation"
+# Поколение неизменяемых фрагментов закрытых торговых дней: увеличивается только
+# при полном сбросе, поэтому такие фрагменты переживают сброс после каждой загрузки
+HISTORY_GENERATION_KEY = "cache:history_generation"
+
+
+def generation_namespace(generation: int, historical: bool = False) -> str:
+    '''Пространство имен поколения: v<поколение> (h<поколение> - для закрытых дней)'''
+    return f"{'h' if historical else 'v'}{generation}"
+
+
+def namespace_key(generation: int, key: str, historical: bool = False) -> str:
+    '''Ключ в пространстве имен поколения: v<поколение>:<ключ> (h<поколение>:<ключ> - для закрытых дней)'''
+    return f"{generation_namespace(generation, historical)}:{key}"
+
+
+def key_namespace(key: str) -> str:
+    '''Пространство имен поколения ключа ("" - для ключей вне поколений)'''
+    head, sep, _ = key.partition(":")
+    if sep and head[:1] in ("v", "h") and head[1:].isdigit():
+        return head
+    return ""
+
+
+def key_prefix(key: str) -> str:
+    '''Префикс ключа (trading_dates, dynamics, ...) без номера поколения'''
+    namespace = key_namespace(key)
+    if namespace:
+        key = key[len(namespace) + 1:]
+    return key.partition(":")[0]
+
+
+def tag_key(tag: str, namespace: str = "") -> str:
+    '''
+    Ключ множества Redis с ключами кеша, помеченными тегом.
+    
+    Множество лежит в пространстве имен помеченных ключей: после увеличения
+    поколения оно больше не пополняется и не читается и удаляется Redis по TTL.
+    '''
+    return f"{namespace}:tag:{tag}" if namespace else f"tag:{tag}"
+
+
+def to_bytes(data: Union[str, bytes]) -> bytes:
+    '''Приводит сериализованное значение к bytes'''
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+def pack_entry(data: bytes, soft_expires_at: float) -> bytes:
+    '''Добавляет к сериализованному значению момент мягкого истечения (unix time)'''
+    return f"{soft_expires_at:.3f}|".encode("ascii") + data
+
+
+def unpack_entry(raw: Union[str, bytes]) -> Tuple[bytes, Optional[float]]:
+    '''
+    Разделяет запись из Redis на данные и момент мягкого истечения.
+    
+    Записи без заголовка (старый формат) возвращаются без мягкого срока и считаются свежими.
+    '''
+    raw = to_bytes(raw)
+    head, sep, data = raw.partition(b"|")
+    if sep:
+        try:
+            return data, float(head)
+        except ValueError:
+            pass
+    return raw, None
+
+
+def body_etag(data: Union[str, bytes]) -> str:
+    '''Строгий ETag сериализованного значения - хеш его содержимого'''
+    return f'"{hashlib.blake2b(to_bytes(data), digest_size=16).hexdigest()}"'
+
+
+class CachedBody(NamedTuple):
+    '''Отдаваемое значение из кеша: данные, их ETag и признак устаревания'''
+    data: bytes
+    etag: str
+    stale: bool
+
+
+def is_stale(soft_expires_at: Optional[float]) -> bool:
+    '''Прошел ли момент мягкого истечения записи'''
+    return soft_expires_at is not None and soft_expires_at <= wall_time()
+
+
+def get_reset_ttl() -> int:
+    '''Вычисляет время до заданного часа:минуты следующего дня'''
+    now = datetime.now()
+    target_time = time(settings.CACHE_RESET_HOUR, settings.CACHE_RESET_MINUTE)
+
+    if now.time() >= target_time:
+        # Если текущее время больше или равно целевому времени, устанавливаем TTL до завтра
+        tomorrow = now.replace(
+            hour=settings.CACHE_RESET_HOUR,
+            minute=settings.CACHE_RESET_MINUTE,
+            second=0,
+            microsecond=0
+        )
+        tomorrow = tomorrow + timedelta(days=1)
+        ttl = int((tomorrow - now).total_seconds())
+    else:
+        # Если текущее время меньше целевого времени, устанавливаем TTL до сегодняшнего целевого времени
+        target = now.replace(
+            hour=settings.CACHE_RESET_HOUR,
+            minute=settings.CACHE_RESET_MINUTE,
+            second=0,
+            microsecond=0
+        )
+        ttl = int((target - now).total_seconds())
+    
+    return ttl
+
+
+def get_period_ttl(
+        end_date: Union[date, datetime],
+        latest_trading_date: Optional[Union[date, datetime]]
+) -> Optional[int]:
+    '''
+    Выбирает TTL для данных за период, заканчивающийся end_date
+    
+    Закрытые торговые дни (раньше последней загруженной даты) больше не меняются,
+    поэтому хранятся CACHE_HISTORICAL_TTL_SECONDS. Данные, затрагивающие последний
+    загруженный день или будущие дни, сбрасываются ежедневно.
+    
+    Returns:
+        Optional[int]: TTL в секундах или None - до ежедневного сброса
+    '''
+    if latest_trading_date is None or trading_day(end_date) >= trading_day(latest_trading_date):
+        return None
+    return settings.CACHE_HISTORICAL_TTL_SECONDS
+
 
 class RedisCache:
     def __init__(self):
@@ -19,36 +183,13 @@ class RedisCache:
     
     def _get_ttl(self) -> int:
         '''Вычисляет время до заданного часа:минуты следующего дня'''
-        now = datetime.now()
-        target_time = time(settings.CACHE_RESET_HOUR, settings.CACHE_RESET_MINUTE)
-
-        if now.time() >= target_time:
-            # Если текущее время больше или равно целевому времени, устанавливаем TTL до завтра
-            tomorrow = now.replace(
-                hour=settings.CACHE_RESET_HOUR,
-                minute=settings.CACHE_RESET_MINUTE,
-                second=0,
-                microsecond=0
-            )
-            tomorrow = tomorrow.replace(day=tomorrow.day + 1)
-            ttl = int((tomorrow - now).total_seconds())
-        else:
-            # Если текущее время меньше целевого времени, устанавливаем TTL до сегодняшнего целевого времени
-            target = now.replace(
-                hour=settings.CACHE_RESET_HOUR,
-                minute=settings.CACHE_RESET_MINUTE,
-                second=0,
-                microsecond=0
-            )
-            ttl = int((target - now).total_seconds())
-        
-        return ttl
+        return get_reset_ttl()
     
     def get(self, key: str) -> Optional[Any]:
         '''Получаем данные из кэша'''
         data = self.redis_client.get(key)
         if data:
-            return json.loads(data)
+            return encoders.loads(data)
         return None
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
@@ -66,18 +207,831 @@ class RedisCache:
         self.redis_client.setex(
             key,
             ttl,
-            json.dumps(value, default=str)
+            encoders.dumps(value)
         )
     
-    def invalidate_all(self) -> None:
-        '''Очищает весь кэш'''
-        self.redis_client.flushdb()
-    
     def invalidate_key(self, key: str) -> None:
         '''Удаляет конкретный ключ из кэша'''
         self.redis_client.delete(key)
 
 
+def create_redis_pool() -> aioredis.BlockingConnectionPool:
+    '''
+    Создает ограниченный пул соединений Redis, общий для всего процесса.
+    
+    При исчерпании пула запрос ждет свободное соединение не дольше REDIS_POOL_TIMEOUT,
+    вместо того чтобы открывать новые TCP-соединения.
+    '''
+    return aioredis.BlockingConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD,
+        # Значения хранятся в бинарном виде (сжатие), декодирование делает кеш
+        decode_responses=False,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL
+    )
+
+
+class AsyncRedisCache:
+    '''
+    Неблокирующий кеш поверх redis.asyncio, создается один раз на процесс.
+    
+    Значения больше CACHE_COMPRESSION_MIN_BYTES сжимаются кодеком CACHE_COMPRESSION_CODEC;
+    байт-заголовок кодека хранится вместе с данными, поэтому смена кодека не ломает
+    уже записанные значения.
+    '''
+
+    def __init__(self, redis_client: Optional[aioredis.Redis] = None, codec: Optional[bytes] = None):
+        if redis_client is None:
+            redis_client = aioredis.Redis(connection_pool=create_redis_pool())
+        self.redis_client = redis_client
+        self.codec = codec if codec is not None else default_codec()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        # Префикс ключа -> количество записей, исходный и сохраненный размер в байтах
+        self.size_stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"writes": 0, "raw_bytes": 0, "stored_bytes": 0}
+        )
+
+    def _get_ttl(self) -> int:
+        '''Вычисляет время до заданного часа:минуты следующего дня'''
+        return get_reset_ttl()
+
+    def _count(self, entry: Optional[Tuple[bytes, Optional[float]]]) -> None:
+        if entry is None:
+            self.misses += 1
+        elif is_stale(entry[1]):
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+
+    def _unpack(self, raw: Optional[Union[str, bytes]]) -> Optional[Tuple[bytes, Optional[float]]]:
+        if not raw:
+            return None
+        blob, soft_expires_at = unpack_entry(raw)
+        return decompress(blob), soft_expires_at
+
+    async def get_entry(self, key: str) -> Optional[Tuple[bytes, Optional[float]]]:
+        '''
+        Получаем сериализованные (распакованные) данные вместе с моментом мягкого истечения
+        
+        Returns:
+            Optional[Tuple[bytes, Optional[float]]]: Данные и unix time мягкого истечения
+            (запись может быть устаревшей, но еще не удаленной) или None
+        '''
+        entry = self._unpack(await self.redis_client.get(key))
+        self._count(entry)
+        return entry
+
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        '''Получаем свежие сериализованные данные из кэша без декодирования'''
+        entry = await self.get_entry(key)
+        if entry is None or is_stale(entry[1]):
+            return None
+        return entry[0]
+
+    async def get(self, key: str) -> Optional[Any]:
+        '''Получаем данные из кэша'''
+        data = await self.get_raw(key)
+        if data:
+            return encoders.loads(data)
+        return None
+
+    async def set_raw(
+            self,
+            key: str,
+            data: Union[str, bytes],
+            ttl: Optional[int] = None,
+            tags: Sequence[str] = ()
+    ) -> None:
+        '''
+        Сохраняет уже сериализованные данные в кэш до заданного часа:минуты
+        
+        Запись становится устаревшей через ttl секунд (мягкое истечение), но удаляется
+        из Redis только через ttl + CACHE_STALE_GRACE_SECONDS: в этом промежутке
+        ее можно отдавать, пока значение обновляется в фоне.
+        
+        Ключ регистрируется в множествах тегов своего пространства имен (см. invalidate_tags).
+        '''
+        if ttl is None:
+            ttl = self._get_ttl()
+
+        expire, entry = self._pack(key, to_bytes(data), ttl)
+        if not tags:
+            await self.redis_client.setex(key, expire, entry)
+            return
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.setex(key, expire, entry)
+            self._queue_tags(pipe, {key: tags}, expire)
+            await pipe.execute()
+
+    async def set_many_raw(
+            self,
+            entries: Dict[str, Union[str, bytes]],
+            ttl: Optional[int] = None,
+            tags: Optional[Dict[str, Sequence[str]]] = None
+    ) -> None:
+        '''
+        Сохраняет несколько сериализованных значений за один round-trip (pipeline)
+        
+        Args:
+            entries: Ключи и данные
+            ttl: Время жизни (по умолчанию - до сброса)
+            tags: Теги для каждого ключа
+        '''
+        if not entries:
+            return
+        if ttl is None:
+            ttl = self._get_ttl()
+        tags = tags or {}
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key, data in entries.items():
+                expire, entry = self._pack(key, to_bytes(data), ttl)
+                pipe.setex(key, expire, entry)
+            # Срок хранения зависит только от ttl и одинаков для всех записей вызова
+            self._queue_tags(pipe, {key: tags.get(key, ()) for key in entries}, expire)
+            await pipe.execute()
+
+    def _pack(self, key: str, data: bytes, ttl: int) -> Tuple[int, bytes]:
+        '''Сжимает данные, учитывает их объем и возвращает срок хранения в Redis и запись'''
+        blob = compress(data, self.codec, settings.CACHE_COMPRESSION_MIN_BYTES)
+        sizes = self.size_stats[key_prefix(key)]
+        sizes["writes"] += 1
+        sizes["raw_bytes"] += len(data)
+        sizes["stored_bytes"] += len(blob)
+        return ttl + settings.CACHE_STALE_GRACE_SECONDS, pack_entry(blob, wall_time() + ttl)
+
+    @staticmethod
+    def _queue_tags(pipe: Any, tags: Dict[str, Sequence[str]], expire: int) -> None:
+        '''Добавляет ключи в множества тегов их пространств имен: один SADD и один EXPIRE на множество'''
+        members: Dict[str, List[str]] = defaultdict(list)
+        for key, key_tags in tags.items():
+            for tag in key_tags:
+                members[tag_key(tag, key_namespace(key))].append(key)
+        for tag, keys in members.items():
+            pipe.sadd(tag, *keys)
+            # Записи одного пространства имен живут одинаково (до сброса или
+            # CACHE_HISTORICAL_TTL_SECONDS), поэтому новый срок не короче сроков
+            # уже помеченных записей
+            pipe.expire(tag, expire)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        '''
+        Сохраняет данные в кэш до заданного часа:минуты
+        
+        Args:
+            key: Ключ для сохранения
+            value: Значение для сохранения
+            ttl: Необязательное время жизни в секундах (если не указано, используется время до сброса кеша)
+        '''
+        await self.set_raw(key, encoders.dumps(value), ttl)
+
+    async def delete(self, *keys: str) -> int:
+        '''Удаляет ключи из кэша и возвращает количество удаленных'''
+        if not keys:
+            return 0
+        return await self.redis_client.delete(*keys)
+
+    async def mget_raw(self, keys: List[str]) -> List[Optional[bytes]]:
+        '''Получает несколько свежих сериализованных значений за один запрос к Redis'''
+        if not keys:
+            return []
+        values = []
+        for raw in await self.redis_client.mget(keys):
+            entry = self._unpack(raw)
+            self._count(entry)
+            values.append(entry[0] if entry is not None and not is_stale(entry[1]) else None)
+        return values
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        '''
+        Получает несколько значений за один запрос к Redis
+        
+        Args:
+            keys: Список ключей
+            
+        Returns:
+            List[Optional[Any]]: Значения в порядке ключей (None для отсутствующих)
+        '''
+        values = await self.mget_raw(keys)
+        return [encoders.loads(data) if data else None for data in values]
+
+    async def acquire_lock(self, key: str, token: str, ttl_ms: int) -> bool:
+        '''Пытается взять короткую блокировку на вычисление ключа (SET NX PX)'''
+        return bool(await self.redis_client.set(f"lock:{key}", token, nx=True, px=ttl_ms))
+
+    async def release_lock(self, key: str, token: str) -> None:
+        '''Снимает блокировку, если она не перехвачена другим воркером после истечения'''
+        await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+
+    async def increment_scores(self, key: str, counts: Dict[str, int]) -> None:
+        '''Увеличивает счетчики элементов отсортированного множества одним pipeline'''
+        if not counts:
+            return
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for member, amount in counts.items():
+                pipe.zincrby(key, amount, member)
+            await pipe.execute()
+
+    async def top_scored(self, key: str, limit: int) -> List[str]:
+        '''Возвращает элементы отсортированного множества с наибольшими счетчиками'''
+        if limit <= 0:
+            return []
+        members = await self.redis_client.zrevrange(key, 0, limit - 1)
+        return [member.decode("utf-8") if isinstance(member, bytes) else member for member in members]
+
+    async def trim_scored(self, key: str, keep: int) -> None:
+        '''Оставляет в отсортированном множестве только keep элементов с наибольшими счетчиками'''
+        await self.redis_client.zremrangebyrank(key, 0, -keep - 1)
+
+    async def invalidate_tags(self, tags: Sequence[str], namespaces: Sequence[str] = ("",)) -> List[str]:
+        '''
+        Удаляет все записи, помеченные любым из тегов, вместе с множествами тегов.
+        
+        Работает за O(затронутых ключей): ключи берутся из множеств тегов, без SCAN.
+        Множества читаются только в переданных пространствах имен (обычно - текущих
+        поколений), поэтому стоимость не растет с историей кеша.
+        
+        Returns:
+            List[str]: Ключи, зарегистрированные под тегами (часть могла уже истечь)
+        '''
+        tag_keys = [tag_key(tag, namespace) for namespace in namespaces for tag in tags]
+        if not tag_keys:
+            return []
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key in tag_keys:
+                pipe.smembers(key)
+            members = await pipe.execute()
+
+        keys = sorted({
+            key.decode("utf-8") if isinstance(key, bytes) else key
+            for tag_members in members
+            for key in tag_members
+        })
+        await self.redis_client.delete(*keys, *tag_keys)
+        return keys
+
+    async def get_generation(self, key: str = GENERATION_KEY) -> int:
+        '''Текущее поколение ключей (0, если его еще не увеличивали)'''
+        raw = await self.redis_client.get(key)
+        return int(raw) if raw is not None else 0
+
+    async def incr_generation(self, key: str = GENERATION_KEY) -> int:
+        '''Атомарно увеличивает поколение ключей и возвращает новое значение'''
+        return await self.redis_client.incr(key)
+
+    async def publish_invalidation(self, keys: Union[Sequence[str], str]) -> None:
+        '''Сообщает всем воркерам об удаленных ключах (INVALIDATE_ALL_MESSAGE - обо всех)'''
+        if keys != INVALIDATE_ALL_MESSAGE:
+            keys = list(keys)
+        await self.redis_client.publish(INVALIDATION_CHANNEL, encoders.dumps(keys))
+
+    async def invalidate_key(self, key: str) -> None:
+        '''Удаляет конкретный ключ из кэша'''
+        await self.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        '''Счетчики попаданий и промахов, исходный и сохраненный объем по префиксам ключей'''
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "bytes_by_prefix": {prefix: dict(sizes) for prefix, sizes in self.size_stats.items()}
+        }
+
+    async def close(self) -> None:
+        '''Закрывает клиент и отключает все соединения пула'''
+        await self.redis_client.aclose()
+        await self.redis_client.connection_pool.disconnect()
+
+
+class LocalCache:
+    '''
+    Локальный (в памяти процесса) LRU-кеш готовых ответов.
+    
+    Ограничен количеством записей и суммарным размером сериализованных данных.
+    Записи устаревают в тот же момент сброса, что и ключи в Redis, и удаляются
+    после льготного периода CACHE_STALE_GRACE_SECONDS.
+    '''
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        # key -> (мягкий срок, жесткий срок по time.monotonic, значение, размер в байтах, ETag)
+        self._entries: "OrderedDict[str, Tuple[float, float, Any, int, Optional[str]]]" = OrderedDict()
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, bool]]:
+        '''
+        Возвращает значение и признак устаревания, помечает запись как недавно использованную
+        
+        Returns:
+            Optional[Tuple[Any, bool]]: Значение и True, если мягкий срок уже прошел
+        '''
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        soft_deadline, hard_deadline, value, _, _ = entry
+        now = monotonic()
+        if hard_deadline <= now:
+            self.delete(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if soft_deadline <= now:
+            self.stale_hits += 1
+            return value, True
+        self.hits += 1
+        return value, False
+
+    def get(self, key: str) -> Optional[Any]:
+        '''Возвращает свежее значение'''
+        entry = self.get_entry(key)
+        if entry is None or entry[1]:
+            return None
+        return entry[0]
+
+    def set(
+            self,
+            key: str,
+            value: Any,
+            size: int,
+            ttl: Optional[float] = None,
+            grace: Optional[float] = None
+    ) -> None:
+        '''
+        Сохраняет значение, вытесняя самые старые записи при превышении лимитов
+        
+        Args:
+            key: Ключ для сохранения
+            value: Значение (обычно сериализованное тело ответа)
+            size: Размер сериализованного значения в байтах
+            ttl: Время до устаревания в секундах (по умолчанию до сброса кеша)
+            grace: Сколько хранить запись после устаревания (по умолчанию CACHE_STALE_GRACE_SECONDS)
+        '''
+        if ttl is None:
+            ttl = get_reset_ttl()
+        if grace is None:
+            grace = settings.CACHE_STALE_GRACE_SECONDS
+        if size > self.max_bytes or self.max_entries <= 0 or ttl + grace <= 0:
+            return
+
+        self.delete(key)
+        soft_deadline = monotonic() + ttl
+        self._entries[key] = (soft_deadline, soft_deadline + grace, value, size, None)
+        self.size_bytes += size
+
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            _, (_, _, _, evicted_size, _) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+
+    def etag(self, key: str, value: Any) -> str:
+        '''
+        ETag значения; для значения, лежащего в L1 под этим ключом, хеш считается
+        один раз и хранится вместе с записью
+        '''
+        entry = self._entries.get(key)
+        if entry is None or entry[2] is not value:
+            return body_etag(value)
+        if entry[4] is None:
+            entry = entry[:4] + (body_etag(value),)
+            self._entries[key] = entry
+        return entry[4]
+
+    def delete(self, key: str) -> None:
+        '''Удаляет запись, если она есть'''
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[3]
+
+    def clear(self) -> None:
+        '''Очищает локальный кеш'''
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        '''Счетчики попаданий/промахов и текущая заполненность'''
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.size_bytes
+        }
+
+
+class TieredCache:
+    '''
+    Двухуровневый кеш: локальный LRU процесса (L1) перед Redis (L2).
+    
+    Оба уровня хранят сериализованные значения (для эндпоинтов - готовое тело ответа),
+    поэтому попадание можно отдать клиенту без декодирования. Промах в L1
+    проверяется в Redis, найденное значение кладется в L1.
+    '''
+
+    def __init__(self, redis_cache: AsyncRedisCache, local_cache: Optional[LocalCache] = None):
+        self.redis_cache = redis_cache
+        if local_cache is None:
+            local_cache = LocalCache(settings.L1_CACHE_MAX_ENTRIES, settings.L1_CACHE_MAX_BYTES)
+        self.local_cache = local_cache
+        # Вычисления, выполняющиеся сейчас в этом процессе: key -> future с результатом
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Ключи, обновляемые в фоне после устаревания, и ссылки на их задачи
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self.coalesced = 0
+        self.stale_served = 0
+        # Число обращений к запросам (спецификациям прогрева) с момента последней выгрузки
+        self.popularity: Counter = Counter()
+        # Поколения ключей (GENERATION_KEY, HISTORY_GENERATION_KEY), прочитанные
+        # из Redis, и моменты чтения (monotonic)
+        self._generations: Dict[str, Tuple[int, float]] = {}
+
+    async def generation(self, historical: bool = False) -> int:
+        '''
+        Текущее поколение ключей (historical - поколение фрагментов закрытых дней).
+        
+        Читается из Redis не чаще раза в CACHE_GENERATION_CHECK_SECONDS; об увеличении
+        поколения другим воркером процесс узнает сразу через канал инвалидации.
+        '''
+        key = HISTORY_GENERATION_KEY if historical else GENERATION_KEY
+        now = monotonic()
+        cached = self._generations.get(key)
+        if cached is None or now - cached[1] >= settings.CACHE_GENERATION_CHECK_SECONDS:
+            cached = (await self.redis_cache.get_generation(key), now)
+            self._generations[key] = cached
+        return cached[0]
+
+    async def namespaced(self, key: str, historical: bool = False) -> str:
+        '''Ключ в пространстве имен текущего поколения'''
+        return namespace_key(await self.generation(historical), key, historical)
+
+    async def bump_generation(self, historical: bool = False) -> int:
+        '''
+        Сбрасывает все ответы API за O(1): увеличивает поколение ключей атомарным INCR.
+        
+        Старые ключи больше не читаются и удаляются Redis по TTL. Безопасно вызывать
+        из задач загрузки данных после каждой загрузки: неизменяемые фрагменты
+        закрытых дней (пространство h<поколение>) сбрасываются, только если передан
+        historical (полный сброс).
+        
+        Returns:
+            int: Новое поколение
+        '''
+        now = monotonic()
+        if historical:
+            self._generations[HISTORY_GENERATION_KEY] = (
+                await self.redis_cache.incr_generation(HISTORY_GENERATION_KEY), now
+            )
+        generation = await self.redis_cache.incr_generation()
+        self._generations[GENERATION_KEY] = (generation, now)
+        self.local_cache.clear()
+        await self.redis_cache.publish_invalidation(INVALIDATE_ALL_MESSAGE)
+        return generation
+
+    async def get_entry_raw(self, key: str) -> Optional[Tuple[bytes, bool]]:
+        '''
+        Получаем сериализованное значение из L1, затем из Redis, вместе с признаком устаревания
+        
+        Returns:
+            Optional[Tuple[bytes, bool]]: Данные и True, если они устарели и ждут обновления
+        '''
+        local_entry = self.local_cache.get_entry(key)
+        if local_entry is not None and not local_entry[1]:
+            return local_entry
+
+        entry = await self.redis_cache.get_entry(key)
+        if entry is None:
+            return local_entry
+        data, soft_expires_at = entry
+        ttl = soft_expires_at - wall_time() if soft_expires_at is not None else None
+        self.local_cache.set(key, data, len(data), ttl)
+        return data, is_stale(soft_expires_at)
+
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        '''Получаем свежие сериализованные данные из L1, затем из Redis'''
+        entry = await self.get_entry_raw(key)
+        if entry is None or entry[1]:
+            return None
+        return entry[0]
+
+    async def get(self, key: str) -> Optional[Any]:
+        '''Получаем свежие данные из L1, затем из Redis'''
+        data = await self.get_raw(key)
+        if data:
+            return encoders.loads(data)
+        return None
+
+    async def set_raw(
+            self,
+            key: str,
+            data: Union[str, bytes],
+            ttl: Optional[int] = None,
+            tags: Sequence[str] = ()
+    ) -> None:
+        '''Сохраняет сериализованные данные в Redis (сжатыми) и в L1 (без сжатия)'''
+        data = to_bytes(data)
+        await self.redis_cache.set_raw(key, data, ttl, tags)
+        self.local_cache.set(key, data, len(data), ttl)
+
+    async def set_many_raw(
+            self,
+            entries: Dict[str, Union[str, bytes]],
+            ttl: Optional[int] = None,
+            tags: Optional[Dict[str, Sequence[str]]] = None
+    ) -> None:
+        '''Сохраняет несколько сериализованных значений в Redis одним pipeline и в L1'''
+        entries = {key: to_bytes(data) for key, data in entries.items()}
+        await self.redis_cache.set_many_raw(entries, ttl, tags)
+        for key, data in entries.items():
+            self.local_cache.set(key, data, len(data), ttl)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        '''Сохраняет данные в Redis и в L1'''
+        await self.set_raw(key, encoders.dumps(value), ttl)
+
+    async def get_or_compute(
+            self,
+            key: str,
+            compute: Callable[[], Awaitable[str]],
+            ttl: Optional[int] = None,
+            spec: Optional[str] = None,
+            refresh: Optional[Callable[[], Awaitable[str]]] = None,
+            tags: Sequence[str] = ()
+    ) -> bytes:
+        '''Как get_or_compute_entry, но возвращает только данные'''
+        entry = await self.get_or_compute_entry(key, compute, ttl, spec, refresh, tags)
+        return entry.data
+
+    async def get_or_compute_entry(
+            self,
+            key: str,
+            compute: Callable[[], Awaitable[str]],
+            ttl: Optional[int] = None,
+            spec: Optional[str] = None,
+            refresh: Optional[Callable[[], Awaitable[str]]] = None,
+            tags: Sequence[str] = ()
+    ) -> CachedBody:
+        '''
+        Возвращает сериализованное значение из кеша или вычисляет его ровно один раз.
+        
+        Одновременные промахи по одному ключу внутри процесса ждут общий future;
+        если запрос-лидер отменен, вычисление повторяет один из ожидающих.
+        Между воркерами вычисление защищено короткой блокировкой в Redis: воркер,
+        не получивший блокировку, ждет появления значения в кеше.
+        
+        Если значение устарело (после сброса, но в пределах CACHE_STALE_GRACE_SECONDS)
+        и передан refresh, устаревшее значение отдается сразу, а refresh один раз
+        запускается в фоне.
+        
+        Args:
+            key: Ключ кеша
+            compute: Корутина-функция, вычисляющая сериализованное значение (например, запрос в БД)
+            ttl: Необязательное время жизни в секундах
+            spec: Описание запроса для учета популярности при прогреве (см. app.warmup)
+            refresh: Корутина-функция для фонового обновления; в отличие от compute
+                не должна зависеть от ресурсов запроса (сессии БД и т.п.)
+            tags: Теги записи для точечной инвалидации (см. invalidate_tags)
+            
+        Returns:
+            CachedBody: Значение из кеша или результат compute, его ETag (хеш
+            отдаваемых данных) и признак того, что отдано устаревшее значение
+        '''
+        if spec is not None:
+            self.popularity[spec] += 1
+
+        entry = await self.get_entry_raw(key)
+        if entry is not None:
+            value, stale = entry
+            if not stale:
+                return CachedBody(value, self.local_cache.etag(key, value), False)
+            if refresh is not None:
+                self.stale_served += 1
+                self._refresh_in_background(key, refresh, ttl, tags)
+                return CachedBody(value, self.local_cache.etag(key, value), True)
+
+        future = self._inflight.get(key)
+        while future is not None:
+            self.coalesced += 1
+            value = await asyncio.shield(future)
+            if value is not None:
+                return CachedBody(value, self.local_cache.etag(key, value), False)
+            # Лидер отменен до результата - первый из ожидающих становится новым лидером
+            future = self._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._compute_once(key, compute, ttl, tags)
+        except asyncio.CancelledError:
+            # Отмена касается только запроса лидера: ожидающие повторяют вычисление сами
+            future.set_result(None)
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Исключение получит лидер, ожидающих может и не быть
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return CachedBody(value, self.local_cache.etag(key, value), False)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _refresh_in_background(
+            self,
+            key: str,
+            refresh: Callable[[], Awaitable[str]],
+            ttl: Optional[int],
+            tags: Sequence[str]
+    ) -> None:
+        '''Запускает одно фоновое обновление ключа на процесс'''
+        if key in self._refreshing or key in self._inflight:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, refresh, ttl, tags))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(
+            self,
+            key: str,
+            refresh: Callable[[], Awaitable[str]],
+            ttl: Optional[int],
+            tags: Sequence[str]
+    ) -> None:
+        '''Обновляет устаревший ключ; если блокировка у другого воркера - обновляет он'''
+        token = uuid4().hex
+        try:
+            if not await self.redis_cache.acquire_lock(key, token, settings.CACHE_LOCK_TIMEOUT_MS):
+                return
+            try:
+                await self.set_raw(key, await refresh(), ttl, tags)
+            finally:
+                await self.redis_cache.release_lock(key, token)
+        except Exception:
+            logger.exception("Не удалось обновить устаревший ключ %s", key)
+        finally:
+            self._refreshing.discard(key)
+
+    async def _compute_once(
+            self,
+            key: str,
+            compute: Callable[[], Awaitable[str]],
+            ttl: Optional[int],
+            tags: Sequence[str]
+    ) -> bytes:
+        '''Вычисляет значение под блокировкой Redis или дожидается результата другого воркера'''
+        token = uuid4().hex
+        if await self.redis_cache.acquire_lock(key, token, settings.CACHE_LOCK_TIMEOUT_MS):
+            try:
+                value = to_bytes(await compute())
+                await self.set_raw(key, value, ttl, tags)
+                return value
+            finally:
+                await self.redis_cache.release_lock(key, token)
+
+        # Значение вычисляет другой воркер - ждем его в кеше
+        deadline = monotonic() + settings.CACHE_LOCK_WAIT_MS / 1000
+        while monotonic() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_MS / 1000)
+            value = await self.get_raw(key)
+            if value is not None:
+                return value
+
+        # Не дождались (воркер-владелец упал или запрос слишком долгий) - считаем сами
+        value = to_bytes(await compute())
+        await self.set_raw(key, value, ttl, tags)
+        return value
+
+    async def flush_popularity(self) -> None:
+        '''Выгружает накопленные счетчики популярности запросов в Redis'''
+        counts, self.popularity = self.popularity, Counter()
+        try:
+            await self.redis_cache.increment_scores(POPULARITY_KEY, counts)
+        except Exception:
+            # Не теряем счетчики, если Redis временно недоступен
+            self.popularity.update(counts)
+            raise
+
+    async def delete(self, *keys: str) -> int:
+        '''Удаляет ключи из обоих уровней (в L1 - во всех воркерах)'''
+        for key in keys:
+            self.local_cache.delete(key)
+        deleted = await self.redis_cache.delete(*keys)
+        if keys:
+            await self.redis_cache.publish_invalidation(keys)
+        return deleted
+
+    async def invalidate_tags(self, tags: Sequence[str]) -> List[str]:
+        '''
+        Удаляет записи, помеченные любым из тегов, из Redis и из L1 всех воркеров
+        
+        Множества тегов читаются в пространствах имен текущих поколений и вне поколений.
+        
+        Returns:
+            List[str]: Удаленные ключи
+        '''
+        namespaces = [""] + [
+            generation_namespace(await self.generation(historical), historical) for historical in (False, True)
+        ]
+        keys = await self.redis_cache.invalidate_tags(tags, namespaces)
+        for key in keys:
+            self.local_cache.delete(key)
+        if keys:
+            await self.redis_cache.publish_invalidation(keys)
+        return keys
+
+    def apply_invalidation(self, message: Union[str, bytes]) -> None:
+        '''Применяет к L1 сообщение об инвалидации от другого воркера'''
+        keys = encoders.loads(message)
+        if keys == INVALIDATE_ALL_MESSAGE:
+            self.local_cache.clear()
+            # Поколения могли измениться - перечитываем их при следующем запросе
+            self._generations.clear()
+            return
+        for key in keys:
+            self.local_cache.delete(key)
+
+    async def listen_invalidations(self) -> None:
+        '''
+        Фоновый цикл: подписка на сообщения об инвалидации, чтобы L1 этого воркера
+        не отдавал ключи, удаленные другими воркерами. При обрыве соединения переподключается.
+        
+        Сообщения читаются с явным таймаутом INVALIDATION_POLL_SECONDS: простой канала
+        дольше socket_timeout пула - это пустое чтение, а не ошибка соединения
+        (listen() в redis 5.0 падает по socket_timeout, и L1 сбрасывался бы на каждом простое).
+        '''
+        while True:
+            try:
+                async with self.redis_cache.redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=INVALIDATION_POLL_SECONDS
+                        )
+                        if message is not None and message["type"] == "message":
+                            self.apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Пока подписки нет, L1 мог пропустить сообщения - сбрасываем его
+                self.local_cache.clear()
+                logger.warning("Подписка на инвалидацию кеша прервана: %s", exc)
+                await asyncio.sleep(1)
+
+    async def mget_raw(self, keys: List[str]) -> List[Optional[bytes]]:
+        '''Получает несколько свежих сериализованных значений, запрашивая в Redis только промахи L1'''
+        values = [self.local_cache.get(key) for key in keys]
+        missing = [i for i, data in enumerate(values) if data is None]
+        if missing:
+            raw_values = await self.redis_cache.mget_raw([keys[i] for i in missing])
+            for i, data in zip(missing, raw_values):
+                if data:
+                    values[i] = data
+                    self.local_cache.set(keys[i], data, len(data))
+        return values
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        '''Получает несколько свежих значений, запрашивая в Redis только промахи L1'''
+        return [encoders.loads(data) if data is not None else None for data in await self.mget_raw(keys)]
+
+    async def invalidate_key(self, key: str) -> None:
+        '''Удаляет конкретный ключ из кэша'''
+        await self.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        '''Счетчики попаданий и промахов по уровням, объединенных промахов и отданных устаревших значений'''
+        return {
+            "l1": self.local_cache.stats(),
+            "l2": self.redis_cache.stats(),
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served
+        }
+
+    async def close(self) -> None:
+        '''Дожидается фоновых обновлений и закрывает соединения с Redis'''
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        self.local_cache.clear()
+        await self.redis_cache.close()
+
+
 # Dependency для FastAPI
-def get_cache() -> RedisCache:
-    return RedisCache()
\ No newline at end of file
+def get_cache(request: Request) -> TieredCache:
+    '''Возвращает общий кеш, созданный в lifespan приложения'''
+    return request.app.state.cache
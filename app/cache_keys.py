@@ -0,0 +1,143 @@
+import hashlib
+from datetime import date, datetime
+from typing import Any, Optional, Union
+
+# Ключи длиннее этого значения заменяются хешем, чтобы не раздувать память Redis и L1
+MAX_KEY_LENGTH = 200
+
+
+def trading_day(value: Union[date, datetime]) -> datetime:
+    '''Приводит дату или момент времени к торговому дню (полночь этой даты)'''
+    if isinstance(value, datetime):
+        value = value.date()
+    return datetime.combine(value, datetime.min.time())
+
+
+def _normalize(value: Any) -> str:
+    '''Каноническое строковое представление значения параметра'''
+    if isinstance(value, (date, datetime)):
+        # Гранулярность данных - торговый день: время и микросекунды не влияют на ответ
+        return trading_day(value).date().isoformat()
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value)
+
+
+def build_key(prefix: str, **params: Any) -> str:
+    '''
+    Формирует канонический ключ кеша: prefix:name=value:...
+
+    Даты приводятся к торговому дню, параметры сортируются по имени, параметры
+    со значением None опускаются. Эквивалентные запросы получают один ключ.
+    Слишком длинные ключи заменяются на prefix:h:<sha1>, чтобы префикс
+    оставался доступен для метрик.
+
+    Args:
+        prefix: Префикс ключа (имя эндпоинта)
+        **params: Параметры запроса
+
+    Returns:
+        str: Ключ кеша
+    '''
+    parts = [f"{name}={_normalize(value)}" for name, value in sorted(params.items()) if value is not None]
+    key = ":".join([prefix, *parts])
+    if len(key) > MAX_KEY_LENGTH:
+        key = f"{prefix}:h:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+    return key
+
+
+def trading_dates_key(limit: int) -> str:
+    '''Ключ кеша для списка последних торговых дат'''
+    return build_key("trading_dates", limit=limit)
+
+
+def dynamics_key(
+        start_date: Union[date, datetime],
+        end_date: Union[date, datetime],
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None
+) -> str:
+    '''Ключ кеша для динамики торгов за период (или ее страницы)'''
+    return build_key(
+        "dynamics",
+        start_date=start_date,
+        end_date=end_date,
+        oil_id=oil_id,
+        delivery_type_id=delivery_type_id,
+        delivery_basis_id=delivery_basis_id,
+        page_size=page_size,
+        cursor=cursor
+    )
+
+
+def trading_results_key(
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None,
+        limit: int = 100
+) -> str:
+    '''Ключ кеша для последних результатов торгов'''
+    return build_key(
+        "trading_results",
+        oil_id=oil_id,
+        delivery_type_id=delivery_type_id,
+        delivery_basis_id=delivery_basis_id,
+        limit=limit
+    )
+
+
+def dynamics_day_key(
+        day: Union[date, datetime],
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None
+) -> str:
+    '''Ключ кеша для результатов торгов за один торговый день (фрагмент динамики)'''
+    return build_key(
+        "dynamics_day",
+        date=day,
+        oil_id=oil_id,
+        delivery_type_id=delivery_type_id,
+        delivery_basis_id=delivery_basis_id
+    )
+
+
+def daily_summary_key(
+        start_date: Union[date, datetime],
+        end_date: Union[date, datetime],
+        oil_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None
+) -> str:
+    '''Ключ кеша для дневных итогов торгов за период'''
+    return build_key(
+        "daily_summary",
+        start_date=start_date,
+        end_date=end_date,
+        oil_id=oil_id,
+        delivery_basis_id=delivery_basis_id
+    )
+
+
+def aggregate_key(
+        start_date: Union[date, datetime],
+        end_date: Union[date, datetime],
+        bucket: str,
+        group_by: str = "",
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None
+) -> str:
+    '''Ключ кеша для агрегатов торгов за период (group_by - поля через запятую)'''
+    return build_key(
+        "aggregate",
+        start_date=start_date,
+        end_date=end_date,
+        bucket=bucket,
+        group_by=group_by or None,
+        oil_id=oil_id,
+        delivery_type_id=delivery_type_id,
+        delivery_basis_id=delivery_basis_id
+    )
@@ -0,0 +1,89 @@
+import zlib
+from typing import Callable, Dict, Tuple
+
+from app.config import settings
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # lz4 - необязательная зависимость
+    lz4_frame = None
+
+
+# Байт-заголовок кодека перед сжатыми данными. Значения выбраны так, чтобы
+# не совпадать с первым символом JSON: записи без заголовка читаются как есть.
+CODEC_NONE = b"\x00"
+CODEC_ZLIB = b"\x01"
+CODEC_LZ4 = b"\x02"
+
+CODEC_NAMES: Dict[str, bytes] = {
+    "none": CODEC_NONE,
+    "zlib": CODEC_ZLIB,
+    "lz4": CODEC_LZ4
+}
+
+
+def _lz4_compress(data: bytes) -> bytes:
+    if lz4_frame is None:
+        raise RuntimeError("Кодек lz4 недоступен: установите пакет lz4")
+    return lz4_frame.compress(data)
+
+
+def _lz4_decompress(data: bytes) -> bytes:
+    if lz4_frame is None:
+        raise RuntimeError("Кодек lz4 недоступен: установите пакет lz4")
+    return lz4_frame.decompress(data)
+
+
+_CODECS: Dict[bytes, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    CODEC_NONE: (lambda data: data, lambda data: data),
+    # Быстрый уровень: JSON хорошо сжимается и при нем, а задержка записи важнее
+    CODEC_ZLIB: (lambda data: zlib.compress(data, 1), zlib.decompress),
+    CODEC_LZ4: (_lz4_compress, _lz4_decompress)
+}
+
+
+def get_codec(name: str) -> bytes:
+    '''
+    Возвращает байт-заголовок кодека по имени из настроек
+
+    Raises:
+        ValueError: Неизвестное имя кодека
+        RuntimeError: Кодек требует неустановленный пакет
+    '''
+    try:
+        codec = CODEC_NAMES[name.lower()]
+    except KeyError:
+        raise ValueError(f"Неизвестный кодек сжатия: {name}") from None
+    if codec == CODEC_LZ4 and lz4_frame is None:
+        raise RuntimeError("Кодек lz4 недоступен: установите пакет lz4")
+    return codec
+
+
+def compress(data: bytes, codec: bytes, min_size: int) -> bytes:
+    '''
+    Сжимает данные выбранным кодеком и добавляет байт-заголовок кодека
+
+    Args:
+        data: Исходные данные
+        codec: Байт-заголовок кодека (см. get_codec)
+        min_size: Данные меньше этого размера сохраняются без сжатия
+
+    Returns:
+        bytes: Заголовок кодека и (возможно сжатые) данные
+    '''
+    if len(data) < min_size:
+        codec = CODEC_NONE
+    return codec + _CODECS[codec][0](data)
+
+
+def decompress(blob: bytes) -> bytes:
+    '''Распаковывает данные по байт-заголовку; данные без заголовка возвращаются как есть'''
+    codec = blob[:1]
+    if codec not in _CODECS:
+        return blob
+    return _CODECS[codec][1](blob[1:])
+
+
+def default_codec() -> bytes:
+    '''Кодек из настроек CACHE_COMPRESSION_CODEC'''
+    return get_codec(settings.CACHE_COMPRESSION_CODEC)
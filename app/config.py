@@ -19,7 +19,14 @@ class Settings(BaseSettings):
     REDIS_PORT: int = os.getenv("REDIS_PORT", 6379)
     REDIS_DB: int = os.getenv("REDIS_DB", 0)
     REDIS_PASSWORD: Optional[str] = os.getenv("REDIS_PASSWORD")
-    
+
+    # Настройки пула соединений Redis (один пул на процесс)
+    REDIS_MAX_CONNECTIONS: int = os.getenv("REDIS_MAX_CONNECTIONS", 50)
+    REDIS_POOL_TIMEOUT: float = os.getenv("REDIS_POOL_TIMEOUT", 5.0)
+    REDIS_SOCKET_TIMEOUT: float = os.getenv("REDIS_SOCKET_TIMEOUT", 2.0)
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 2.0)
+    REDIS_HEALTH_CHECK_INTERVAL: int = os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30)
+
     # Настройки приложения
     APP_HOST: str = os.getenv("APP_HOST", "0.0.0.0")
     APP_PORT: int = os.getenv("APP_PORT", 8000)
@@ -29,6 +36,53 @@ class Settings(BaseSettings):
     CACHE_RESET_HOUR: int = os.getenv("CACHE_RESET_HOUR", 14)
     CACHE_RESET_MINUTE: int = os.getenv("CACHE_RESET_MINUTE", 11)
     
+    # Сколько секунд после сброса можно отдавать устаревшее значение, обновляя его в фоне
+    CACHE_STALE_GRACE_SECONDS: int = os.getenv("CACHE_STALE_GRACE_SECONDS", 3600)
+    
+    # TTL данных за закрытые торговые дни (раньше последней загруженной даты), которые больше не меняются
+    CACHE_HISTORICAL_TTL_SECONDS: int = os.getenv("CACHE_HISTORICAL_TTL_SECONDS", 30 * 24 * 3600)
+    
+    # Как часто воркер перечитывает поколение ключей из Redis на случай пропущенного уведомления (сек)
+    CACHE_GENERATION_CHECK_SECONDS: float = os.getenv("CACHE_GENERATION_CHECK_SECONDS", 1.0)
+    
+    # Сжатие значений в Redis: кодек none, zlib или lz4 (требует пакет lz4)
+    CACHE_COMPRESSION_CODEC: str = os.getenv("CACHE_COMPRESSION_CODEC", "zlib")
+    CACHE_COMPRESSION_MIN_BYTES: int = os.getenv("CACHE_COMPRESSION_MIN_BYTES", 1024)
+    
+    # JSON-кодировщик ответов и значений кеша: auto (orjson, затем ujson, затем json), orjson, ujson или json
+    JSON_ENCODER: str = os.getenv("JSON_ENCODER", "auto")
+    
+    # Локальный кеш процесса (L1) перед Redis
+    L1_CACHE_MAX_ENTRIES: int = os.getenv("L1_CACHE_MAX_ENTRIES", 1024)
+    L1_CACHE_MAX_BYTES: int = os.getenv("L1_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+    
+    # Блокировка на вычисление значения между воркерами (single-flight)
+    CACHE_LOCK_TIMEOUT_MS: int = os.getenv("CACHE_LOCK_TIMEOUT_MS", 10000)
+    CACHE_LOCK_WAIT_MS: int = os.getenv("CACHE_LOCK_WAIT_MS", 5000)
+    CACHE_LOCK_POLL_MS: int = os.getenv("CACHE_LOCK_POLL_MS", 50)
+    
+    # Прогрев кеша после ежедневного сброса
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "True").lower() in ("true", "1", "t")
+    # Запросы для прогрева через ";" в формате endpoint?param=value, endpoint - dates, results или dynamics
+    # (для dynamics параметр days задает окно последних дней)
+    WARMUP_QUERIES: str = os.getenv("WARMUP_QUERIES", "dates?limit=10;results?limit=100;dynamics?days=30")
+    WARMUP_TOP_LEARNED: int = os.getenv("WARMUP_TOP_LEARNED", 20)
+    WARMUP_CONCURRENCY: int = os.getenv("WARMUP_CONCURRENCY", 4)
+    WARMUP_DELAY_SECONDS: int = os.getenv("WARMUP_DELAY_SECONDS", 5)
+    WARMUP_FLUSH_INTERVAL: int = os.getenv("WARMUP_FLUSH_INTERVAL", 60)
+    
+    # Потоковая выдача (stream=ndjson|json): сколько строк читать из курсора БД за раз
+    STREAM_CHUNK_SIZE: int = os.getenv("STREAM_CHUNK_SIZE", 1000)
+    
+    # Источник списка последних торговых дат: skip_scan (рекурсивный запрос по индексу trading_date),
+    # table (справочник trading_days, см. python -m app.trading_days install) или distinct (полный DISTINCT)
+    TRADING_DATES_SOURCE: str = os.getenv("TRADING_DATES_SOURCE", "skip_scan")
+    
+    # Секционирование таблицы результатов по месяцам (python -m app.partitioning migrate):
+    # на сколько месяцев вперед создавать секции и как часто это проверять (сек)
+    PARTITION_MONTHS_AHEAD: int = os.getenv("PARTITION_MONTHS_AHEAD", 3)
+    PARTITION_CHECK_INTERVAL_SECONDS: int = os.getenv("PARTITION_CHECK_INTERVAL_SECONDS", 24 * 3600)
+    
     # Другие настройки
     API_VERSION: str = "1.0.0"
     API_TITLE: str = "SPIMEX Trading API"
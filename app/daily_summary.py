@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, func, literal_column, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Dialect
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from app.aggregation import TimeBucket, date_bucket
+from app.cache_keys import trading_day
+from app.config import settings
+from app.models.database import SpimexTradingResult, TradingDailySummary
+
+TABLE = SpimexTradingResult.__tablename__
+SUMMARY_TABLE = TradingDailySummary.__tablename__
+# Триггеры, поддерживающие итоги (одинаковые имена в PostgreSQL и SQLite)
+TRIGGERS = tuple(f"{SUMMARY_TABLE}_{operation}" for operation in ("insert", "update", "delete"))
+
+# Ключ дневных итогов (trading_date - начало торгового дня, а не время записи)
+# и агрегаты строк результатов (в порядке колонок итогов)
+KEY = ("trading_date", "oil_id", "delivery_basis_id")
+AGGREGATES = "sum({p}volume), sum({p}total_value), min({p}price), max({p}price), count(*)"
+
+_key = ", ".join(KEY)
+_columns = f"{_key}, volume, total_value, min_price, max_price, deals"
+
+
+def day_sql(column: str, dialect: Dialect) -> str:
+    '''SQL начала торгового дня момента column (как date_bucket по дням)'''
+    return str(date_bucket(TimeBucket.DAY, literal_column(column)).compile(dialect=dialect))
+
+
+def _next_day_sql(day: str, dialect: Dialect) -> str:
+    '''SQL начала дня, следующего за началом дня day'''
+    if dialect.name == "sqlite":
+        return f"strftime('%Y-%m-%d 00:00:00.000000', {day}, '+1 day')"
+    return f"{day} + interval '1 day'"
+
+
+def _in_day(row: str, key: str, dialect: Dialect) -> str:
+    '''
+    Условие на строки результатов row, относящиеся к ключу итогов key: полуинтервал
+    дня [начало, начало следующего дня) по trading_date, чтобы читался индекс
+    '''
+    return (
+        f"{row}.trading_date >= {key}.trading_date "
+        f"AND {row}.trading_date < {_next_day_sql(f'{key}.trading_date', dialect)} "
+        f"AND {row}.oil_id = {key}.oil_id AND {row}.delivery_basis_id = {key}.delivery_basis_id"
+    )
+
+
+def _keys_sql(table: str, dialect: Dialect) -> str:
+    '''Ключи итогов строк таблицы (переходной таблицы) table'''
+    return f"SELECT DISTINCT {day_sql('trading_date', dialect)} AS trading_date, oil_id, delivery_basis_id FROM {table}"
+
+
+def _recompute_sql(changed: str, table: str, dialect: Dialect) -> List[str]:
+    '''Пересчет итогов по ключам из запроса changed: обновление непустых и удаление опустевших'''
+    return [
+        f"WITH changed AS ({changed}) "
+        f"INSERT INTO {SUMMARY_TABLE} ({_columns}) "
+        f"SELECT {', '.join('c.' + column for column in KEY)}, {AGGREGATES.format(p='r.')} "
+        f"FROM {table} r JOIN changed c ON {_in_day('r', 'c', dialect)} "
+        f"GROUP BY {', '.join('c.' + column for column in KEY)} "
+        f"ON CONFLICT ({_key}) DO UPDATE SET volume = EXCLUDED.volume, total_value = EXCLUDED.total_value, "
+        "min_price = EXCLUDED.min_price, max_price = EXCLUDED.max_price, deals = EXCLUDED.deals",
+        f"WITH changed AS ({changed}) "
+        f"DELETE FROM {SUMMARY_TABLE} s USING changed c "
+        f"WHERE {' AND '.join(f's.{column} = c.{column}' for column in KEY)} "
+        f"AND NOT EXISTS (SELECT 1 FROM {table} r WHERE {_in_day('r', 'c', dialect)})"
+    ]
+
+
+def postgres_ddl(table: str = TABLE) -> List[str]:
+    '''
+    DDL триггеров PostgreSQL, поддерживающих таблицу trading_daily_summary
+
+    Триггеры срабатывают раз на запрос и читают переходные таблицы. Загрузка
+    (INSERT) прибавляет свои агрегаты к итогам через ON CONFLICT DO UPDATE, не читая
+    уже загруженные строки. Изменение и удаление пересчитывают затронутые итоги
+    по таблице результатов: минимум и максимум нельзя "вычесть".
+    '''
+    dialect = postgresql.dialect()
+    function = f"{SUMMARY_TABLE}_sync"
+    day = day_sql("trading_date", dialect)
+    upsert = (
+        f"INSERT INTO {SUMMARY_TABLE} ({_columns}) "
+        f"SELECT {day}, oil_id, delivery_basis_id, {AGGREGATES.format(p='')} FROM new_rows "
+        f"GROUP BY {day}, oil_id, delivery_basis_id "
+        f"ON CONFLICT ({_key}) DO UPDATE SET "
+        f"volume = {SUMMARY_TABLE}.volume + EXCLUDED.volume, "
+        f"total_value = {SUMMARY_TABLE}.total_value + EXCLUDED.total_value, "
+        f"min_price = LEAST({SUMMARY_TABLE}.min_price, EXCLUDED.min_price), "
+        f"max_price = GREATEST({SUMMARY_TABLE}.max_price, EXCLUDED.max_price), "
+        f"deals = {SUMMARY_TABLE}.deals + EXCLUDED.deals"
+    )
+    updated = _recompute_sql(
+        f"{_keys_sql('old_rows', dialect)} UNION {_keys_sql('new_rows', dialect)}", table, dialect
+    )
+    deleted = _recompute_sql(_keys_sql("old_rows", dialect), table, dialect)
+    ddl = [
+        f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {upsert};
+            ELSIF TG_OP = 'UPDATE' THEN
+                {'; '.join(updated)};
+            ELSE
+                {'; '.join(deleted)};
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    ]
+    transitions = {
+        "INSERT": "NEW TABLE AS new_rows",
+        "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "DELETE": "OLD TABLE AS old_rows"
+    }
+    for operation, referencing in transitions.items():
+        trigger = f"{SUMMARY_TABLE}_{operation.lower()}"
+        ddl.append(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+        ddl.append(
+            f"CREATE TRIGGER {trigger} AFTER {operation} ON {table} "
+            f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+    return ddl
+
+
+def sqlite_ddl(table: str = TABLE) -> List[str]:
+    '''DDL построчных триггеров SQLite (переходных таблиц в SQLite нет)'''
+    dialect = sqlite.dialect()
+    add_new = (
+        f"INSERT INTO {SUMMARY_TABLE} ({_columns}) "
+        f"VALUES ({day_sql('NEW.trading_date', dialect)}, NEW.oil_id, NEW.delivery_basis_id, "
+        "NEW.volume, NEW.total_value, NEW.price, NEW.price, 1) "
+        f"ON CONFLICT ({_key}) DO UPDATE SET volume = volume + excluded.volume, "
+        "total_value = total_value + excluded.total_value, min_price = min(min_price, excluded.min_price), "
+        "max_price = max(max_price, excluded.max_price), deals = deals + 1;"
+    )
+
+    def recompute(row: str) -> str:
+        day = day_sql(f"{row}.trading_date", dialect)
+        where = f"trading_date = {day} AND oil_id = {row}.oil_id AND delivery_basis_id = {row}.delivery_basis_id"
+        return (
+            f"DELETE FROM {SUMMARY_TABLE} WHERE {where}; "
+            f"INSERT INTO {SUMMARY_TABLE} ({_columns}) "
+            f"SELECT {day}, oil_id, delivery_basis_id, {AGGREGATES.format(p='')} FROM {table} "
+            f"WHERE trading_date >= {day} AND trading_date < {_next_day_sql(day, dialect)} "
+            f"AND oil_id = {row}.oil_id AND delivery_basis_id = {row}.delivery_basis_id "
+            "GROUP BY oil_id, delivery_basis_id;"
+        )
+
+    bodies = {
+        "insert": ("INSERT", add_new),
+        "update": ("UPDATE", recompute("OLD") + " " + recompute("NEW")),
+        "delete": ("DELETE", recompute("OLD"))
+    }
+    ddl = []
+    for name, (event, body) in bodies.items():
+        trigger = f"{SUMMARY_TABLE}_{name}"
+        ddl.append(f"DROP TRIGGER IF EXISTS {trigger}")
+        ddl.append(f"CREATE TRIGGER {trigger} AFTER {event} ON {table} FOR EACH ROW BEGIN {body} END")
+    return ddl
+
+
+async def rebuild(
+        conn: AsyncConnection,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+) -> int:
+    '''
+    Пересчитывает дневные итоги за период (без границ - целиком) по таблице результатов
+
+    Границы - целые торговые дни: конечный день пересчитывается при любом времени записей.
+
+    Returns:
+        int: Количество строк итогов за период
+    '''
+    summary, results = TradingDailySummary, SpimexTradingResult
+    day = date_bucket(TimeBucket.DAY, results.trading_date)
+    stale = delete(summary)
+    aggregated = (
+        select(
+            day,
+            results.oil_id,
+            results.delivery_basis_id,
+            func.sum(results.volume),
+            func.sum(results.total_value),
+            func.min(results.price),
+            func.max(results.price),
+            func.count()
+        )
+        .group_by(day, results.oil_id, results.delivery_basis_id)
+    )
+    if start_date is not None:
+        stale = stale.where(summary.trading_date >= trading_day(start_date))
+        aggregated = aggregated.where(results.trading_date >= trading_day(start_date))
+    if end_date is not None:
+        next_day = trading_day(end_date) + timedelta(days=1)
+        stale = stale.where(summary.trading_date < next_day)
+        aggregated = aggregated.where(results.trading_date < next_day)
+
+    await conn.execute(stale)
+    result = await conn.execute(summary.__table__.insert().from_select(
+        [*KEY, "volume", "total_value", "min_price", "max_price", "deals"], aggregated
+    ))
+    return result.rowcount
+
+
+async def is_installed(conn: AsyncConnection) -> bool:
+    '''
+    Установлены ли триггеры итогов на текущей таблице результатов.
+
+    Без них таблица итогов (ее создает и create_all) пуста или отстает от результатов.
+    '''
+    names = ", ".join(f"'{name}'" for name in TRIGGERS)
+    if conn.dialect.name == "postgresql":
+        query = f"SELECT count(*) FROM pg_trigger WHERE tgrelid = to_regclass('{TABLE}') AND tgname IN ({names})"
+    elif conn.dialect.name == "sqlite":
+        query = f"SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = '{TABLE}' AND name IN ({names})"
+    else:
+        return False
+    return (await conn.execute(text(query))).scalar() == len(TRIGGERS)
+
+
+async def install(engine: AsyncEngine) -> int:
+    '''
+    Создает таблицу trading_daily_summary, триггеры на таблице результатов и заполняет итоги
+
+    Повторный вызов безопасен: триггеры пересоздаются, итоги пересчитываются.
+    После переноса таблицы в секции (python -m app.partitioning migrate) триггеры
+    остаются на прежней таблице - установку нужно повторить.
+
+    Returns:
+        int: Количество строк итогов
+    '''
+    if engine.dialect.name == "postgresql":
+        ddl = postgres_ddl()
+    elif engine.dialect.name == "sqlite":
+        ddl = sqlite_ddl()
+    else:
+        raise RuntimeError(f"Триггеры {SUMMARY_TABLE} не поддерживаются для {engine.dialect.name}")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(TradingDailySummary.__table__.create, checkfirst=True)
+        if engine.dialect.name == "postgresql":
+            # Блокировка записи на время установки: строки, вставленные между
+            # созданием триггеров и пересчетом, не будут учтены дважды или пропущены
+            await conn.execute(text(f"LOCK TABLE {TABLE} IN SHARE MODE"))
+        for statement in ddl:
+            await conn.execute(text(statement))
+        return await rebuild(conn)
+
+
+async def _run(command: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> None:
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        if command == "install":
+            print(f"Таблица {SUMMARY_TABLE} заполнена, строк: {await install(engine)}")
+            return
+        async with engine.begin() as conn:
+            print(f"Пересчитано строк итогов: {await rebuild(conn, start_date, end_date)}")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    '''
+    Дневные итоги торгов по нефтепродукту и базису поставки
+
+        python -m app.daily_summary install                           # таблица, триггеры и заполнение
+        python -m app.daily_summary rebuild [--start DATE] [--end DATE]  # пересчет за период
+    '''
+    parser = argparse.ArgumentParser(description="Дневные итоги торгов trading_daily_summary")
+    parser.add_argument("command", choices=["install", "rebuild"])
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Начальная дата пересчета (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Конечная дата пересчета (YYYY-MM-DD)")
+    args = parser.parse_args()
+    asyncio.run(_run(args.command, args.start, args.end))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson - необязательная зависимость
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # ujson - необязательная зависимость
+    ujson = None
+
+
+class Encoder(NamedTuple):
+    '''JSON-кодировщик: dumps возвращает UTF-8 байты, loads принимает str или bytes'''
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Union[str, bytes]], Any]
+
+
+def _isoformat(value: Any) -> str:
+    # Даты - в ISO 8601, как у Pydantic и orjson (str() дал бы пробел вместо "T")
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _orjson_encoder() -> Encoder:
+    # datetime сериализуется нативно, без вызова Python-функции на каждое значение
+    return Encoder("orjson", orjson.dumps, orjson.loads)
+
+
+def _ujson_encoder() -> Encoder:
+    def dumps(value: Any) -> bytes:
+        return ujson.dumps(
+            value,
+            default=_isoformat,
+            ensure_ascii=False,
+            escape_forward_slashes=False
+        ).encode("utf-8")
+    return Encoder("ujson", dumps, ujson.loads)
+
+
+def _json_encoder() -> Encoder:
+    def dumps(value: Any) -> bytes:
+        return json.dumps(
+            value,
+            default=_isoformat,
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+    return Encoder("json", dumps, json.loads)
+
+
+_ENCODERS: Dict[str, Callable[[], Encoder]] = {
+    "orjson": _orjson_encoder,
+    "ujson": _ujson_encoder,
+    "json": _json_encoder
+}
+
+_AVAILABLE = {
+    "orjson": lambda: orjson is not None,
+    "ujson": lambda: ujson is not None,
+    "json": lambda: True
+}
+
+
+def get_encoder(name: str) -> Encoder:
+    '''
+    Возвращает JSON-кодировщик по имени из настроек
+
+    auto - самый быстрый из установленных: orjson, затем ujson, затем json.
+
+    Raises:
+        ValueError: Неизвестное имя кодировщика
+        RuntimeError: Кодировщик требует неустановленный пакет
+    '''
+    name = name.lower()
+    if name == "auto":
+        name = next(candidate for candidate in _ENCODERS if _AVAILABLE[candidate]())
+    if name not in _ENCODERS:
+        raise ValueError(f"Неизвестный JSON-кодировщик: {name}")
+    if not _AVAILABLE[name]():
+        raise RuntimeError(f"JSON-кодировщик {name} недоступен: установите пакет {name}")
+    return _ENCODERS[name]()
+
+
+_encoder: Optional[Encoder] = None
+
+
+def default_encoder() -> Encoder:
+    '''Кодировщик из настроек JSON_ENCODER (выбирается один раз на процесс)'''
+    global _encoder
+    if _encoder is None:
+        _encoder = get_encoder(settings.JSON_ENCODER)
+    return _encoder
+
+
+def dumps(value: Any) -> bytes:
+    '''Сериализует значение в JSON кодировщиком из настроек'''
+    return default_encoder().dumps(value)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    '''Разбирает JSON кодировщиком из настроек'''
+    return default_encoder().loads(data)
+
+
+class EncodedJSONResponse(JSONResponse):
+    '''JSON-ответ FastAPI, сериализуемый кодировщиком из настроек вместо стандартного json'''
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,78 @@
+from enum import Enum
+from typing import Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow - необязательная зависимость
+    pa = None
+
+
+class ExportFormat(str, Enum):
+    '''Колоночный формат выгрузки'''
+    ARROW = "arrow"
+    PARQUET = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet"
+}
+
+FILE_EXTENSIONS = {
+    ExportFormat.ARROW: "arrows",
+    ExportFormat.PARQUET: "parquet"
+}
+
+
+def is_available() -> bool:
+    '''Установлен ли pyarrow'''
+    return pa is not None
+
+
+def result_schema() -> "pa.Schema":
+    '''Схема выгрузки: поля TradingResult в порядке RESULT_COLUMNS'''
+    return pa.schema([
+        ("id", pa.int64()),
+        ("trading_date", pa.timestamp("us")),
+        ("oil_id", pa.int64()),
+        ("delivery_type_id", pa.int64()),
+        ("delivery_basis_id", pa.int64()),
+        ("volume", pa.float64()),
+        ("price", pa.float64()),
+        ("total_value", pa.float64()),
+    ])
+
+
+def rows_to_table(rows: Sequence[Sequence]) -> "pa.Table":
+    '''
+    Собирает Arrow-таблицу из строк-кортежей БД (колонки в порядке RESULT_COLUMNS)
+
+    Строки транспонируются в колонки и сразу упаковываются в колоночные буферы,
+    без промежуточных ORM-объектов и моделей Pydantic.
+    '''
+    schema = result_schema()
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+def serialize_table(table: "pa.Table", export_format: ExportFormat) -> bytes:
+    '''
+    Сериализует таблицу в Arrow IPC stream или Parquet
+
+    Raises:
+        RuntimeError: pyarrow не установлен
+    '''
+    if pa is None:
+        raise RuntimeError("Колоночная выгрузка недоступна: установите пакет pyarrow")
+    sink = pa.BufferOutputStream()
+    if export_format == ExportFormat.ARROW:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pa.parquet.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request
+
+from app.cache import CachedBody, get_reset_ttl
+
+
+def cache_headers(
+        body: CachedBody,
+        latest_trading_date: Optional[datetime],
+        max_age: Optional[int] = None
+) -> Dict[str, str]:
+    '''
+    Заголовки HTTP-кеширования отдаваемого ответа
+
+    ETag берется из записи кеша (хеш тела), поэтому меняется вместе с телом:
+    после загрузки, сброса поколения и точечной инвалидации. Устаревшее тело,
+    отданное на время фонового обновления, идет без валидаторов и с no-cache,
+    чтобы клиент и CDN не закрепили его и не получали по нему 304.
+
+    Args:
+        body: Отдаваемое значение из кеша (TieredCache.get_or_compute_entry)
+        latest_trading_date: Последняя загруженная торговая дата
+        max_age: Время жизни ответа; по умолчанию - до ежедневного сброса кеша
+
+    Returns:
+        Dict[str, str]: ETag, Cache-Control, Expires и (если есть данные) Last-Modified
+    '''
+    if body.stale:
+        return {"Cache-Control": "no-cache"}
+    if max_age is None:
+        max_age = get_reset_ttl()
+    headers = {
+        "ETag": body.etag,
+        "Cache-Control": f"public, max-age={max_age}",
+        "Expires": format_datetime(datetime.now(timezone.utc) + timedelta(seconds=max_age), usegmt=True)
+    }
+    if latest_trading_date is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(latest_trading_date), usegmt=True)
+    return headers
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    '''
+    Проверяет условные заголовки запроса (RFC 9110): If-None-Match имеет приоритет,
+    If-Modified-Since учитывается только без него. Ответ без ETag (устаревший)
+    не подтверждается.
+    '''
+    if "ETag" not in headers:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Для GET сравнение слабое: W/"x" совпадает с "x"
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return headers["ETag"] in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= since
@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+from typing import List
+
+from sqlalchemy import Index, inspect
+from sqlalchemy.engine import Connection, Dialect
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.schema import CreateIndex
+
+from app.config import settings
+from app.models.database import Base
+from app.partitioning import is_partitioned
+
+
+def missing_indexes(connection: Connection) -> List[Index]:
+    '''
+    Индексы моделей, отсутствующие в БД
+
+    create_all при старте создает только новые таблицы: индексы, добавленные
+    в модель позже, в существующую таблицу не попадают.
+    '''
+    inspector = inspect(connection)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return sorted(missing, key=lambda index: index.name)
+
+
+def index_ddl(index: Index, dialect: Dialect, concurrently: bool = True) -> str:
+    '''
+    DDL создания индекса
+
+    В PostgreSQL индекс строится CONCURRENTLY - без блокировки записи в таблицу
+    (такой запрос нельзя выполнять внутри транзакции). Для секционированной
+    таблицы CONCURRENTLY не поддерживается - передается concurrently=False.
+    '''
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    if concurrently and dialect.name == "postgresql":
+        ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+    return ddl
+
+
+async def create_missing_indexes(engine: AsyncEngine) -> List[str]:
+    '''
+    Создает отсутствующие индексы моделей по одному, вне транзакции
+
+    Returns:
+        List[str]: Имена созданных индексов
+    '''
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        indexes = await conn.run_sync(missing_indexes)
+        for index in indexes:
+            concurrently = not await is_partitioned(conn, index.table.name)
+            await conn.exec_driver_sql(index_ddl(index, engine.dialect, concurrently))
+    return [index.name for index in indexes]
+
+
+async def _run(apply: bool) -> None:
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        if apply:
+            for name in await create_missing_indexes(engine):
+                print(f"Создан индекс {name}")
+            return
+        async with engine.connect() as conn:
+            for index in await conn.run_sync(missing_indexes):
+                print(index_ddl(index, engine.dialect) + ";")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    '''
+    Миграция индексов существующей БД
+
+    Без параметров выводит DDL отсутствующих индексов, с --apply создает их:
+        python -m app.migrations [--apply]
+    '''
+    parser = argparse.ArgumentParser(description="Создание индексов, отсутствующих в существующей БД")
+    parser.add_argument("--apply", action="store_true", help="Создать индексы, а не только вывести DDL")
+    args = parser.parse_args()
+    asyncio.run(_run(args.apply))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -6,6 +6,33 @@ Base = declarative_base()
 
 class SpimexTradingResult(Base):
     __tablename__ = 'spimex_tradinf_result'
+    __table_args__ = (
+        # Курсорная пагинация динамики: ORDER BY trading_date DESC, id DESC и фильтр по ключу.
+        # Остальные колонки ответа включены в индексы (INCLUDE в PostgreSQL), чтобы запросы
+        # выполнялись index-only scan без чтения таблицы.
+        Index(
+            'ix_spimex_tradinf_result_trading_date_id',
+            'trading_date', 'id',
+            postgresql_include=['oil_id', 'delivery_type_id', 'delivery_basis_id', 'volume', 'price', 'total_value']
+        ),
+        # Частые комбинации фильтров TradingService (oil_id; oil_id + базис; все три id)
+        # с той же сортировкой
+        Index(
+            'ix_spimex_tradinf_result_oil_date_id',
+            'oil_id', 'trading_date', 'id',
+            postgresql_include=['delivery_type_id', 'delivery_basis_id', 'volume', 'price', 'total_value']
+        ),
+        Index(
+            'ix_spimex_tradinf_result_oil_basis_date_id',
+            'oil_id', 'delivery_basis_id', 'trading_date', 'id',
+            postgresql_include=['delivery_type_id', 'volume', 'price', 'total_value']
+        ),
+        Index(
+            'ix_spimex_tradinf_result_oil_type_basis_date_id',
+            'oil_id', 'delivery_type_id', 'delivery_basis_id', 'trading_date', 'id',
+            postgresql_include=['volume', 'price', 'total_value']
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     trading_date = Column(DateTime, nullable=False, index=True)
@@ -16,4 +43,30 @@ class SpimexTradingResult(Base):
     price = Column(Float, nullable=False)
     total_value = Column(Float, nullable=False)
     created_at = Column(DateTime, nullable=False)
-    updated_at = Column(DateTime, nullable=False)
\ No newline at end of file
+    updated_at = Column(DateTime, nullable=False)
+
+
+class TradingDay(Base):
+    # Справочник торговых дат: заполняется триггерами на таблице результатов
+    # (python -m app.trading_days install), чтобы последние даты читались за O(limit)
+    __tablename__ = 'trading_days'
+
+    trading_date = Column(DateTime, primary_key=True)
+
+
+class TradingDailySummary(Base):
+    # Дневные итоги по нефтепродукту и базису поставки (trading_date - начало торгового дня):
+    # поддерживаются триггерами на таблице результатов (python -m app.daily_summary install)
+    __tablename__ = 'trading_daily_summary'
+    __table_args__ = (
+        Index('ix_trading_daily_summary_trading_date', 'trading_date'),
+    )
+
+    oil_id = Column(Integer, primary_key=True)
+    delivery_basis_id = Column(Integer, primary_key=True)
+    trading_date = Column(DateTime, primary_key=True)
+    volume = Column(Float, nullable=False)
+    total_value = Column(Float, nullable=False)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    deals = Column(Integer, nullable=False)
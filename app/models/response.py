@@ -34,7 +34,51 @@ class TradingDynamicsResponse(BaseModel):
     total: int
     start_date: datetime
     end_date: datetime
+    # Курсор следующей страницы (только при запросе с page_size, None - страниц больше нет)
+    next_cursor: Optional[str] = None
 
 class TradingResultsResponse(BaseModel):
     result: List[TradingResult]
-    total: int
\ No newline at end of file
+    total: int
+
+class DailySummary(BaseModel):
+    trading_date: datetime
+    oil_id: int
+    delivery_basis_id: int
+    volume: float
+    total_value: float
+    # Средневзвешенная по объему цена (None при нулевом объеме)
+    vwap: Optional[float]
+    min_price: float
+    max_price: float
+    deals: int
+
+class TradingDailySummaryResponse(BaseModel):
+    result: List[DailySummary]
+    total: int
+    start_date: datetime
+    end_date: datetime
+
+class TradingAggregate(BaseModel):
+    # Начало интервала (день, неделя с понедельника или месяц)
+    bucket: datetime
+    # Поля, не входящие в группировку, равны None
+    oil_id: Optional[int] = None
+    delivery_type_id: Optional[int] = None
+    delivery_basis_id: Optional[int] = None
+    volume: float
+    total_value: float
+    vwap: Optional[float]
+    open: float
+    high: float
+    low: float
+    close: float
+    deals: int
+
+class TradingAggregateResponse(BaseModel):
+    result: List[TradingAggregate]
+    total: int
+    start_date: datetime
+    end_date: datetime
+    bucket: str
+    group_by: List[str]
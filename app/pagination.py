@@ -0,0 +1,24 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(trading_date: datetime, record_id: int) -> str:
+    '''Непрозрачный курсор страницы: ключ (trading_date, id) последней отданной записи'''
+    raw = f"{trading_date.isoformat()}|{record_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    '''
+    Разбирает курсор, созданный encode_cursor
+
+    Raises:
+        ValueError: Курсор поврежден или создан не этим API
+    '''
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        trading_date, record_id = raw.split("|")
+        return datetime.fromisoformat(trading_date), int(record_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Некорректный курсор: {cursor}") from exc
@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import List, Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.schema import CreateIndex
+
+from app.config import settings
+from app.models.database import SpimexTradingResult
+
+logger = logging.getLogger(__name__)
+
+TABLE = SpimexTradingResult.__tablename__
+# Журнал id строк, измененных во время переноса в секционированную таблицу
+CHANGE_LOG = f"{TABLE}_migration_log"
+
+
+def month_start(value: Union[date, datetime]) -> date:
+    '''Первый день месяца даты'''
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    '''Первый день месяца, отстоящего от month на months месяцев'''
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(first: date, last: date) -> List[date]:
+    '''Первые дни месяцев с first по last включительно'''
+    months = []
+    month = month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def _as_datetime(month: date) -> datetime:
+    # trading_date - timestamp: asyncpg ожидает datetime, а не date
+    return datetime.combine(month, datetime.min.time())
+
+
+def partition_name(month: date, table: str = TABLE) -> str:
+    '''Имя месячной секции: spimex_tradinf_result_y2024m01'''
+    return f"{table}_y{month:%Y}m{month:%m}"
+
+
+def partition_ddl(month: date, parent: str = TABLE, table: str = TABLE) -> str:
+    '''DDL месячной секции [1-е число месяца, 1-е число следующего)'''
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month, table)} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def change_capture_ddl(table: str = TABLE) -> List[str]:
+    '''
+    DDL захвата изменений на время переноса: триггеры раз на запрос записывают
+    в журнал id вставленных, измененных и удаленных строк (из переходных таблиц)
+    '''
+    function = f"{CHANGE_LOG}_capture"
+    ddl = [
+        f"CREATE TABLE IF NOT EXISTS {CHANGE_LOG} (id bigint NOT NULL)",
+        f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO {CHANGE_LOG} SELECT id FROM new_rows;
+            ELSIF TG_OP = 'UPDATE' THEN
+                INSERT INTO {CHANGE_LOG} SELECT id FROM old_rows UNION SELECT id FROM new_rows;
+            ELSE
+                INSERT INTO {CHANGE_LOG} SELECT id FROM old_rows;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    ]
+    transitions = {
+        "INSERT": "NEW TABLE AS new_rows",
+        "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "DELETE": "OLD TABLE AS old_rows"
+    }
+    for operation, referencing in transitions.items():
+        ddl.append(
+            f"CREATE TRIGGER {CHANGE_LOG}_{operation.lower()} AFTER {operation} ON {table} "
+            f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+    return ddl
+
+
+def drop_change_capture_ddl(table: str = TABLE) -> List[str]:
+    '''DDL удаления триггеров, функции и журнала захвата изменений'''
+    return [
+        *(f"DROP TRIGGER IF EXISTS {CHANGE_LOG}_{operation} ON {table}" for operation in ("insert", "update", "delete")),
+        f"DROP FUNCTION IF EXISTS {CHANGE_LOG}_capture()",
+        f"DROP TABLE IF EXISTS {CHANGE_LOG}"
+    ]
+
+
+async def is_partitioned(conn: AsyncConnection, table: str = TABLE) -> bool:
+    '''Секционирована ли таблица (только PostgreSQL)'''
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid))"
+    ), {"table": table})
+    return bool(result.scalar())
+
+
+async def ensure_partitions(
+        conn: AsyncConnection,
+        today: Optional[date] = None,
+        months_ahead: Optional[int] = None,
+        table: str = TABLE
+) -> List[str]:
+    '''
+    Создает месячные секции с текущего месяца на months_ahead месяцев вперед
+
+    Загрузка данных за новый месяц попадает в готовую секцию, а не в секцию
+    по умолчанию (из которой строки пришлось бы переносить).
+
+    Returns:
+        List[str]: Имена созданных секций
+    '''
+    if months_ahead is None:
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+    current = month_start(today or date.today())
+    created = []
+    for month in month_range(current, add_months(current, months_ahead)):
+        name = partition_name(month, table)
+        exists = (await conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})).scalar()
+        if not exists:
+            await conn.execute(text(partition_ddl(month, table, table)))
+            created.append(name)
+    return created
+
+
+async def maintain_partitions(engine: AsyncEngine) -> None:
+    '''
+    Фоновая задача: раз в PARTITION_CHECK_INTERVAL_SECONDS создает будущие секции,
+    если таблица результатов секционирована
+    '''
+    while True:
+        try:
+            async with engine.begin() as conn:
+                if await is_partitioned(conn):
+                    created = await ensure_partitions(conn)
+                    if created:
+                        logger.info("Созданы секции: %s", ", ".join(created))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Не удалось создать будущие секции")
+        await asyncio.sleep(settings.PARTITION_CHECK_INTERVAL_SECONDS)
+
+
+async def migrate_to_partitioned(
+        engine: AsyncEngine,
+        months_ahead: Optional[int] = None,
+        drop_legacy: bool = False,
+        today: Optional[date] = None
+) -> int:
+    '''
+    Переводит таблицу результатов торгов на секционирование по месяцам trading_date
+
+    Перед копированием на таблицу ставятся триггеры захвата изменений (см.
+    change_capture_ddl): их создание дожидается завершения текущих транзакций записи,
+    после чего каждая вставка, изменение и удаление попадает в журнал.
+    Новая таблица создается рядом и заполняется помесячно отдельными транзакциями,
+    не блокируя чтение и запись. Затем под блокировкой записи (чтение не блокируется)
+    строки из журнала удаляются из новой таблицы и копируются заново в текущем
+    состоянии, триггеры и журнал удаляются, и таблицы меняются именами.
+    Прежняя таблица остается как <таблица>_legacy (или удаляется с drop_legacy).
+
+    Returns:
+        int: Количество строк в новой таблице
+
+    Raises:
+        RuntimeError: Таблица уже секционирована или БД не PostgreSQL
+    '''
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("Секционирование поддерживается только для PostgreSQL")
+    if months_ahead is None:
+        months_ahead = settings.PARTITION_MONTHS_AHEAD
+    new, legacy = f"{TABLE}_partitioned", f"{TABLE}_legacy"
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if await is_partitioned(conn):
+            raise RuntimeError(f"Таблица {TABLE} уже секционирована")
+        # Остатки прерванного переноса удаляются; изменения фиксируются с этого момента,
+        # поэтому все, что закоммичено раньше, увидит копирование
+        for statement in drop_change_capture_ddl() + change_capture_ddl():
+            await conn.execute(text(statement))
+        try:
+            await _create_and_copy(conn, new, months_ahead, today)
+            total = await _reconcile_and_swap(engine, new, legacy)
+        except Exception:
+            for statement in drop_change_capture_ddl():
+                await conn.execute(text(statement))
+            raise
+
+        await conn.execute(text(f"ANALYZE {TABLE}"))
+        if drop_legacy:
+            await conn.execute(text(f"DROP TABLE {legacy}"))
+    return total
+
+
+async def _create_and_copy(conn: AsyncConnection, new: str, months_ahead: int, today: Optional[date]) -> None:
+    '''Создает секционированную таблицу new с секциями и индексами и копирует в нее строки помесячно'''
+    min_date, max_date = (await conn.execute(
+        text(f"SELECT min(trading_date), max(trading_date) FROM {TABLE}")
+    )).one()
+
+    # Имена индексов уникальны в схеме: индексы прежней таблицы переименовываются,
+    # чтобы создать индексы модели на новой
+    model_indexes = {index.name for index in SpimexTradingResult.__table__.indexes}
+    existing = (await conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table AND schemaname = current_schema()"
+    ), {"table": TABLE})).scalars().all()
+    for name in sorted(model_indexes & set(existing)):
+        await conn.execute(text(f"ALTER INDEX {name} RENAME TO {name[:56]}_legacy"))
+
+    # Ключ секционированной таблицы обязан включать ключ секционирования
+    await conn.execute(text(
+        f"CREATE TABLE {new} (LIKE {TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (trading_date)"
+    ))
+    await conn.execute(text(f"ALTER TABLE {new} ADD PRIMARY KEY (id, trading_date)"))
+
+    current = month_start(today or date.today())
+    first = month_start(min_date) if min_date is not None else current
+    last = max(add_months(current, months_ahead), month_start(max_date) if max_date is not None else current)
+    months = month_range(first, last)
+    for month in months:
+        await conn.execute(text(partition_ddl(month, new)))
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {TABLE}_default PARTITION OF {new} DEFAULT"))
+
+    # Индексы на секционированной таблице создаются во всех секциях (пока они пусты - мгновенно).
+    # Имена - как в модели: после переименования таблицы они совпадут с ожидаемыми
+    for index in SpimexTradingResult.__table__.indexes:
+        ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+        await conn.execute(text(ddl.replace(f" ON {TABLE} (", f" ON {new} (", 1)))
+
+    for month in months:
+        result = await conn.execute(text(
+            f"INSERT INTO {new} SELECT * FROM {TABLE} WHERE trading_date >= :start AND trading_date < :end"
+        ), {"start": _as_datetime(month), "end": _as_datetime(add_months(month, 1))})
+        logger.info("Перенесено строк за %s: %s", month.strftime("%Y-%m"), result.rowcount)
+
+
+async def _reconcile_and_swap(engine: AsyncEngine, new: str, legacy: str) -> int:
+    '''
+    Под блокировкой записи переносит заново строки из журнала изменений, удаляет
+    захват изменений и меняет таблицы именами
+
+    Returns:
+        int: Количество строк в новой таблице
+    '''
+    async with engine.begin() as conn:
+        sequence = (await conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": TABLE})).scalar()
+        await conn.execute(text(f"LOCK TABLE {TABLE} IN EXCLUSIVE MODE"))
+        # Строка могла измениться после копирования своего месяца (в том числе сменить месяц),
+        # быть удаленной или вставленной в уже скопированный месяц - берется ее текущее состояние
+        await conn.execute(text(f"DELETE FROM {new} WHERE id IN (SELECT id FROM {CHANGE_LOG})"))
+        result = await conn.execute(text(
+            f"INSERT INTO {new} SELECT * FROM {TABLE} WHERE id IN (SELECT id FROM {CHANGE_LOG})"
+        ))
+        logger.info("Перенесено строк, измененных во время копирования: %s", result.rowcount)
+        for statement in drop_change_capture_ddl():
+            await conn.execute(text(statement))
+        await conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+        await conn.execute(text(f"ALTER TABLE {new} RENAME TO {TABLE}"))
+        if sequence is not None:
+            # Последовательность id переходит к новой таблице и не удаляется вместе с прежней
+            await conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+        return (await conn.execute(text(f"SELECT count(*) FROM {TABLE}"))).scalar()
+
+
+async def _run(command: str, drop_legacy: bool) -> None:
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        if command == "migrate":
+            print(f"Перенесено строк: {await migrate_to_partitioned(engine, drop_legacy=drop_legacy)}")
+            return
+        async with engine.begin() as conn:
+            if not await is_partitioned(conn):
+                raise SystemExit(f"Таблица {TABLE} не секционирована: сначала выполните migrate")
+            for name in await ensure_partitions(conn):
+                print(f"Создана секция {name}")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    '''
+    Секционирование таблицы результатов торгов по месяцам
+
+        python -m app.partitioning migrate [--drop-legacy]  # перевести существующую таблицу
+        python -m app.partitioning ensure                   # создать будущие секции
+    '''
+    parser = argparse.ArgumentParser(description="Секционирование таблицы результатов торгов по месяцам")
+    parser.add_argument("command", choices=["migrate", "ensure"])
+    parser.add_argument("--drop-legacy", action="store_true", help="Удалить прежнюю таблицу после переноса")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run(args.command, args.drop_legacy))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Iterable, List, Optional
+
+from sqlalchemy import Row
+
+from app.encoders import dumps
+from app.models.response import DailySummary, TradingAggregate, TradingResult
+
+# Порядок полей записи результата торгов - как в модели ответа и в ее OpenAPI-схеме
+RESULT_FIELDS = tuple(TradingResult.model_fields)
+
+# Порядок полей дневных итогов - как в DailySummary и SUMMARY_COLUMNS
+SUMMARY_FIELDS = tuple(DailySummary.model_fields)
+
+# Порядок полей агрегатов - как в TradingAggregate и запросе TradingService.get_aggregates
+AGGREGATE_FIELDS = tuple(TradingAggregate.model_fields)
+
+# Значения полей записи одним вызовом - для объектов с атрибутами (ORM-объекты)
+_result_values = attrgetter(*RESULT_FIELDS)
+
+
+def _values(row: Any) -> Any:
+    # Строки TradingService выбраны колонками RESULT_COLUMNS в порядке RESULT_FIELDS:
+    # позиционное чтение Row в разы быстрее доступа к его полям по имени
+    if isinstance(row, (Row, tuple)):
+        return row
+    return _result_values(row)
+
+
+def result_record(row: Any) -> dict:
+    '''Запись результата торгов (Row или объект с атрибутами) в виде словаря полей TradingResult'''
+    return dict(zip(RESULT_FIELDS, _values(row)))
+
+
+def result_records(rows: Iterable[Any]) -> List[dict]:
+    '''Записи результатов торгов в виде словарей полей TradingResult'''
+    return [dict(zip(RESULT_FIELDS, _values(row))) for row in rows]
+
+
+def trading_dates_body(dates: List[datetime]) -> bytes:
+    '''Тело ответа LastTradingDatesResponse'''
+    return dumps({"dates": dates, "total": len(dates)})
+
+
+def trading_results_body(records: List[dict]) -> bytes:
+    '''Тело ответа TradingResultsResponse'''
+    return dumps({"result": records, "total": len(records)})
+
+
+def dynamics_body(
+        records: List[dict],
+        start_date: datetime,
+        end_date: datetime,
+        next_cursor: Optional[str] = None
+) -> bytes:
+    '''Тело ответа TradingDynamicsResponse'''
+    return dumps({
+        "result": records,
+        "total": len(records),
+        "start_date": start_date,
+        "end_date": end_date,
+        "next_cursor": next_cursor
+    })
+
+
+def summary_records(rows: Iterable[Row]) -> List[dict]:
+    '''Строки дневных итогов (колонки SUMMARY_COLUMNS) в виде словарей полей DailySummary'''
+    return [dict(zip(SUMMARY_FIELDS, row)) for row in rows]
+
+
+def daily_summary_body(records: List[dict], start_date: datetime, end_date: datetime) -> bytes:
+    '''Тело ответа TradingDailySummaryResponse'''
+    return dumps({
+        "result": records,
+        "total": len(records),
+        "start_date": start_date,
+        "end_date": end_date
+    })
+
+
+def aggregate_records(rows: Iterable[Row]) -> List[dict]:
+    '''Строки агрегатов в виде словарей полей TradingAggregate'''
+    return [dict(zip(AGGREGATE_FIELDS, row)) for row in rows]
+
+
+def aggregate_body(
+        records: List[dict],
+        start_date: datetime,
+        end_date: datetime,
+        bucket: str,
+        group_by: List[str]
+) -> bytes:
+    '''Тело ответа TradingAggregateResponse'''
+    return dumps({
+        "result": records,
+        "total": len(records),
+        "start_date": start_date,
+        "end_date": end_date,
+        "bucket": bucket,
+        "group_by": group_by
+    })
@@ -0,0 +1,296 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Union
+
+from app import encoders, serializers
+from app.aggregation import GroupField, TimeBucket, group_fields
+from app.cache import TieredCache, get_period_ttl, namespace_key
+from app.cache_keys import dynamics_day_key, trading_dates_key, trading_day
+from app.pagination import decode_cursor, encode_cursor
+from app.services.trading import TradingService
+
+# Тег записей, зависящих от самой свежей торговой даты (последние даты, последние результаты)
+LATEST_TAG = "date:latest"
+
+
+def date_tag(day: Union[date, datetime]) -> str:
+    '''Тег записей, содержащих данные за торговую дату'''
+    if isinstance(day, datetime):
+        day = day.date()
+    return f"date:{day.isoformat()}"
+
+
+def oil_tag(oil_id: Optional[int]) -> str:
+    '''Тег записей по типу нефтепродукта (oil:all - запросы без фильтра по oil_id)'''
+    return f"oil:{oil_id}" if oil_id is not None else "oil:all"
+
+
+def trading_dates_tags() -> List[str]:
+    '''Теги списка последних торговых дат'''
+    return [LATEST_TAG]
+
+
+def period_tags(start_date: datetime, end_date: datetime, oil_id: Optional[int] = None) -> List[str]:
+    '''Теги ответов за период (динамика, дневные итоги, агрегаты): нефтепродукт и каждая дата периода'''
+    days = (end_date.date() - start_date.date()).days
+    return [
+        oil_tag(oil_id),
+        *(date_tag(start_date.date() + timedelta(days=offset)) for offset in range(days + 1))
+    ]
+
+
+def trading_results_tags(oil_id: Optional[int] = None) -> List[str]:
+    '''Теги последних результатов торгов'''
+    return [LATEST_TAG, oil_tag(oil_id)]
+
+
+def tags_for_date(day: Union[date, datetime]) -> List[str]:
+    '''
+    Теги, которые нужно сбросить при изменении данных за торговую дату.
+    
+    Данные за дату могут попасть и в "последние" ответы, поэтому сбрасываются и они.
+    '''
+    return [date_tag(day), LATEST_TAG]
+
+
+def tags_for_oil(oil_id: int) -> List[str]:
+    '''Теги, которые нужно сбросить при изменении данных по нефтепродукту (включая запросы без фильтра)'''
+    return [oil_tag(oil_id), oil_tag(None)]
+
+
+# Тела ответов сериализуются напрямую (app.serializers), без валидации моделями
+# ответа: строки пришли из типизированных колонок БД. Схема OpenAPI по-прежнему
+# берется из response_model эндпоинтов, формат тела совпадает с моделями.
+
+async def load_trading_dates(service: TradingService, limit: int) -> bytes:
+    '''Формирует готовое JSON-тело ответа со списком последних торговых дат'''
+    dates = await service.get_last_trading_dates(limit)
+    return serializers.trading_dates_body(dates)
+
+
+async def latest_trading_date(service: TradingService, cache: TieredCache) -> Optional[datetime]:
+    '''Последняя загруженная торговая дата (из кешированного ответа списка дат с limit=1)'''
+    body = await cache.get_or_compute(
+        await cache.namespaced(trading_dates_key(1)),
+        lambda: load_trading_dates(service, 1),
+        tags=trading_dates_tags()
+    )
+    dates = encoders.loads(body)["dates"]
+    return datetime.fromisoformat(dates[0]) if dates else None
+
+
+def _missing_runs(missing: List[bool]) -> List[List[int]]:
+    '''Группирует индексы дней без фрагментов в кеше в непрерывные периоды'''
+    runs: List[List[int]] = []
+    for i, is_missing in enumerate(missing):
+        if not is_missing:
+            continue
+        if i > 0 and missing[i - 1]:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    return runs
+
+
+async def load_dynamics_by_day(
+        service: TradingService,
+        cache: TieredCache,
+        start_date: datetime,
+        end_date: datetime,
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None
+) -> List[dict]:
+    '''
+    Собирает результаты торгов за период из фрагментов по торговым дням.
+    
+    Фрагменты всех дней читаются одним MGET, а в БД запрашиваются только
+    непрерывные периоды из отсутствующих дней; их результаты сохраняются
+    фрагментами (в том числе пустыми - для дней без торгов). Пересекающиеся
+    периоды (скользящие окна) поэтому переиспользуют уже загруженные дни.
+    Фрагменты закрытых дней не меняются: они хранятся долго (см. get_period_ttl)
+    в отдельном пространстве имен, которое не сбрасывается после каждой загрузки.
+    
+    Returns:
+        List[dict]: Результаты в порядке убывания торговой даты
+    '''
+    filters = {
+        "oil_id": oil_id,
+        "delivery_type_id": delivery_type_id,
+        "delivery_basis_id": delivery_basis_id
+    }
+    start_day, end_day = trading_day(start_date), trading_day(end_date)
+    days = [start_day + timedelta(days=offset) for offset in range((end_day - start_day).days + 1)]
+    latest = await latest_trading_date(service, cache)
+    ttls = [get_period_ttl(day, latest) for day in days]
+    generations = {historical: await cache.generation(historical) for historical in (False, True)}
+    keys = [
+        namespace_key(generations[ttl is not None], dynamics_day_key(day, **filters), ttl is not None)
+        for day, ttl in zip(days, ttls)
+    ]
+    fragments = await cache.mget_raw(keys)
+
+    runs = _missing_runs([fragment is None for fragment in fragments])
+    loaded: Dict[str, bytes] = {}
+    # Новые фрагменты по TTL: закрытые дни и дни, сбрасываемые ежедневно
+    by_ttl: Dict[Optional[int], Dict[str, bytes]] = defaultdict(dict)
+    tags: Dict[str, List[str]] = {}
+    for run in runs:
+        # Сервис выбирает дни периода целиком: [первый день, день после последнего),
+        # поэтому записи последнего дня с ненулевым временем не теряются
+        rows_by_day = defaultdict(list)
+        for row in await service.get_dynamics(days[run[0]], days[run[-1]], **filters):
+            rows_by_day[trading_day(row.trading_date)].append(row)
+        for i in run:
+            loaded[keys[i]] = encoders.dumps(serializers.result_records(rows_by_day[days[i]]))
+            by_ttl[ttls[i]][keys[i]] = loaded[keys[i]]
+            tags[keys[i]] = [oil_tag(oil_id), date_tag(days[i])]
+    for ttl, entries in by_ttl.items():
+        await cache.set_many_raw(entries, ttl=ttl, tags=tags)
+
+    results: List[dict] = []
+    for key, fragment in reversed(list(zip(keys, fragments))):
+        results.extend(encoders.loads(fragment if fragment is not None else loaded[key]))
+    return results
+
+
+async def load_dynamics(
+        service: TradingService,
+        start_date: datetime,
+        end_date: datetime,
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None,
+        cache: Optional[TieredCache] = None,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None
+) -> bytes:
+    '''
+    Формирует готовое JSON-тело ответа с динамикой торгов за период
+    
+    С page_size возвращается одна страница начиная с cursor (см. load_dynamics_page).
+    Иначе, если передан cache, результаты собираются из фрагментов по торговым дням
+    (см. load_dynamics_by_day), а без него запрашиваются из БД целиком.
+    '''
+    if page_size is not None:
+        return await load_dynamics_page(
+            service,
+            start_date,
+            end_date,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id,
+            page_size,
+            cursor
+        )
+    if cache is not None:
+        results = await load_dynamics_by_day(
+            service,
+            cache,
+            start_date,
+            end_date,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id
+        )
+    else:
+        results = serializers.result_records(await service.get_dynamics(
+            start_date, 
+            end_date, 
+            oil_id, 
+            delivery_type_id, 
+            delivery_basis_id
+        ))
+    return serializers.dynamics_body(results, start_date, end_date)
+
+
+async def load_dynamics_page(
+        service: TradingService,
+        start_date: datetime,
+        end_date: datetime,
+        oil_id: Optional[int],
+        delivery_type_id: Optional[int],
+        delivery_basis_id: Optional[int],
+        page_size: int,
+        cursor: Optional[str] = None
+) -> bytes:
+    '''
+    Формирует JSON-тело одной страницы динамики торгов
+    
+    Запрашивается на одну запись больше page_size: если она есть, в ответ
+    добавляется next_cursor с ключом последней записи страницы.
+    '''
+    after = decode_cursor(cursor) if cursor is not None else None
+    rows = await service.get_dynamics(
+        start_date,
+        end_date,
+        oil_id,
+        delivery_type_id,
+        delivery_basis_id,
+        limit=page_size + 1,
+        after=after
+    )
+    page = rows[:page_size]
+    next_cursor = None
+    if len(rows) > page_size:
+        next_cursor = encode_cursor(page[-1].trading_date, page[-1].id)
+    return serializers.dynamics_body(serializers.result_records(page), start_date, end_date, next_cursor)
+
+
+async def load_trading_results(
+        service: TradingService,
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None,
+        limit: int = 100
+) -> bytes:
+    '''Формирует готовое JSON-тело ответа с последними результатами торгов'''
+    results = await service.get_trading_result(
+        oil_id, 
+        delivery_type_id, 
+        delivery_basis_id, 
+        limit
+    )
+    return serializers.trading_results_body(serializers.result_records(results))
+
+
+async def load_daily_summary(
+        service: TradingService,
+        start_date: datetime,
+        end_date: datetime,
+        oil_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None
+) -> bytes:
+    '''Формирует готовое JSON-тело ответа с дневными итогами торгов за период'''
+    rows = await service.get_daily_summary(start_date, end_date, oil_id, delivery_basis_id)
+    return serializers.daily_summary_body(serializers.summary_records(rows), start_date, end_date)
+
+
+async def load_aggregates(
+        service: TradingService,
+        start_date: datetime,
+        end_date: datetime,
+        bucket: TimeBucket = TimeBucket.DAY,
+        group_by: Sequence[GroupField] = (),
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None
+) -> bytes:
+    '''Формирует готовое JSON-тело ответа с агрегатами торгов за период'''
+    fields = group_fields(group_by)
+    rows = await service.get_aggregates(
+        start_date,
+        end_date,
+        bucket,
+        fields,
+        oil_id,
+        delivery_type_id,
+        delivery_basis_id
+    )
+    return serializers.aggregate_body(
+        serializers.aggregate_records(rows),
+        start_date,
+        end_date,
+        TimeBucket(bucket).value,
+        [field.value for field in fields]
+    )
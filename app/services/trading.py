@@ -1,8 +1,49 @@
 from datetime import datetime, timedelta
-from typing import List, Optional
-from sqlalchemy import select, desc
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from sqlalchemy import select, desc, and_, tuple_, func, literal, null, Float, Row, Select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.database import SpimexTradingResult
+from app.aggregation import GroupField, TimeBucket, date_bucket, group_fields
+from app.cache_keys import trading_day
+from app.config import settings
+from app.models.database import SpimexTradingResult, TradingDailySummary, TradingDay
+
+# Колонки, отдаваемые API (поля TradingResult) - без служебных created_at/updated_at.
+# Запросы результатов выбирают только их и возвращают легкие строки Row вместо
+# ORM-объектов: без identity map и инструментирования атрибутов. Row поддерживает
+# доступ по имени (row.trading_date), поэтому модели с from_attributes читают его напрямую.
+RESULT_COLUMNS = (
+    SpimexTradingResult.id,
+    SpimexTradingResult.trading_date,
+    SpimexTradingResult.oil_id,
+    SpimexTradingResult.delivery_type_id,
+    SpimexTradingResult.delivery_basis_id,
+    SpimexTradingResult.volume,
+    SpimexTradingResult.price,
+    SpimexTradingResult.total_value,
+)
+
+# Колонки дневных итогов (поля DailySummary): средневзвешенная цена считается
+# из сумм при чтении, чтобы итоги оставались аддитивными
+SUMMARY_COLUMNS = (
+    TradingDailySummary.trading_date,
+    TradingDailySummary.oil_id,
+    TradingDailySummary.delivery_basis_id,
+    TradingDailySummary.volume,
+    TradingDailySummary.total_value,
+    (TradingDailySummary.total_value / func.nullif(TradingDailySummary.volume, 0, type_=Float)).label("vwap"),
+    TradingDailySummary.min_price,
+    TradingDailySummary.max_price,
+    TradingDailySummary.deals,
+)
+
+
+def whole_days(column, start_date: datetime, end_date: datetime):
+    '''
+    Условие на целые торговые дни периода: от полуночи start_date до полуночи дня,
+    следующего за end_date. Записи конечного дня попадают в период при любом времени,
+    а запросы с разным временем внутри тех же дней выбирают одни и те же строки.
+    '''
+    return and_(column >= trading_day(start_date), column < trading_day(end_date) + timedelta(days=1))
 
 
 class TradingService:
@@ -14,22 +55,64 @@ class TradingService:
         '''
         Получаем список последних торговых дат
 
+        Источник задается настройкой TRADING_DATES_SOURCE: справочник trading_days,
+        рекурсивный skip-scan по индексу trading_date (limit обращений к индексу
+        вместо просмотра всей таблицы) или DISTINCT по всей таблице.
+
         Args:
             limit: Кол-во последних дат для получения
 
         Returns:
             List[datetime]: Список дат в порядке убывания
         '''
-        query = (
-            select(SpimexTradingResult.trading_date)
-            .distinct()
-            .order_by(desc(SpimexTradingResult.trading_date))
-            .limit(limit)
-        )
+        source = settings.TRADING_DATES_SOURCE.lower()
+        if source == "table":
+            query = (
+                select(TradingDay.trading_date)
+                .order_by(desc(TradingDay.trading_date))
+                .limit(limit)
+            )
+        elif source == "skip_scan":
+            query = self._last_trading_dates_skip_scan(limit)
+        else:
+            query = (
+                select(SpimexTradingResult.trading_date)
+                .distinct()
+                .order_by(desc(SpimexTradingResult.trading_date))
+                .limit(limit)
+            )
 
         result = await self.session.execute(query)
         dates = result.scalars().all()
         return dates
+
+    @staticmethod
+    def _last_trading_dates_skip_scan(limit: Optional[int]=None) -> Select:
+        '''
+        Последние торговые даты рекурсивным запросом (loose index scan)
+
+        Каждый шаг берет max(trading_date) меньше предыдущей даты - один спуск
+        по индексу, поэтому время зависит от limit, а не от числа строк.
+        Без limit возвращаются все даты (заполнение справочника trading_days).
+        '''
+        days = select(
+            func.max(SpimexTradingResult.trading_date).label("trading_date"),
+            literal(1).label("n")
+        ).cte("days", recursive=True)
+        previous = (
+            select(func.max(SpimexTradingResult.trading_date))
+            .where(SpimexTradingResult.trading_date < days.c.trading_date)
+            .scalar_subquery()
+        )
+        step = select(previous, days.c.n + 1).where(days.c.trading_date.is_not(None))
+        if limit is not None:
+            step = step.where(days.c.n < limit)
+        days = days.union_all(step)
+        return (
+            select(days.c.trading_date)
+            .where(days.c.trading_date.is_not(None))
+            .order_by(desc(days.c.trading_date))
+        )
     
     async def get_dynamics(
             self,
@@ -37,26 +120,82 @@ class TradingService:
             end_date:datetime,
             oil_id: Optional[int]=None,
             delivery_type_id: Optional[int]=None,
-            delivery_basis_id: Optional[int]=None
-    ) -> List[SpimexTradingResult]:
+            delivery_basis_id: Optional[int]=None,
+            limit: Optional[int]=None,
+            after: Optional[Tuple[datetime, int]]=None
+    ) -> List[Row]:
         '''Получает данные о торгах за указанный период с фильтрацией.
         
+        Результаты упорядочены по (trading_date, id) по убыванию. Для постраничного
+        чтения передается after - (trading_date, id) последней записи предыдущей
+        страницы: выборка продолжается с нее по индексу, без OFFSET.
+        
         Args:
-            start_date: Начальная дата периода
-            end_date: Конечная дата периода
+            start_date: Начальный торговый день периода (время не учитывается)
+            end_date: Конечный торговый день периода включительно (время не учитывается)
             oil_id: ID типа нефтепродукта (опционально)
             delivery_type_id: ID типа поставки (опционально)
             delivery_basis_id: ID базиса поставки (опционально)
+            limit: Максимальное количество записей (опционально)
+            after: Курсор - ключ последней полученной записи (опционально)
             
         Returns:
-            List[SpimexTradingResults]: Список результатов торгов
+            List[Row]: Список результатов торгов (колонки RESULT_COLUMNS)
+        '''
+        query = self._dynamics_query(
+            start_date,
+            end_date,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id,
+            limit,
+            after
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def stream_dynamics(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+            oil_id: Optional[int]=None,
+            delivery_type_id: Optional[int]=None,
+            delivery_basis_id: Optional[int]=None
+    ) -> AsyncIterator[Row]:
+        '''
+        Как get_dynamics, но отдает записи по мере чтения серверным курсором,
+        не загружая весь результат в память
         '''
+        query = self._dynamics_query(start_date, end_date, oil_id, delivery_type_id, delivery_basis_id)
+        async for row in self._stream(query):
+            yield row
+
+    def _dynamics_query(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+            oil_id: Optional[int]=None,
+            delivery_type_id: Optional[int]=None,
+            delivery_basis_id: Optional[int]=None,
+            limit: Optional[int]=None,
+            after: Optional[Tuple[datetime, int]]=None
+    ) -> Select:
         query = (
-            select(SpimexTradingResult)
-            .where(SpimexTradingResult.trading_date.between(start_date, end_date))
-            .order_by(desc(SpimexTradingResult.trading_date))
+            select(*RESULT_COLUMNS)
+            .where(whole_days(SpimexTradingResult.trading_date, start_date, end_date))
+            .order_by(desc(SpimexTradingResult.trading_date), desc(SpimexTradingResult.id))
         )
 
+        if after is not None:
+            # Сравнение строк (trading_date, id) < (:d, :id), а не раскрытое через OR:
+            # только так PostgreSQL делает курсор границей индекса (trading_date, id),
+            # а не фильтром по всем более новым записям
+            query = query.where(
+                tuple_(SpimexTradingResult.trading_date, SpimexTradingResult.id) < tuple_(*after)
+            )
+        if limit is not None:
+            query = query.limit(limit)
+
         if oil_id is not None:
             query = query.where(SpimexTradingResult.oil_id == oil_id)
         if delivery_type_id is not None:
@@ -64,8 +203,165 @@ class TradingService:
         if delivery_basis_id is not None:
             query = query.where(SpimexTradingResult.delivery_basis_id == delivery_basis_id)
 
+        return query
+
+    async def get_aggregates(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+            bucket: TimeBucket=TimeBucket.DAY,
+            group_by: Sequence[GroupField]=(),
+            oil_id: Optional[int]=None,
+            delivery_type_id: Optional[int]=None,
+            delivery_basis_id: Optional[int]=None
+    ) -> List[Row]:
+        '''
+        Агрегирует результаты торгов за период по интервалам времени в БД
+
+        Для каждого интервала (день, неделя с понедельника, месяц) и комбинации
+        полей group_by считаются сумма объема и стоимости, средневзвешенная цена
+        (VWAP) и OHLC цены: open и close - цены первой и последней по (trading_date, id)
+        записи интервала. Клиенту передаются только агрегаты, а не сырые записи.
+
+        Args:
+            start_date: Начальный торговый день периода
+            end_date: Конечный торговый день периода включительно
+            bucket: Интервал агрегации
+            group_by: Поля группировки (остальные возвращаются как None)
+            oil_id: ID типа нефтепродукта (опционально)
+            delivery_type_id: ID типа поставки (опционально)
+            delivery_basis_id: ID базиса поставки (опционально)
+
+        Returns:
+            List[Row]: Агрегаты в порядке убывания интервала (поля TradingAggregate)
+        '''
+        query = self._aggregates_query(
+            start_date,
+            end_date,
+            bucket,
+            group_by,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id
+        )
+        result = await self.session.execute(query)
+        return result.all()
+
+    def _aggregates_query(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+            bucket: TimeBucket=TimeBucket.DAY,
+            group_by: Sequence[GroupField]=(),
+            oil_id: Optional[int]=None,
+            delivery_type_id: Optional[int]=None,
+            delivery_basis_id: Optional[int]=None
+    ) -> Select:
+        fields = group_fields(group_by)
+        interval = date_bucket(bucket, SpimexTradingResult.trading_date)
+        partition = [interval, *(getattr(SpimexTradingResult, field.value) for field in fields)]
+
+        # Цены первой и последней записи интервала - одним окном (одна сортировка)
+        window = dict(
+            partition_by=partition,
+            order_by=(SpimexTradingResult.trading_date, SpimexTradingResult.id),
+            rows=(None, None)
+        )
+        windowed = (
+            select(
+                interval.label("bucket"),
+                SpimexTradingResult.oil_id,
+                SpimexTradingResult.delivery_type_id,
+                SpimexTradingResult.delivery_basis_id,
+                SpimexTradingResult.volume,
+                SpimexTradingResult.price,
+                SpimexTradingResult.total_value,
+                func.first_value(SpimexTradingResult.price).over(**window).label("open"),
+                func.last_value(SpimexTradingResult.price).over(**window).label("close")
+            )
+            .where(whole_days(SpimexTradingResult.trading_date, start_date, end_date))
+        )
+        if oil_id is not None:
+            windowed = windowed.where(SpimexTradingResult.oil_id == oil_id)
+        if delivery_type_id is not None:
+            windowed = windowed.where(SpimexTradingResult.delivery_type_id == delivery_type_id)
+        if delivery_basis_id is not None:
+            windowed = windowed.where(SpimexTradingResult.delivery_basis_id == delivery_basis_id)
+        windowed = windowed.subquery()
+
+        groups = [windowed.c[field.value] for field in fields]
+        volume = func.sum(windowed.c.volume)
+        total_value = func.sum(windowed.c.total_value)
+        return (
+            select(
+                windowed.c.bucket,
+                *(
+                    windowed.c[field.value] if field in fields else null().label(field.value)
+                    for field in GroupField
+                ),
+                volume.label("volume"),
+                total_value.label("total_value"),
+                (total_value / func.nullif(volume, 0, type_=Float)).label("vwap"),
+                func.max(windowed.c.open).label("open"),
+                func.max(windowed.c.price).label("high"),
+                func.min(windowed.c.price).label("low"),
+                func.max(windowed.c.close).label("close"),
+                func.count().label("deals")
+            )
+            .group_by(windowed.c.bucket, *groups)
+            .order_by(desc(windowed.c.bucket), *groups)
+        )
+
+    async def get_daily_summary(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+            oil_id: Optional[int]=None,
+            delivery_basis_id: Optional[int]=None
+    ) -> List[Row]:
+        '''
+        Получает дневные итоги торгов за период из таблицы trading_daily_summary
+
+        Одна строка на торговый день для каждой пары (нефтепродукт, базис поставки):
+        объем, стоимость, средневзвешенная цена, минимальная и максимальная цена
+        и число записей результатов. Сырые результаты торгов не читаются.
+
+        Args:
+            start_date: Начальный торговый день периода
+            end_date: Конечный торговый день периода включительно
+            oil_id: ID типа нефтепродукта (опционально)
+            delivery_basis_id: ID базиса поставки (опционально)
+
+        Returns:
+            List[Row]: Итоги (колонки SUMMARY_COLUMNS) в порядке убывания даты
+        '''
+        query = self._daily_summary_query(start_date, end_date, oil_id, delivery_basis_id)
         result = await self.session.execute(query)
-        return result.scalars().all()
+        return result.all()
+
+    def _daily_summary_query(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+            oil_id: Optional[int]=None,
+            delivery_basis_id: Optional[int]=None
+    ) -> Select:
+        query = (
+            select(*SUMMARY_COLUMNS)
+            .where(whole_days(TradingDailySummary.trading_date, start_date, end_date))
+            .order_by(
+                desc(TradingDailySummary.trading_date),
+                TradingDailySummary.oil_id,
+                TradingDailySummary.delivery_basis_id
+            )
+        )
+
+        if oil_id is not None:
+            query = query.where(TradingDailySummary.oil_id == oil_id)
+        if delivery_basis_id is not None:
+            query = query.where(TradingDailySummary.delivery_basis_id == delivery_basis_id)
+
+        return query
     
     async def get_trading_result(
             self,
@@ -73,7 +369,7 @@ class TradingService:
             delivery_type_id:Optional[int]=None,
             delivery_basis_id:Optional[int]=None,
             limit:int=100
-    ) -> List[SpimexTradingResult]:
+    ) -> List[Row]:
         '''
         Получает последние результаты торгов с фильтрацией.
         
@@ -84,10 +380,33 @@ class TradingService:
             limit: Ограничение количества записей
             
         Returns:
-            List[SpimexTradingResults]: Список последних результатов торгов
+            List[Row]: Список последних результатов торгов (колонки RESULT_COLUMNS)
         '''
+        query = self._trading_result_query(oil_id, delivery_type_id, delivery_basis_id, limit)
+        result = await self.session.execute(query)
+        return result.all()
+
+    async def stream_trading_result(
+            self,
+            oil_id:Optional[int]=None,
+            delivery_type_id:Optional[int]=None,
+            delivery_basis_id:Optional[int]=None,
+            limit:int=100
+    ) -> AsyncIterator[Row]:
+        '''Как get_trading_result, но отдает записи по мере чтения серверным курсором'''
+        query = self._trading_result_query(oil_id, delivery_type_id, delivery_basis_id, limit)
+        async for row in self._stream(query):
+            yield row
+
+    def _trading_result_query(
+            self,
+            oil_id:Optional[int]=None,
+            delivery_type_id:Optional[int]=None,
+            delivery_basis_id:Optional[int]=None,
+            limit:int=100
+    ) -> Select:
         query = (
-            select(SpimexTradingResult)
+            select(*RESULT_COLUMNS)
             .order_by(desc(SpimexTradingResult.trading_date))
             .limit(limit)
         )
@@ -99,5 +418,16 @@ class TradingService:
         if delivery_basis_id is not None:
             query = query.where(SpimexTradingResult.delivery_basis_id == delivery_basis_id)
 
-        result = await self.session.execute(query)
-        return result.scalars().all()
\ No newline at end of file
+        return query
+
+    async def _stream(self, query: Select) -> AsyncIterator[Row]:
+        '''
+        Читает результат запроса серверным курсором порциями по STREAM_CHUNK_SIZE строк
+
+        Строки Row не попадают в identity map, поэтому память сессии не растет с их числом.
+        '''
+        result = await self.session.stream(
+            query.execution_options(yield_per=settings.STREAM_CHUNK_SIZE)
+        )
+        async for row in result:
+            yield row
@@ -0,0 +1,39 @@
+from enum import Enum
+from typing import AsyncIterator
+
+from app import encoders, serializers
+
+
+class StreamFormat(str, Enum):
+    '''Формат потоковой выдачи результатов'''
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
+MEDIA_TYPES = {
+    StreamFormat.NDJSON: "application/x-ndjson",
+    StreamFormat.JSON: "application/json"
+}
+
+
+async def ndjson_lines(rows: AsyncIterator) -> AsyncIterator[bytes]:
+    '''Сериализует записи результатов торгов по одной в строки NDJSON по мере их поступления'''
+    async for row in rows:
+        yield encoders.dumps(serializers.result_record(row)) + b"\n"
+
+
+async def json_array_chunks(rows: AsyncIterator) -> AsyncIterator[bytes]:
+    '''Сериализует записи результатов торгов в JSON-массив, отдавая его частями по мере поступления'''
+    separator = b"["
+    async for row in rows:
+        yield separator + encoders.dumps(serializers.result_record(row))
+        separator = b","
+    # Пустой результат - пустой массив
+    yield b"]" if separator == b"," else b"[]"
+
+
+def stream_body(rows: AsyncIterator, stream_format: StreamFormat) -> AsyncIterator[bytes]:
+    '''Тело потокового ответа в выбранном формате'''
+    if stream_format == StreamFormat.NDJSON:
+        return ndjson_lines(rows)
+    return json_array_chunks(rows)
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+from typing import List
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from app.config import settings
+from app.models.database import SpimexTradingResult, TradingDay
+from app.services.trading import TradingService
+
+TABLE = SpimexTradingResult.__tablename__
+DAYS_TABLE = TradingDay.__tablename__
+
+
+def postgres_ddl(table: str = TABLE) -> List[str]:
+    '''
+    DDL триггеров PostgreSQL, поддерживающих справочник trading_days
+
+    Триггеры срабатывают раз на запрос (FOR EACH STATEMENT) и читают измененные
+    строки из переходных таблиц, поэтому пакетная загрузка результатов стоит
+    одного INSERT ... ON CONFLICT DO NOTHING по ее датам, а не по строке на строку.
+    '''
+    function = f"{DAYS_TABLE}_sync"
+    ddl = [
+        f"""
+        CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {DAYS_TABLE} (trading_date)
+                SELECT DISTINCT trading_date FROM new_rows
+                ON CONFLICT DO NOTHING;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {DAYS_TABLE} d
+                USING (SELECT DISTINCT trading_date FROM old_rows) o
+                WHERE d.trading_date = o.trading_date
+                  AND NOT EXISTS (SELECT 1 FROM {table} r WHERE r.trading_date = o.trading_date);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    ]
+    transitions = {
+        "INSERT": "NEW TABLE AS new_rows",
+        "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "DELETE": "OLD TABLE AS old_rows"
+    }
+    for operation, referencing in transitions.items():
+        trigger = f"{DAYS_TABLE}_{operation.lower()}"
+        ddl.append(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+        ddl.append(
+            f"CREATE TRIGGER {trigger} AFTER {operation} ON {table} "
+            f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+    return ddl
+
+
+def sqlite_ddl(table: str = TABLE) -> List[str]:
+    '''DDL триггеров SQLite (построчных: переходных таблиц в SQLite нет)'''
+    insert_new = (
+        f"INSERT OR IGNORE INTO {DAYS_TABLE} (trading_date) "
+        "SELECT NEW.trading_date WHERE NEW.trading_date IS NOT NULL;"
+    )
+    delete_old = (
+        f"DELETE FROM {DAYS_TABLE} WHERE trading_date = OLD.trading_date "
+        f"AND NOT EXISTS (SELECT 1 FROM {table} WHERE trading_date = OLD.trading_date);"
+    )
+    bodies = {
+        "insert": ("INSERT", insert_new),
+        "update": ("UPDATE OF trading_date", insert_new + " " + delete_old),
+        "delete": ("DELETE", delete_old)
+    }
+    ddl = []
+    for name, (event, body) in bodies.items():
+        trigger = f"{DAYS_TABLE}_{name}"
+        ddl.append(f"DROP TRIGGER IF EXISTS {trigger}")
+        ddl.append(f"CREATE TRIGGER {trigger} AFTER {event} ON {table} FOR EACH ROW BEGIN {body} END")
+    return ddl
+
+
+async def sync_trading_days(conn: AsyncConnection) -> int:
+    '''
+    Приводит справочник trading_days в соответствие с таблицей результатов
+
+    Даты читаются skip-scan по индексу trading_date (по одному спуску на дату).
+
+    Returns:
+        int: Количество дат в справочнике
+    '''
+    actual = set((await conn.execute(TradingService._last_trading_dates_skip_scan())).scalars().all())
+    stored = set((await conn.execute(select(TradingDay.trading_date))).scalars().all())
+    missing = sorted(actual - stored)
+    if missing:
+        await conn.execute(TradingDay.__table__.insert(), [{"trading_date": day} for day in missing])
+    stale = stored - actual
+    if stale:
+        await conn.execute(delete(TradingDay).where(TradingDay.trading_date.in_(stale)))
+    return len(actual)
+
+
+async def install(engine: AsyncEngine) -> int:
+    '''
+    Создает справочник trading_days, триггеры на таблице результатов и заполняет справочник
+
+    Повторный вызов безопасен: триггеры пересоздаются, справочник досинхронизируется.
+    После переноса таблицы в секции (python -m app.partitioning migrate) триггеры
+    остаются на прежней таблице - установку нужно повторить.
+
+    Returns:
+        int: Количество дат в справочнике
+    '''
+    if engine.dialect.name == "postgresql":
+        ddl = postgres_ddl()
+    elif engine.dialect.name == "sqlite":
+        ddl = sqlite_ddl()
+    else:
+        raise RuntimeError(f"Триггеры trading_days не поддерживаются для {engine.dialect.name}")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(TradingDay.__table__.create, checkfirst=True)
+        if engine.dialect.name == "postgresql":
+            # Блокировка записи на время установки: строки, вставленные между
+            # созданием триггеров и заполнением справочника, не будут пропущены
+            await conn.execute(text(f"LOCK TABLE {TABLE} IN SHARE MODE"))
+        for statement in ddl:
+            await conn.execute(text(statement))
+        return await sync_trading_days(conn)
+
+
+async def _run() -> None:
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        print(f"Справочник {DAYS_TABLE} заполнен, дат: {await install(engine)}")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    '''
+    Установка справочника торговых дат
+
+        python -m app.trading_days install
+
+    Затем TRADING_DATES_SOURCE=table переключает /api/trading/dates на справочник.
+    '''
+    parser = argparse.ArgumentParser(description="Справочник торговых дат trading_days")
+    parser.add_argument("command", choices=["install"])
+    parser.parse_args()
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Request
+
+from app.cache import POPULARITY_KEY, TieredCache, get_reset_ttl
+from app.config import settings
+from app.cache_keys import trading_dates_key, dynamics_key, trading_results_key
+from app.services.cached_queries import (
+    trading_dates_tags,
+    period_tags,
+    trading_results_tags,
+    load_trading_dates,
+    load_dynamics,
+    load_trading_results
+)
+from app.services.trading import TradingService
+
+logger = logging.getLogger(__name__)
+
+
+def format_spec(endpoint: str, **params: Any) -> str:
+    '''
+    Формирует описание запроса для прогрева в виде endpoint?param=value
+
+    Параметры со значением None опускаются, остальные сортируются по имени,
+    чтобы одинаковые запросы давали одинаковую строку.
+    '''
+    query = urlencode(sorted((name, value) for name, value in params.items() if value is not None))
+    return f"{endpoint}?{query}" if query else endpoint
+
+
+def parse_spec(spec: str) -> Tuple[str, Dict[str, str]]:
+    '''Разбирает описание запроса на имя эндпоинта и параметры'''
+    endpoint, _, query = spec.partition("?")
+    return endpoint, dict(parse_qsl(query))
+
+
+def dynamics_spec(
+        start_date: datetime,
+        end_date: datetime,
+        oil_id: Optional[int] = None,
+        delivery_type_id: Optional[int] = None,
+        delivery_basis_id: Optional[int] = None,
+        page_size: Optional[int] = None
+) -> str:
+    '''
+    Описание запроса динамики для учета популярности.
+
+    Окно, заканчивающееся сегодняшним днем, запоминается относительно (days=N),
+    чтобы на следующий день прогревалось то же "последние N дней", а не вчерашний период.
+    '''
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    filters = {
+        "oil_id": oil_id,
+        "delivery_type_id": delivery_type_id,
+        "delivery_basis_id": delivery_basis_id,
+        "page_size": page_size
+    }
+    if end_date == today and start_date == datetime.combine(start_date.date(), datetime.min.time()):
+        return format_spec("dynamics", days=(end_date - start_date).days, **filters)
+    return format_spec(
+        "dynamics",
+        start_date=start_date.isoformat(),
+        end_date=end_date.isoformat(),
+        **filters
+    )
+
+
+def _optional_int(params: Dict[str, str], name: str) -> Optional[int]:
+    value = params.get(name)
+    return int(value) if value is not None else None
+
+
+class ResolvedSpec(NamedTuple):
+    '''Ключ кеша, функция загрузки ответа и теги записи для описания запроса'''
+    key: str
+    load: Callable[[], Awaitable[str]]
+    tags: List[str]
+
+
+def resolve_spec(
+        spec: str,
+        service: TradingService,
+        cache: Optional[TieredCache] = None
+) -> ResolvedSpec:
+    '''
+    Преобразует описание запроса в ключ кеша, функцию загрузки ответа и теги
+
+    Args:
+        spec: Описание запроса (см. format_spec)
+        service: Сервис для выполнения запроса к БД
+        cache: Кеш для сборки динамики из фрагментов по торговым дням
+
+    Returns:
+        ResolvedSpec: Ключ кеша, корутина-функция, формирующая ответ, и теги записи
+
+    Raises:
+        ValueError: Неизвестный эндпоинт или некорректные параметры
+    '''
+    endpoint, params = parse_spec(spec)
+    filters = {
+        "oil_id": _optional_int(params, "oil_id"),
+        "delivery_type_id": _optional_int(params, "delivery_type_id"),
+        "delivery_basis_id": _optional_int(params, "delivery_basis_id")
+    }
+
+    if endpoint == "dates":
+        limit = int(params.get("limit", 10))
+        return ResolvedSpec(
+            trading_dates_key(limit),
+            lambda: load_trading_dates(service, limit),
+            trading_dates_tags()
+        )
+
+    if endpoint == "results":
+        limit = int(params.get("limit", 100))
+        return ResolvedSpec(
+            trading_results_key(limit=limit, **filters),
+            lambda: load_trading_results(service, limit=limit, **filters),
+            trading_results_tags(filters["oil_id"])
+        )
+
+    if endpoint == "dynamics":
+        if "days" in params:
+            end_date = datetime.combine(datetime.now().date(), datetime.min.time())
+            start_date = end_date - timedelta(days=int(params["days"]))
+        else:
+            start_date = datetime.fromisoformat(params["start_date"])
+            end_date = datetime.fromisoformat(params["end_date"])
+        page_size = _optional_int(params, "page_size")
+        return ResolvedSpec(
+            dynamics_key(start_date, end_date, **filters, page_size=page_size),
+            lambda: load_dynamics(service, start_date, end_date, **filters, cache=cache, page_size=page_size),
+            period_tags(start_date, end_date, filters["oil_id"])
+        )
+
+    raise ValueError(f"Неизвестный эндпоинт для прогрева: {endpoint}")
+
+
+class CacheWarmer:
+    '''
+    Прогревает популярные ключи кеша сразу после ежедневного сброса.
+
+    Список запросов складывается из настроенного WARMUP_QUERIES и самых популярных
+    запросов, накопленных по обращениям к эндпоинтам. Запросы выполняются
+    не более чем по WARMUP_CONCURRENCY одновременно, чтобы не нагружать БД.
+    '''
+
+    def __init__(self, cache: TieredCache, session_factory: Callable[[], Any]):
+        self.cache = cache
+        self.session_factory = session_factory
+        # Ссылки на фоновые задачи, запущенные через start()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def specs(self) -> List[str]:
+        '''Настроенные и самые популярные запросы без повторов'''
+        configured = [spec.strip() for spec in settings.WARMUP_QUERIES.split(";") if spec.strip()]
+        learned = await self.cache.redis_cache.top_scored(POPULARITY_KEY, settings.WARMUP_TOP_LEARNED)
+        # Редкие запросы не должны накапливаться в Redis бесконечно
+        await self.cache.redis_cache.trim_scored(POPULARITY_KEY, settings.WARMUP_TOP_LEARNED * 10)
+        return list(dict.fromkeys(configured + learned))
+
+    async def _warm_one(self, spec: str, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            try:
+                async with self.session_factory() as session:
+                    key, load, tags = resolve_spec(spec, TradingService(session), self.cache)
+                    await self.cache.get_or_compute(await self.cache.namespaced(key), load, tags=tags)
+                return True
+            except Exception:
+                logger.exception("Не удалось прогреть запрос %s", spec)
+                return False
+
+    async def warm(self, specs: List[str]) -> int:
+        '''Прогревает переданные запросы и возвращает количество успешных'''
+        semaphore = asyncio.Semaphore(settings.WARMUP_CONCURRENCY)
+        results = await asyncio.gather(*(self._warm_one(spec, semaphore) for spec in specs))
+        return sum(results)
+
+    async def run(self) -> int:
+        '''Прогревает все запросы из specs()'''
+        return await self.warm(await self.specs())
+
+    async def start(self) -> List[str]:
+        '''Запускает прогрев в фоне и возвращает список прогреваемых запросов'''
+        specs = await self.specs()
+        task = asyncio.create_task(self.warm(specs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return specs
+
+    async def run_forever(self) -> None:
+        '''
+        Фоновый цикл: периодически выгружает счетчики популярности в Redis
+        и запускает прогрев через WARMUP_DELAY_SECONDS после каждого сброса кеша.
+        '''
+        while True:
+            next_warmup = monotonic() + get_reset_ttl() + settings.WARMUP_DELAY_SECONDS
+            while (remaining := next_warmup - monotonic()) > 0:
+                await asyncio.sleep(min(remaining, settings.WARMUP_FLUSH_INTERVAL))
+                try:
+                    await self.cache.flush_popularity()
+                except Exception:
+                    logger.exception("Не удалось сохранить популярность запросов")
+            try:
+                warmed = await self.run()
+                logger.info("Прогрето запросов: %s", warmed)
+            except Exception:
+                logger.exception("Ошибка прогрева кеша")
+
+
+# Dependency для FastAPI
+def get_warmer(request: Request) -> CacheWarmer:
+    '''Возвращает задачу прогрева, созданную в lifespan приложения'''
+    return request.app.state.warmer
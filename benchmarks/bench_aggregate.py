@@ -0,0 +1,101 @@
+"""
+Бенчмарк: агрегаты за год в БД против сырых записей, агрегируемых клиентом.
+
+"client" - динамика за период (JSON-тело /api/trading/dynamics) и агрегация
+по месяцам и нефтепродуктам на стороне клиента после разбора JSON.
+"sql" - TradingService.get_aggregates: GROUP BY по интервалу в БД, клиенту
+передаются только агрегаты.
+
+Данные лежат в SQLite в памяти; измеряется время и размер передаваемого тела.
+
+Запуск:
+    python -m benchmarks.bench_aggregate --rows 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import serializers
+from app.aggregation import GroupField, TimeBucket
+from app.models.database import Base, SpimexTradingResult
+from app.services.cached_queries import load_aggregates
+from app.services.trading import TradingService
+
+START = datetime(2024, 1, 1)
+END = START + timedelta(days=364)
+
+
+async def seed(session: AsyncSession, rows: int) -> None:
+    batch = 100000
+    for offset in range(0, rows, batch):
+        await session.execute(insert(SpimexTradingResult), [
+            {
+                "trading_date": START + timedelta(days=i % 365),
+                "oil_id": i % 10,
+                "delivery_type_id": i % 3,
+                "delivery_basis_id": i % 20,
+                "volume": 100.0 + i % 7,
+                "price": 50.0 + i % 11,
+                "total_value": (100.0 + i % 7) * (50.0 + i % 11),
+                "created_at": START,
+                "updated_at": START
+            }
+            for i in range(offset, min(offset + batch, rows))
+        ])
+    await session.commit()
+
+
+async def client_side(service: TradingService) -> int:
+    rows = await service.get_dynamics(START, END)
+    body = serializers.dynamics_body(serializers.result_records(rows), START, END)
+    totals = {}
+    for record in sorted(json.loads(body)["result"], key=lambda record: (record["trading_date"], record["id"])):
+        key = (record["trading_date"][:7], record["oil_id"])
+        volume, value, open_, high, low, _ = totals.get(key, (0.0, 0.0, record["price"], record["price"], record["price"], 0))
+        price = record["price"]
+        totals[key] = (volume + record["volume"], value + record["total_value"], open_, max(high, price), min(low, price), price)
+    return len(body)
+
+
+async def sql_side(service: TradingService) -> int:
+    body = await load_aggregates(service, START, END, TimeBucket.MONTH, [GroupField.OIL_ID])
+    json.loads(body)
+    return len(body)
+
+
+async def run(rows: int, repeat: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        await seed(session, rows)
+        service = TradingService(session)
+        print(f"rows={rows}")
+        for name, func in (("client", client_side), ("sql", sql_side)):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                size = await func(service)
+            elapsed = (time.perf_counter() - started) / repeat
+            print(f"{name:7} {elapsed * 1000:9.1f} ms  {size / 1024:10.1f} KiB")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        asyncio.run(run(rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
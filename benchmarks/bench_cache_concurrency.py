@@ -0,0 +1,100 @@
+"""
+Бенчмарк: p99 задержки при конкурентных обращениях к кешу из event loop.
+
+Сравнивает синхронный RedisCache (блокирует event loop на время round-trip)
+с AsyncRedisCache. По умолчанию Redis эмулируется с фиксированной сетевой
+задержкой; с флагом --redis используется реальный сервер из настроек.
+
+Запуск:
+    python -m benchmarks.bench_cache_concurrency --requests 500 --latency-ms 2
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+from app.cache import AsyncRedisCache, RedisCache
+
+
+PAYLOAD = json.dumps({"dates": ["2024-01-01T00:00:00"] * 10, "total": 10})
+
+
+class SlowSyncRedis:
+    """Синхронный клиент с имитацией сетевой задержки"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get(self, key):
+        time.sleep(self.latency)
+        return PAYLOAD
+
+
+class SlowAsyncRedis:
+    """Асинхронный клиент с имитацией сетевой задержки"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def get(self, key):
+        await asyncio.sleep(self.latency)
+        return PAYLOAD
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(handler, requests: int) -> List[float]:
+    latencies: List[float] = []
+    # Все запросы приходят одновременно, задержка считается от момента прихода
+    arrived = time.perf_counter()
+
+    async def one_request(i: int):
+        await handler(f"trading_dates:{i % 10}")
+        latencies.append(time.perf_counter() - arrived)
+
+    await asyncio.gather(*(one_request(i) for i in range(requests)))
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    print(
+        f"{name:<8} p50={statistics.median(latencies) * 1000:8.2f} ms  "
+        f"p99={percentile(latencies, 0.99) * 1000:8.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--redis", action="store_true", help="Использовать реальный Redis из настроек")
+    args = parser.parse_args()
+
+    if args.redis:
+        sync_cache = RedisCache()
+        async_cache = AsyncRedisCache()
+        sync_cache.redis_client.set("trading_dates:0", PAYLOAD)
+    else:
+        sync_cache = RedisCache.__new__(RedisCache)
+        sync_cache.redis_client = SlowSyncRedis(args.latency_ms / 1000)
+        async_cache = AsyncRedisCache(redis_client=SlowAsyncRedis(args.latency_ms / 1000))
+
+    async def sync_handler(key: str):
+        # Так обработчики вызывали кеш до перехода на redis.asyncio
+        return sync_cache.get(key)
+
+    report("before", await run(sync_handler, args.requests))
+    report("after", await run(async_cache.get, args.requests))
+
+    if args.redis:
+        await async_cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
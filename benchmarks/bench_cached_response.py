@@ -0,0 +1,77 @@
+"""
+Бенчмарк: CPU на одно попадание в кеш для /api/trading/results.
+
+"before" - прежний путь: json.loads строки из Redis, валидация моделью
+TradingResultsResponse и повторная сериализация (как делал FastAPI по response_model).
+"after" - в кеше хранится готовое тело ответа, которое отдается как есть.
+
+Запуск:
+    python -m benchmarks.bench_cached_response --rows 1000 --repeat 200
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+from app.models.response import TradingResultsResponse
+
+
+def make_payload(rows: int) -> dict:
+    now = datetime(2024, 5, 10)
+    return {
+        "result": [
+            {
+                "id": i,
+                "trading_date": now - timedelta(days=i % 30),
+                "oil_id": i % 50,
+                "delivery_type_id": i % 3,
+                "delivery_basis_id": i % 20,
+                "volume": 100.0 + i,
+                "price": 50.0 + i,
+                "total_value": (100.0 + i) * (50.0 + i)
+            }
+            for i in range(rows)
+        ],
+        "total": rows
+    }
+
+
+def before(cached: str) -> bytes:
+    data = json.loads(cached)
+    model = TradingResultsResponse.model_validate(data)
+    return json.dumps(jsonable_encoder(model)).encode("utf-8")
+
+
+def after(cached: str) -> bytes:
+    return Response(content=cached, media_type="application/json").body
+
+
+def measure(func, cached: str, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        func(cached)
+    return (time.process_time() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    payload = make_payload(args.rows)
+    old_cached = json.dumps(payload, default=str)
+    new_cached = TradingResultsResponse.model_validate(payload).model_dump_json()
+
+    before_cpu = measure(before, old_cached, args.repeat)
+    after_cpu = measure(after, new_cached, args.repeat)
+    print(f"rows={args.rows}")
+    print(f"before  {before_cpu * 1000:8.3f} ms CPU per hit")
+    print(f"after   {after_cpu * 1000:8.3f} ms CPU per hit  (x{before_cpu / max(after_cpu, 1e-9):.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Бенчмарк: дневные итоги за год из сырых результатов против таблицы итогов.
+
+"raw" - динамика за период (get_dynamics) и суммирование по дням на клиенте.
+"summary" - get_daily_summary: строки trading_daily_summary, поддерживаемой триггерами.
+
+Данные лежат в SQLite в памяти; измеряется время получения итогов за 365 дней
+для одного нефтепродукта и размер JSON-тела ответа.
+
+Запуск:
+    python -m benchmarks.bench_daily_summary --rows 100000 1000000
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import serializers
+from app.daily_summary import install
+from app.models.database import Base, SpimexTradingResult
+from app.services.trading import TradingService
+
+START = datetime(2024, 1, 1)
+END = START + timedelta(days=364)
+
+
+async def seed(session: AsyncSession, rows: int) -> None:
+    batch = 100000
+    for offset in range(0, rows, batch):
+        await session.execute(insert(SpimexTradingResult), [
+            {
+                "trading_date": START + timedelta(days=i % 365),
+                "oil_id": i % 10,
+                "delivery_type_id": i % 3,
+                "delivery_basis_id": i % 5,
+                "volume": 100.0 + i % 7,
+                "price": 50.0 + i % 11,
+                "total_value": (100.0 + i % 7) * (50.0 + i % 11),
+                "created_at": START,
+                "updated_at": START
+            }
+            for i in range(offset, min(offset + batch, rows))
+        ])
+    await session.commit()
+
+
+async def raw_body(service: TradingService) -> bytes:
+    rows = await service.get_dynamics(START, END, oil_id=1)
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for row in rows:
+        total = totals[(row.trading_date, row.delivery_basis_id)]
+        total[0] += row.volume
+        total[1] += row.total_value
+    return serializers.dynamics_body(serializers.result_records(rows), START, END)
+
+
+async def summary_body(service: TradingService) -> bytes:
+    rows = await service.get_daily_summary(START, END, oil_id=1)
+    return serializers.daily_summary_body(serializers.summary_records(rows), START, END)
+
+
+async def run(rows: int, repeat: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await install(engine)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        await seed(session, rows)
+        service = TradingService(session)
+        print(f"rows={rows}")
+        for name, func in (("raw", raw_body), ("summary", summary_body)):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                body = await func(service)
+            elapsed = (time.perf_counter() - started) / repeat
+            print(f"{name:8} {elapsed * 1000:9.2f} ms  {len(body) / 1024:9.1f} KiB")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        asyncio.run(run(rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Бенчмарк: формирование тела /api/trading/results из строк БД.
+
+"model" - прежний путь: валидация строк моделью TradingResultsResponse
+(from_attributes) и model_dump_json.
+"direct" - app.serializers: строки Row читаются позиционно в порядке полей
+модели и сериализуются кодировщиком app.encoders без валидации.
+
+Строки Row читаются из SQLite в памяти запросом TradingService.
+
+Запуск:
+    python -m benchmarks.bench_direct_serializer --rows 1000 --repeat 200
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import serializers
+from app.models.database import Base, SpimexTradingResult
+from app.models.response import TradingResultsResponse
+from app.services.trading import TradingService
+
+
+async def load_rows(rows: int) -> list:
+    now = datetime(2024, 5, 10)
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        await session.execute(insert(SpimexTradingResult), [
+            {
+                "trading_date": now - timedelta(days=i % 30),
+                "oil_id": i % 50,
+                "delivery_type_id": i % 3,
+                "delivery_basis_id": i % 20,
+                "volume": 100.0 + i,
+                "price": 50.0 + i,
+                "total_value": (100.0 + i) * (50.0 + i),
+                "created_at": now,
+                "updated_at": now
+            }
+            for i in range(rows)
+        ])
+        result = await TradingService(session).get_trading_result(limit=rows)
+    await engine.dispose()
+    return result
+
+
+def model_body(rows: list) -> bytes:
+    return TradingResultsResponse(result=rows, total=len(rows)).model_dump_json().encode("utf-8")
+
+
+def direct_body(rows: list) -> bytes:
+    return serializers.trading_results_body(serializers.result_records(rows))
+
+
+def measure(func, rows: list, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        func(rows)
+    return (time.process_time() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = asyncio.run(load_rows(args.rows))
+    model_cpu = measure(model_body, rows, args.repeat)
+    direct_cpu = measure(direct_body, rows, args.repeat)
+    print(f"rows={args.rows}")
+    print(f"model   {model_cpu * 1000:8.3f} ms CPU per response")
+    print(f"direct  {direct_cpu * 1000:8.3f} ms CPU per response  (x{model_cpu / max(direct_cpu, 1e-9):.1f})")
+
+
+if __name__ == "__main__":
+    main()
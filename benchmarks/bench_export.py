@@ -0,0 +1,92 @@
+"""
+Бенчмарк: колоночная выгрузка против JSON для больших периодов.
+
+"json" - путь /api/trading/dynamics: ORM-объекты SpimexTradingResult, валидация
+моделью TradingDynamicsResponse и сериализация в JSON.
+"arrow" / "parquet" - путь /api/trading/export: строки-кортежи БД сразу
+упаковываются в колоночные буферы (нужен pyarrow).
+
+Измеряется CPU на построение ответа из уже прочитанных строк и размер тела.
+
+Запуск:
+    python -m benchmarks.bench_export --rows 100000 --repeat 5
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from app import export
+from app.models.database import SpimexTradingResult
+from app.models.response import TradingDynamicsResponse
+from app.services.trading import RESULT_COLUMNS
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 12, 31)
+
+
+def make_rows(rows: int) -> list:
+    return [
+        (
+            i,
+            START + timedelta(days=i % 365),
+            i % 50,
+            i % 3,
+            i % 20,
+            100.0 + i,
+            50.0 + i,
+            (100.0 + i) * (50.0 + i)
+        )
+        for i in range(rows)
+    ]
+
+
+def as_json(rows: list) -> bytes:
+    names = [column.key for column in RESULT_COLUMNS]
+    results = [SpimexTradingResult(**dict(zip(names, row))) for row in rows]
+    return TradingDynamicsResponse(
+        result=results,
+        total=len(results),
+        start_date=START,
+        end_date=END
+    ).model_dump_json().encode("utf-8")
+
+
+def as_arrow(rows: list) -> bytes:
+    return export.serialize_table(export.rows_to_table(rows), export.ExportFormat.ARROW)
+
+
+def as_parquet(rows: list) -> bytes:
+    return export.serialize_table(export.rows_to_table(rows), export.ExportFormat.PARQUET)
+
+
+def measure(func, rows: list, repeat: int):
+    body = b""
+    started = time.process_time()
+    for _ in range(repeat):
+        body = func(rows)
+    return (time.process_time() - started) / repeat, len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not export.is_available():
+        raise SystemExit("pyarrow не установлен: pip install pyarrow")
+
+    rows = make_rows(args.rows)
+    json_cpu, json_size = measure(as_json, rows, args.repeat)
+    print(f"rows={args.rows}")
+    print(f"json     {json_cpu * 1000:9.1f} ms CPU  {json_size / 1024:10.0f} KiB")
+    for name, func in (("arrow", as_arrow), ("parquet", as_parquet)):
+        cpu, size = measure(func, rows, args.repeat)
+        print(
+            f"{name:8} {cpu * 1000:9.1f} ms CPU  {size / 1024:10.0f} KiB"
+            f"  (CPU x{json_cpu / max(cpu, 1e-9):.1f}, size x{json_size / max(size, 1):.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Бенчмарк: JSON-кодировщики на типичном теле ответа динамики торгов.
+
+"json default=str" - прежний путь кеша: стандартный json с вызовом str()
+для каждой даты. Остальные строки - кодировщики app.encoders (orjson, ujson,
+json), доступные в окружении; даты сериализуются в ISO 8601.
+
+Запуск:
+    python -m benchmarks.bench_json_encoders --rows 5000 --repeat 50
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from app import encoders
+from app.serializers import RESULT_FIELDS
+
+START = datetime(2024, 1, 1)
+
+
+def make_payload(rows: int) -> dict:
+    records = [
+        dict(zip(RESULT_FIELDS, (
+            i,
+            START + timedelta(days=i % 365),
+            i % 50,
+            i % 3,
+            i % 20,
+            100.0 + i,
+            50.0 + i,
+            (100.0 + i) * (50.0 + i)
+        )))
+        for i in range(rows)
+    ]
+    return {
+        "result": records,
+        "total": rows,
+        "start_date": START,
+        "end_date": START + timedelta(days=364),
+        "next_cursor": None
+    }
+
+
+def measure(func, value, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        func(value)
+    return (time.process_time() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    payload = make_payload(args.rows)
+    print(f"rows={args.rows}")
+
+    def legacy(value):
+        return json.dumps(value, default=str).encode("utf-8")
+
+    body = legacy(payload)
+    base_dumps = measure(legacy, payload, args.repeat)
+    base_loads = measure(json.loads, body, args.repeat)
+    print(f"{'json default=str':18} dumps {base_dumps * 1000:8.2f} ms  loads {base_loads * 1000:8.2f} ms")
+
+    for name in ("orjson", "ujson", "json"):
+        try:
+            encoder = encoders.get_encoder(name)
+        except RuntimeError:
+            print(f"{name:18} не установлен")
+            continue
+        body = encoder.dumps(payload)
+        dumps_cpu = measure(encoder.dumps, payload, args.repeat)
+        loads_cpu = measure(encoder.loads, body, args.repeat)
+        print(
+            f"{name:18} dumps {dumps_cpu * 1000:8.2f} ms  loads {loads_cpu * 1000:8.2f} ms"
+            f"  (dumps x{base_dumps / max(dumps_cpu, 1e-9):.1f}, loads x{base_loads / max(loads_cpu, 1e-9):.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Бенчмарк: чтение результатов торгов ORM-объектами против строк Row.
+
+"orm" - прежний путь: select(SpimexTradingResult) с созданием ORM-объектов
+(identity map, инструментирование, лишние created_at/updated_at) и чтением их
+моделью TradingDynamicsResponse через from_attributes.
+"core" - текущий путь TradingService: select(*RESULT_COLUMNS) и строки Row.
+
+Данные лежат в SQLite в памяти; измеряются CPU и пик выделенной памяти
+(tracemalloc) на выборку и сериализацию ответа.
+
+Запуск:
+    python -m benchmarks.bench_row_hydration --rows 10000 100000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import desc, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.database import Base, SpimexTradingResult
+from app.models.response import TradingDynamicsResponse
+from app.services.trading import RESULT_COLUMNS
+
+START = datetime(2024, 1, 1)
+
+
+async def seed(session: AsyncSession, rows: int) -> None:
+    await session.execute(insert(SpimexTradingResult), [
+        {
+            "trading_date": START + timedelta(days=i % 365),
+            "oil_id": i % 50,
+            "delivery_type_id": i % 3,
+            "delivery_basis_id": i % 20,
+            "volume": 100.0 + i,
+            "price": 50.0 + i,
+            "total_value": (100.0 + i) * (50.0 + i),
+            "created_at": START,
+            "updated_at": START
+        }
+        for i in range(rows)
+    ])
+    await session.commit()
+
+
+async def orm_body(session: AsyncSession) -> str:
+    result = await session.execute(
+        select(SpimexTradingResult).order_by(desc(SpimexTradingResult.trading_date))
+    )
+    rows = result.scalars().all()
+    body = TradingDynamicsResponse(result=rows, total=len(rows), start_date=START, end_date=START).model_dump_json()
+    session.expunge_all()
+    return body
+
+
+async def core_body(session: AsyncSession) -> str:
+    result = await session.execute(
+        select(*RESULT_COLUMNS).order_by(desc(SpimexTradingResult.trading_date))
+    )
+    rows = result.all()
+    return TradingDynamicsResponse(result=rows, total=len(rows), start_date=START, end_date=START).model_dump_json()
+
+
+async def measure(func, session: AsyncSession):
+    # CPU и память меряются отдельными прогонами: tracemalloc сам замедляет выделения
+    started = time.process_time()
+    await func(session)
+    cpu = time.process_time() - started
+    tracemalloc.start()
+    await func(session)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+async def run(rows: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        await seed(session, rows)
+        orm_cpu, orm_peak = await measure(orm_body, session)
+        core_cpu, core_peak = await measure(core_body, session)
+    await engine.dispose()
+
+    print(f"rows={rows}")
+    print(f"orm   {orm_cpu * 1000:9.1f} ms CPU  {orm_peak / 2 ** 20:8.1f} MiB peak")
+    print(
+        f"core  {core_cpu * 1000:9.1f} ms CPU  {core_peak / 2 ** 20:8.1f} MiB peak"
+        f"  (CPU x{orm_cpu / max(core_cpu, 1e-9):.1f}, memory x{orm_peak / max(core_peak, 1):.1f})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        asyncio.run(run(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Бенчмарк: последние торговые даты тремя источниками TRADING_DATES_SOURCE.
+
+"distinct" - прежний запрос: DISTINCT по всей таблице результатов.
+"skip_scan" - рекурсивный запрос: limit спусков по индексу trading_date.
+"table" - справочник trading_days, поддерживаемый триггерами.
+
+Данные лежат в SQLite в памяти; измеряется время одного запроса.
+
+Запуск:
+    python -m benchmarks.bench_trading_dates --rows 100000 1000000 --limit 10
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.models.database import Base, SpimexTradingResult
+from app.services.trading import TradingService
+from app.trading_days import install
+
+START = datetime(2024, 1, 1)
+SOURCES = ("distinct", "skip_scan", "table")
+
+
+async def seed(session: AsyncSession, rows: int) -> None:
+    batch = 100000
+    for offset in range(0, rows, batch):
+        await session.execute(insert(SpimexTradingResult), [
+            {
+                "trading_date": START - timedelta(days=i % 2500),
+                "oil_id": i % 50,
+                "delivery_type_id": i % 3,
+                "delivery_basis_id": i % 20,
+                "volume": 1.0,
+                "price": 1.0,
+                "total_value": 1.0,
+                "created_at": START,
+                "updated_at": START
+            }
+            for i in range(offset, min(offset + batch, rows))
+        ])
+    await session.commit()
+
+
+async def run(rows: int, limit: int, repeat: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        await seed(session, rows)
+        await install(engine)
+        service = TradingService(session)
+        print(f"rows={rows} limit={limit}")
+        for source in SOURCES:
+            with patch.object(settings, "TRADING_DATES_SOURCE", source):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    await service.get_last_trading_dates(limit)
+                elapsed = (time.perf_counter() - started) / repeat
+            print(f"{source:10} {elapsed * 1000:9.3f} ms")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        asyncio.run(run(rows, args.limit, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
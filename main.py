@@ -1,31 +1,96 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from contextlib import asynccontextmanager, suppress
+import asyncio
 import uvicorn
-import json
 
 from app.models.database import Base
 from app.models.response import (
     LastTradingDatesResponse, 
     TradingDynamicsResponse,
+    TradingDailySummaryResponse,
+    TradingAggregateResponse,
     TradingResultsResponse
 )
 from app.services.trading import TradingService
-from app.cache import RedisCache, get_cache
+from app.services.cached_queries import (
+    trading_dates_tags,
+    period_tags,
+    trading_results_tags,
+    tags_for_date,
+    tags_for_oil,
+    latest_trading_date,
+    load_trading_dates,
+    load_dynamics,
+    load_daily_summary,
+    load_aggregates,
+    load_trading_results
+)
+from app.cache_keys import (
+    trading_day,
+    trading_dates_key,
+    dynamics_key,
+    daily_summary_key,
+    aggregate_key,
+    trading_results_key
+)
+from app.pagination import decode_cursor
+from app.streaming import MEDIA_TYPES, StreamFormat, stream_body
+from app.aggregation import GroupField, TimeBucket, group_fields
+from app import daily_summary, export
+from app.encoders import EncodedJSONResponse
+from app.partitioning import maintain_partitions
+from app.warmup import CacheWarmer, dynamics_spec, format_spec, get_warmer
+from app.http_cache import cache_headers, is_not_modified
+from app.cache import AsyncRedisCache, TieredCache, get_cache, get_period_ttl
 from app.config import settings
 
 # Настройка базы данных
 engine = create_async_engine(settings.DATABASE_URL)
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Жизненный цикл приложения
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Создает таблицы и общий на весь процесс двухуровневый кеш (L1 в памяти + Redis
+    с ограниченным пулом соединений), запускает фоновый прогрев кеша после сброса,
+    подписку на инвалидации от других воркеров и создание будущих секций таблицы результатов.
+    При остановке приложения пул корректно закрывается.
+    """
+    async with engine.begin() as conn:
+        # Создаем таблицы, если они не существуют
+        await conn.run_sync(Base.metadata.create_all)
+
+    app.state.cache = TieredCache(AsyncRedisCache())
+    app.state.warmer = CacheWarmer(app.state.cache, async_session)
+    background_tasks = [
+        asyncio.create_task(app.state.cache.listen_invalidations()),
+        asyncio.create_task(maintain_partitions(engine))
+    ]
+    if settings.WARMUP_ENABLED:
+        background_tasks.append(asyncio.create_task(app.state.warmer.run_forever()))
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await app.state.cache.close()
+
 # Создание приложения FastAPI
 app = FastAPI(
     title=settings.API_TITLE,
     description="API для получения данных о торгах СПИМЕКС",
-    version=settings.API_VERSION
+    version=settings.API_VERSION,
+    lifespan=lifespan,
+    default_response_class=EncodedJSONResponse
 )
 
 # Настройка CORS
@@ -45,12 +110,27 @@ async def get_db():
     finally:
         await db.close()
 
-# Инициализация базы данных
-@app.on_event("startup")
-async def startup():
-    async with engine.begin() as conn:
-        # Создаем таблицы, если они не существуют
-        await conn.run_sync(Base.metadata.create_all)
+def in_own_session(loader, *args):
+    """
+    Загрузчик ответа для фонового обновления кеша.
+    Выполняется в собственной сессии БД, так как сессия запроса к этому моменту уже закрыта.
+    """
+    async def load():
+        async with async_session() as session:
+            return await loader(TradingService(session), *args)
+    return load
+
+def stream_in_own_session(stream, *args):
+    """
+    Записи для потоковой выдачи из метода stream_* сервиса.
+    Читаются в собственной сессии БД: тело ответа передается уже после выхода
+    из обработчика, и курсор должен жить до конца передачи.
+    """
+    async def rows():
+        async with async_session() as session:
+            async for row in stream(TradingService(session), *args):
+                yield row
+    return rows()
 
 @app.get("/", tags=["Info"])
 async def root():
@@ -60,6 +140,8 @@ async def root():
         "endpoints": [
             "/api/trading/dates",
             "/api/trading/dynamics",
+            "/api/trading/dynamics/summary",
+            "/api/trading/aggregate",
             "/api/trading/results"
         ]
     }
@@ -68,49 +150,57 @@ async def root():
          response_model=LastTradingDatesResponse, 
          tags=["Trading"])
 async def get_last_trading_dates(
+    request: Request,
     limit: int = Query(10, description="Количество последних дат для получения", gt=0, le=100),
     db: AsyncSession = Depends(get_db),
-    cache: RedisCache = Depends(get_cache)
+    cache: TieredCache = Depends(get_cache)
 ):
     """
     Получение списка последних торговых дат.
     
     - **limit**: Количество последних дат для получения (по умолчанию 10, максимум 100)
     """
-    # Создание ключа кеша, основанного на параметрах запроса
-    cache_key = f"trading_dates:{limit}"
-    
-    # Проверка наличия данных в кеше
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return cached_data
+    # Создание ключа кеша, основанного на параметрах запроса, в текущем поколении
+    cache_key = await cache.namespaced(trading_dates_key(limit))
     
     # Получение данных, если они не в кеше
-    service = TradingService(db)
-    dates = await service.get_last_trading_dates(limit)
+    async def load():
+        return await load_trading_dates(TradingService(db), limit)
     
-    # Формирование ответа
-    response = {
-        "dates": dates,
-        "total": len(dates)
-    }
+    # Одновременные промахи по одному ключу выполняют запрос к БД один раз,
+    # устаревшее после сброса значение отдается сразу и обновляется в фоне
+    body = await cache.get_or_compute_entry(
+        cache_key,
+        load,
+        spec=format_spec("dates", limit=limit),
+        refresh=in_own_session(load_trading_dates, limit),
+        tags=trading_dates_tags()
+    )
     
-    # Сохранение в кеш
-    cache.set(cache_key, response)
+    # Клиент с актуальной копией получает 304 без тела; ETag - от отдаваемой записи кеша
+    headers = cache_headers(body, await latest_trading_date(TradingService(db), cache))
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
     
-    return response
+    # Тело уже сериализовано при вычислении в формате response_model - отдаем как есть,
+    # без валидации моделью (схема OpenAPI по-прежнему строится по response_model)
+    return Response(content=body.data, media_type="application/json", headers=headers)
 
 @app.get("/api/trading/dynamics", 
          response_model=TradingDynamicsResponse, 
          tags=["Trading"])
 async def get_dynamics(
+    request: Request,
     start_date: datetime = Query(..., description="Начальная дата периода (YYYY-MM-DD)"),
     end_date: datetime = Query(..., description="Конечная дата периода (YYYY-MM-DD)"),
     oil_id: Optional[int] = Query(None, description="ID типа нефтепродукта"),
     delivery_type_id: Optional[int] = Query(None, description="ID типа поставки"),
     delivery_basis_id: Optional[int] = Query(None, description="ID базиса поставки"),
+    page_size: Optional[int] = Query(None, description="Размер страницы (без него возвращается весь период)", gt=0, le=10000),
+    cursor: Optional[str] = Query(None, description="Курсор страницы из next_cursor предыдущего ответа"),
+    stream: Optional[StreamFormat] = Query(None, description="Потоковая выдача записей без кеша: ndjson или json (массив)"),
     db: AsyncSession = Depends(get_db),
-    cache: RedisCache = Depends(get_cache)
+    cache: TieredCache = Depends(get_cache)
 ):
     """
     Получение данных о торгах за указанный период.
@@ -120,56 +210,274 @@ async def get_dynamics(
     - **oil_id**: ID типа нефтепродукта (опционально)
     - **delivery_type_id**: ID типа поставки (опционально)
     - **delivery_basis_id**: ID базиса поставки (опционально)
+    - **page_size**: Размер страницы (опционально); следующая страница запрашивается с cursor=next_cursor
+    - **cursor**: Курсор страницы (опционально, только вместе с page_size)
+    - **stream**: Потоковая выдача всех записей периода (опционально): `ndjson` - по записи
+      в строке, `json` - JSON-массив записей; память воркера не зависит от числа записей
     """
     # Проверка валидности дат
     if start_date > end_date:
         raise HTTPException(status_code=400, detail="Начальная дата не может быть позже конечной")
     
+    # Данные хранятся с точностью до торгового дня: 2024-01-01 и 2024-01-01T10:00
+    # дают один ответ и один ключ кеша, запрос выбирает дни периода целиком
+    start_date, end_date = trading_day(start_date), trading_day(end_date)
+    
     # Ограничиваем период до 365 дней для оптимизации
     if (end_date - start_date).days > 365:
         raise HTTPException(status_code=400, detail="Период не может превышать 365 дней")
     
-    # Создание ключа кеша, основанного на параметрах запроса
-    cache_key = f"dynamics:{start_date.isoformat()}:{end_date.isoformat()}:{oil_id}:{delivery_type_id}:{delivery_basis_id}"
+    # Проверка курсора страницы
+    if cursor is not None:
+        if page_size is None:
+            raise HTTPException(status_code=400, detail="Курсор передается только вместе с page_size")
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Некорректный курсор")
     
-    # Проверка наличия данных в кеше
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return cached_data
+    # Потоковая выдача для выгрузок: записи идут клиенту по мере чтения из БД, минуя кеш
+    if stream is not None:
+        if page_size is not None:
+            raise HTTPException(status_code=400, detail="Потоковая выдача не поддерживает page_size")
+        rows = stream_in_own_session(
+            TradingService.stream_dynamics,
+            start_date,
+            end_date,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id
+        )
+        return StreamingResponse(stream_body(rows, stream), media_type=MEDIA_TYPES[stream])
     
-    # Получение данных, если они не в кеше
-    service = TradingService(db)
-    results = await service.get_dynamics(
-        start_date, 
-        end_date, 
-        oil_id, 
-        delivery_type_id, 
-        delivery_basis_id
+    # Создание ключа кеша, основанного на параметрах запроса, в текущем поколении
+    cache_key = await cache.namespaced(
+        dynamics_key(start_date, end_date, oil_id, delivery_type_id, delivery_basis_id, page_size, cursor)
     )
     
-    # Формирование ответа
-    response = {
-        "result": results,
-        "total": len(results),
-        "start_date": start_date,
-        "end_date": end_date
-    }
+    # Получение данных, если они не в кеше: период собирается из закешированных
+    # торговых дней, в БД запрашиваются только отсутствующие (страница - одним запросом по курсору)
+    async def load():
+        return await load_dynamics(
+            TradingService(db),
+            start_date,
+            end_date,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id,
+            cache,
+            page_size,
+            cursor
+        )
+    
+    # Период, закончившийся до последней загруженной даты, больше не изменится: клиенты и CDN
+    # хранят его долго. В Redis ответ живет до ежедневного сброса (поколение сбрасывается
+    # после каждой загрузки), долго хранятся фрагменты его закрытых дней
+    latest = await latest_trading_date(TradingService(db), cache)
+    max_age = get_period_ttl(end_date, latest)
+    
+    # Одновременные промахи по одному ключу выполняют запрос к БД один раз,
+    # устаревшее после сброса значение отдается сразу и обновляется в фоне
+    body = await cache.get_or_compute_entry(
+        cache_key,
+        load,
+        # Для прогрева запоминаются только первые страницы: курсоры меняются вместе с данными
+        spec=dynamics_spec(
+            start_date, end_date, oil_id, delivery_type_id, delivery_basis_id, page_size
+        ) if cursor is None else None,
+        refresh=in_own_session(
+            load_dynamics,
+            start_date,
+            end_date,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id,
+            cache,
+            page_size,
+            cursor
+        ),
+        tags=period_tags(start_date, end_date, oil_id)
+    )
+    
+    # Клиент с актуальной копией получает 304 без тела; ETag - от отдаваемой записи кеша
+    headers = cache_headers(body, latest, max_age)
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    
+    # Тело уже сериализовано при вычислении в формате response_model - отдаем как есть,
+    # без валидации моделью (схема OpenAPI по-прежнему строится по response_model)
+    return Response(content=body.data, media_type="application/json", headers=headers)
+
+@app.get("/api/trading/dynamics/summary",
+         response_model=TradingDailySummaryResponse,
+         tags=["Trading"])
+async def get_daily_summary(
+    request: Request,
+    start_date: datetime = Query(..., description="Начальная дата периода (YYYY-MM-DD)"),
+    end_date: datetime = Query(..., description="Конечная дата периода (YYYY-MM-DD)"),
+    oil_id: Optional[int] = Query(None, description="ID типа нефтепродукта"),
+    delivery_basis_id: Optional[int] = Query(None, description="ID базиса поставки"),
+    db: AsyncSession = Depends(get_db),
+    cache: TieredCache = Depends(get_cache)
+):
+    """
+    Дневные итоги торгов за период по нефтепродукту и базису поставки.
+    
+    Одна запись на торговый день для каждой пары (oil_id, delivery_basis_id): объем,
+    стоимость, средневзвешенная цена (vwap), минимальная и максимальная цена, число
+    записей (deals). Читается из таблицы trading_daily_summary, а не из сырых результатов.
+    
+    - **start_date**: Начальная дата периода (обязательный параметр)
+    - **end_date**: Конечная дата периода (обязательный параметр)
+    - **oil_id**: ID типа нефтепродукта (опционально)
+    - **delivery_basis_id**: ID базиса поставки (опционально)
+    """
+    # Проверка валидности дат
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Начальная дата не может быть позже конечной")
+    
+    # Период - целые торговые дни, время не учитывается
+    start_date, end_date = trading_day(start_date), trading_day(end_date)
+    
+    # Ограничиваем период до 365 дней для оптимизации
+    if (end_date - start_date).days > 365:
+        raise HTTPException(status_code=400, detail="Период не может превышать 365 дней")
+    
+    # Создание ключа кеша, основанного на параметрах запроса, в текущем поколении
+    cache_key = await cache.namespaced(daily_summary_key(start_date, end_date, oil_id, delivery_basis_id))
+    
+    async def load():
+        # Без триггеров таблица итогов пуста или отстает - не кешируем это как ответ
+        if not await daily_summary.is_installed(await db.connection()):
+            raise HTTPException(
+                status_code=503,
+                detail="Дневные итоги не установлены: выполните python -m app.daily_summary install"
+            )
+        return await load_daily_summary(TradingService(db), start_date, end_date, oil_id, delivery_basis_id)
+    
+    # Итоги закрытого периода больше не изменятся - клиенты и CDN хранят их долго
+    latest = await latest_trading_date(TradingService(db), cache)
+    max_age = get_period_ttl(end_date, latest)
+    
+    body = await cache.get_or_compute_entry(
+        cache_key,
+        load,
+        refresh=in_own_session(load_daily_summary, start_date, end_date, oil_id, delivery_basis_id),
+        tags=period_tags(start_date, end_date, oil_id)
+    )
+    
+    # Клиент с актуальной копией получает 304 без тела; ETag - от отдаваемой записи кеша
+    headers = cache_headers(body, latest, max_age)
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body.data, media_type="application/json", headers=headers)
+
+@app.get("/api/trading/aggregate",
+         response_model=TradingAggregateResponse,
+         tags=["Trading"])
+async def get_aggregates(
+    request: Request,
+    start_date: datetime = Query(..., description="Начальная дата периода (YYYY-MM-DD)"),
+    end_date: datetime = Query(..., description="Конечная дата периода (YYYY-MM-DD)"),
+    bucket: TimeBucket = Query(TimeBucket.DAY, description="Интервал агрегации: day, week или month"),
+    group_by: List[GroupField] = Query([], description="Поля группировки (параметр повторяется)"),
+    oil_id: Optional[int] = Query(None, description="ID типа нефтепродукта"),
+    delivery_type_id: Optional[int] = Query(None, description="ID типа поставки"),
+    delivery_basis_id: Optional[int] = Query(None, description="ID базиса поставки"),
+    db: AsyncSession = Depends(get_db),
+    cache: TieredCache = Depends(get_cache)
+):
+    """
+    Агрегаты результатов торгов за период, посчитанные в БД.
+    
+    Для каждого интервала и комбинации полей группировки: сумма объема и стоимости,
+    средневзвешенная цена (vwap), цены открытия, максимума, минимума и закрытия
+    (open/high/low/close) и число записей (deals).
+    
+    - **start_date**: Начальная дата периода (обязательный параметр)
+    - **end_date**: Конечная дата периода (обязательный параметр)
+    - **bucket**: `day` (по умолчанию), `week` (с понедельника) или `month`
+    - **group_by**: Любые из `oil_id`, `delivery_type_id`, `delivery_basis_id`,
+      например `group_by=oil_id&group_by=delivery_basis_id`; без него - итог по интервалу
+    - **oil_id**, **delivery_type_id**, **delivery_basis_id**: Фильтры (опционально)
+    """
+    # Проверка валидности дат
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Начальная дата не может быть позже конечной")
+    
+    # Период - целые торговые дни, время не учитывается
+    start_date, end_date = trading_day(start_date), trading_day(end_date)
     
-    # Сохранение в кеш
-    cache.set(cache_key, response)
+    # Ограничиваем период до 365 дней для оптимизации
+    if (end_date - start_date).days > 365:
+        raise HTTPException(status_code=400, detail="Период не может превышать 365 дней")
+    
+    # Порядок и повторы полей группировки не влияют на ответ и ключ кеша
+    fields = group_fields(group_by)
+    
+    # Создание ключа кеша, основанного на параметрах запроса, в текущем поколении
+    cache_key = await cache.namespaced(aggregate_key(
+        start_date,
+        end_date,
+        bucket.value,
+        ",".join(field.value for field in fields),
+        oil_id,
+        delivery_type_id,
+        delivery_basis_id
+    ))
     
-    return response
+    async def load():
+        return await load_aggregates(
+            TradingService(db),
+            start_date,
+            end_date,
+            bucket,
+            fields,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id
+        )
+    
+    # Агрегаты закрытого периода больше не изменятся - клиенты и CDN хранят их долго
+    latest = await latest_trading_date(TradingService(db), cache)
+    max_age = get_period_ttl(end_date, latest)
+    
+    body = await cache.get_or_compute_entry(
+        cache_key,
+        load,
+        refresh=in_own_session(
+            load_aggregates,
+            start_date,
+            end_date,
+            bucket,
+            fields,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id
+        ),
+        tags=period_tags(start_date, end_date, oil_id)
+    )
+    
+    # Клиент с актуальной копией получает 304 без тела; ETag - от отдаваемой записи кеша
+    headers = cache_headers(body, latest, max_age)
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body.data, media_type="application/json", headers=headers)
 
 @app.get("/api/trading/results", 
          response_model=TradingResultsResponse, 
          tags=["Trading"])
 async def get_trading_results(
+    request: Request,
     oil_id: Optional[int] = Query(None, description="ID типа нефтепродукта"),
     delivery_type_id: Optional[int] = Query(None, description="ID типа поставки"),
     delivery_basis_id: Optional[int] = Query(None, description="ID базиса поставки"),
     limit: int = Query(100, description="Ограничение количества записей", gt=0, le=1000),
+    stream: Optional[StreamFormat] = Query(None, description="Потоковая выдача записей без кеша: ndjson или json (массив)"),
     db: AsyncSession = Depends(get_db),
-    cache: RedisCache = Depends(get_cache)
+    cache: TieredCache = Depends(get_cache)
 ):
     """
     Получение последних результатов торгов.
@@ -178,44 +486,178 @@ async def get_trading_results(
     - **delivery_type_id**: ID типа поставки (опционально)
     - **delivery_basis_id**: ID базиса поставки (опционально)
     - **limit**: Ограничение количества записей (по умолчанию 100, максимум 1000)
+    - **stream**: Потоковая выдача записей (опционально): `ndjson` или `json` (массив)
     """
-    # Создание ключа кеша, основанного на параметрах запроса
-    cache_key = f"trading_results:{oil_id}:{delivery_type_id}:{delivery_basis_id}:{limit}"
+    # Потоковая выдача для выгрузок: записи идут клиенту по мере чтения из БД, минуя кеш
+    if stream is not None:
+        rows = stream_in_own_session(
+            TradingService.stream_trading_result,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id,
+            limit
+        )
+        return StreamingResponse(stream_body(rows, stream), media_type=MEDIA_TYPES[stream])
     
-    # Проверка наличия данных в кеше
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return cached_data
+    # Создание ключа кеша, основанного на параметрах запроса, в текущем поколении
+    cache_key = await cache.namespaced(
+        trading_results_key(oil_id, delivery_type_id, delivery_basis_id, limit)
+    )
     
     # Получение данных, если они не в кеше
-    service = TradingService(db)
-    results = await service.get_trading_result(
-        oil_id, 
-        delivery_type_id, 
-        delivery_basis_id, 
-        limit
+    async def load():
+        return await load_trading_results(
+            TradingService(db),
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id,
+            limit
+        )
+    
+    # Одновременные промахи по одному ключу выполняют запрос к БД один раз,
+    # устаревшее после сброса значение отдается сразу и обновляется в фоне
+    body = await cache.get_or_compute_entry(
+        cache_key,
+        load,
+        spec=format_spec(
+            "results",
+            oil_id=oil_id,
+            delivery_type_id=delivery_type_id,
+            delivery_basis_id=delivery_basis_id,
+            limit=limit
+        ),
+        refresh=in_own_session(
+            load_trading_results,
+            oil_id,
+            delivery_type_id,
+            delivery_basis_id,
+            limit
+        ),
+        tags=trading_results_tags(oil_id)
     )
     
-    # Формирование ответа
-    response = {
-        "result": results,
-        "total": len(results)
-    }
+    # Клиент с актуальной копией получает 304 без тела; ETag - от отдаваемой записи кеша
+    headers = cache_headers(body, await latest_trading_date(TradingService(db), cache))
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
     
-    # Сохранение в кеш
-    cache.set(cache_key, response)
+    # Тело уже сериализовано при вычислении в формате response_model - отдаем как есть,
+    # без валидации моделью (схема OpenAPI по-прежнему строится по response_model)
+    return Response(content=body.data, media_type="application/json", headers=headers)
+
+@app.get("/api/trading/export",
+         response_class=Response,
+         responses={
+             200: {"content": {media_type: {} for media_type in export.MEDIA_TYPES.values()}},
+             501: {"description": "Не установлен pyarrow"}
+         },
+         tags=["Trading"])
+async def export_dynamics(
+    start_date: datetime = Query(..., description="Начальная дата периода (YYYY-MM-DD)"),
+    end_date: datetime = Query(..., description="Конечная дата периода (YYYY-MM-DD)"),
+    oil_id: Optional[int] = Query(None, description="ID типа нефтепродукта"),
+    delivery_type_id: Optional[int] = Query(None, description="ID типа поставки"),
+    delivery_basis_id: Optional[int] = Query(None, description="ID базиса поставки"),
+    format: export.ExportFormat = Query(export.ExportFormat.ARROW, description="Формат выгрузки: arrow (IPC stream) или parquet"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Колоночная выгрузка результатов торгов за период (Arrow IPC stream или Parquet).
     
-    return response
+    Строки БД сразу упаковываются в колоночные буферы без ORM-объектов и моделей
+    Pydantic - для аналитических клиентов (pandas, polars, DuckDB) это дешевле JSON.
+    Параметры фильтрации те же, что у /api/trading/dynamics. Требует пакет pyarrow.
+    
+    - **format**: `arrow` (по умолчанию) или `parquet`
+    """
+    if not export.is_available():
+        raise HTTPException(status_code=501, detail="Колоночная выгрузка недоступна: не установлен pyarrow")
+    
+    # Проверка валидности дат
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Начальная дата не может быть позже конечной")
+    
+    # Период - целые торговые дни, время не учитывается
+    start_date, end_date = trading_day(start_date), trading_day(end_date)
+    
+    # Ограничиваем период до 365 дней для оптимизации
+    if (end_date - start_date).days > 365:
+        raise HTTPException(status_code=400, detail="Период не может превышать 365 дней")
+    
+    rows = await TradingService(db).get_dynamics(
+        start_date,
+        end_date,
+        oil_id,
+        delivery_type_id,
+        delivery_basis_id
+    )
+    
+    # Упаковка в буферы - CPU-работа, выносим ее из цикла событий
+    content = await asyncio.to_thread(
+        lambda: export.serialize_table(export.rows_to_table(rows), format)
+    )
+    filename = f"dynamics_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{export.FILE_EXTENSIONS[format]}"
+    return Response(
+        content=content,
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # Добавляем эндпоинт для принудительного сброса кеша (только для администраторов)
 @app.post("/api/cache/invalidate", tags=["Admin"])
-async def invalidate_cache(cache: RedisCache = Depends(get_cache)):
+async def invalidate_cache(cache: TieredCache = Depends(get_cache)):
     """
-    Принудительно сбрасывает весь кеш Redis.
+    Принудительно сбрасывает закешированные ответы всех эндпоинтов.
+    Увеличивает поколения ключей, включая фрагменты закрытых дней (O(1) независимо
+    от числа ключей): старые записи перестают читаться и удаляются Redis по TTL,
+    остальные ключи базы не затрагиваются.
     Этот эндпоинт должен быть защищен авторизацией в продакшн-среде.
     """
-    cache.invalidate_all()
-    return {"message": "Кеш успешно сброшен"}
+    generation = await cache.bump_generation(historical=True)
+    return {"message": "Кеш успешно сброшен", "generation": generation}
+
+@app.post("/api/cache/invalidate/date", tags=["Admin"])
+async def invalidate_cache_by_date(
+    trading_date: date = Query(..., description="Торговая дата (YYYY-MM-DD)"),
+    cache: TieredCache = Depends(get_cache)
+):
+    """
+    Сбрасывает только записи кеша, содержащие данные за торговую дату
+    (например, после загрузки или исправления бюллетеня за этот день).
+    Этот эндпоинт должен быть защищен авторизацией в продакшн-среде.
+    """
+    keys = await cache.invalidate_tags(tags_for_date(trading_date))
+    return {"message": f"Кеш за {trading_date.isoformat()} сброшен", "deleted": len(keys)}
+
+@app.post("/api/cache/invalidate/oil", tags=["Admin"])
+async def invalidate_cache_by_oil(
+    oil_id: int = Query(..., description="ID типа нефтепродукта"),
+    cache: TieredCache = Depends(get_cache)
+):
+    """
+    Сбрасывает только записи кеша, зависящие от типа нефтепродукта,
+    включая запросы без фильтра по нефтепродукту.
+    Этот эндпоинт должен быть защищен авторизацией в продакшн-среде.
+    """
+    keys = await cache.invalidate_tags(tags_for_oil(oil_id))
+    return {"message": f"Кеш по нефтепродукту {oil_id} сброшен", "deleted": len(keys)}
+
+@app.post("/api/cache/warmup", tags=["Admin"])
+async def warmup_cache(warmer: CacheWarmer = Depends(get_warmer)):
+    """
+    Запускает прогрев популярных ключей кеша в фоне (например, после загрузки нового торгового дня).
+    Этот эндпоинт должен быть защищен авторизацией в продакшн-среде.
+    """
+    specs = await warmer.start()
+    return {"message": "Прогрев кеша запущен", "queries": specs}
+
+@app.get("/api/cache/stats", tags=["Admin"])
+async def cache_stats(cache: TieredCache = Depends(get_cache)):
+    """
+    Счетчики попаданий и промахов по уровням кеша (L1 - память процесса, L2 - Redis).
+    Значения L1 относятся только к обработавшему запрос воркеру.
+    """
+    return cache.stats()
 
 # Запуск приложения при прямом вызове
 if __name__ == "__main__":
@@ -6,11 +6,14 @@ from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 
 from app.models.database import Base, SpimexTradingResult
-from app.cache import RedisCache, get_cache
+from app.cache import AsyncRedisCache, TieredCache, get_cache
+from app.services.trading import TradingService
 from main import app, get_db
+from tests.fake_redis import FakeAsyncRedis
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
@@ -44,6 +47,27 @@ def redis_mock():
         redis_mock.return_value = redis_client_mock
         yield redis_client_mock
 
+@pytest.fixture
+def async_redis_mock():
+    """Мок для асинхронного Redis клиента"""
+    redis_client_mock = AsyncMock()
+    # pipeline() в redis.asyncio - синхронный вызов, возвращающий асинхронный контекстный менеджер
+    pipeline_mock = MagicMock()
+    pipeline_mock.__aenter__.return_value = pipeline_mock
+    pipeline_mock.execute = AsyncMock(return_value=[])
+    redis_client_mock.pipeline = MagicMock(return_value=pipeline_mock)
+    return redis_client_mock
+
+@pytest.fixture
+async def db_session():
+    """Сессия отдельной in-memory БД с созданными таблицами (одно соединение на тест)"""
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
 @pytest.fixture
 async def async_session():
     """Создает тестовую сессию SQLAlchemy"""
@@ -70,26 +94,48 @@ def override_get_db():
         del app.dependency_overrides[get_db]
 
 @pytest.fixture
-def override_get_cache(redis_mock):
+def app_db_session(db_session):
+    """
+    Сессия отдельной тестовой БД (db_session), из которой читает и приложение:
+    зависимость get_db и собственные сессии (потоковая выдача, фоновое обновление кеша)
+    """
+    async def get_test_db():
+        yield db_session
+    
+    app.dependency_overrides[get_db] = get_test_db
+    factory = sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+    with patch('main.async_session', factory):
+        yield db_session
+    app.dependency_overrides.pop(get_db, None)
+
+@pytest.fixture
+def override_get_cache(async_redis_mock):
     """Переопределяет зависимость get_cache для использования мока"""
     # Оригинальная зависимость
     original_get_cache = get_cache
     
     # Новая зависимость, которая возвращает мок
     def mock_get_cache():
-        cache = RedisCache()
-        cache.redis_client = redis_mock
-        return cache
+        return TieredCache(AsyncRedisCache(redis_client=async_redis_mock))
     
     # Заменяем зависимость
     app.dependency_overrides[get_cache] = mock_get_cache
     
-    yield redis_mock
+    yield async_redis_mock
     
     # Восстанавливаем исходную зависимость
     if get_cache in app.dependency_overrides:
         del app.dependency_overrides[get_cache]
 
+@pytest.fixture
+def fake_cache(override_get_cache):
+    """Переопределяет зависимость get_cache кешем поверх in-memory Redis"""
+    redis = FakeAsyncRedis()
+    cache = TieredCache(AsyncRedisCache(redis_client=redis))
+    app.dependency_overrides[get_cache] = lambda: cache
+    
+    yield cache, redis
+
 @pytest.fixture
 def disable_startup_event():
     """
@@ -169,11 +215,23 @@ async def sample_trading_data(async_session):
 @pytest.fixture
 def mock_cache_get():
     """Мок для метода cache.get"""
-    with patch.object(RedisCache, 'get', return_value=None) as mock:
+    with patch.object(TieredCache, 'get', new_callable=AsyncMock, return_value=None) as mock:
+        # Эндпоинты читают кеш через get_entry_raw, значение из мока считается свежим
+        async def mock_get_entry_raw(key):
+            value = await mock(key)
+            return (value, False) if value is not None else None
+        
+        with patch.object(TieredCache, 'get_entry_raw', side_effect=mock_get_entry_raw):
+            yield mock
+
+@pytest.fixture
+def mock_latest_trading_date():
+    """Мок последней загруженной торговой даты (по умолчанию данных нет)"""
+    with patch.object(TradingService, 'get_last_trading_dates', new_callable=AsyncMock, return_value=[]) as mock:
         yield mock
 
 @pytest.fixture
 def mock_cache_set():
-    """Мок для метода cache.set"""
-    with patch.object(RedisCache, 'set') as mock:
+    """Мок для метода cache.set_raw"""
+    with patch.object(TieredCache, 'set_raw', new_callable=AsyncMock) as mock:
         yield mock
\ No newline at end of file
@@ -0,0 +1,213 @@
+import asyncio
+from time import monotonic
+from typing import Any, Dict, List, Optional
+
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from app.cache import RELEASE_LOCK_SCRIPT
+
+
+class FakeAsyncRedis:
+    """
+    Простая in-memory замена redis.asyncio.Redis для тестов.
+    
+    Поддерживает только команды, используемые кешем приложения. Один экземпляр
+    можно передать нескольким кешам, чтобы имитировать несколько воркеров
+    с общим Redis.
+    """
+    
+    def __init__(self, latency: float = 0.0, socket_timeout: Optional[float] = None):
+        self.latency = latency
+        # Таймаут чтения соединения, как у пула redis.asyncio (None - без таймаута)
+        self.socket_timeout = socket_timeout
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+        # Очереди подписчиков по каналам
+        self.subscribers: Dict[str, List[asyncio.Queue]] = {}
+    
+    async def _tick(self):
+        # Имитация сетевого round-trip, отдающего управление event loop
+        await asyncio.sleep(self.latency)
+    
+    def _alive(self, key: str) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+    
+    async def get(self, key: str) -> Optional[Any]:
+        await self._tick()
+        return self.data.get(key) if self._alive(key) else None
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        await self._tick()
+        return [self.data.get(key) if self._alive(key) else None for key in keys]
+    
+    async def set(self, key: str, value: Any, nx: bool = False, px: Optional[int] = None,
+                  ex: Optional[int] = None) -> Optional[bool]:
+        await self._tick()
+        if nx and self._alive(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if px is not None:
+            self.expires[key] = monotonic() + px / 1000
+        if ex is not None:
+            self.expires[key] = monotonic() + ex
+        return True
+    
+    async def setex(self, key: str, ttl: int, value: Any) -> bool:
+        return await self.set(key, value, ex=ttl)
+    
+    async def incr(self, key: str) -> int:
+        await self._tick()
+        value = int(self.data[key]) + 1 if self._alive(key) else 1
+        self.data[key] = str(value).encode()
+        return value
+    
+    async def delete(self, *keys: str) -> int:
+        await self._tick()
+        deleted = 0
+        for key in keys:
+            if self._alive(key):
+                deleted += 1
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return deleted
+    
+    async def eval(self, script: str, numkeys: int, *args: Any) -> Any:
+        await self._tick()
+        if script == RELEASE_LOCK_SCRIPT:
+            key, token = args[0], args[1]
+            if self._alive(key) and self.data[key] == token:
+                self.data.pop(key, None)
+                self.expires.pop(key, None)
+                return 1
+            return 0
+        raise NotImplementedError(script)
+    
+    async def zincrby(self, key: str, amount: float, member: str) -> float:
+        await self._tick()
+        scores = self.data.setdefault(key, {})
+        scores[member] = scores.get(member, 0) + amount
+        return scores[member]
+    
+    def _ranked(self, key: str) -> List[str]:
+        scores = self.data.get(key, {}) if self._alive(key) else {}
+        return sorted(scores, key=lambda member: (scores[member], member))
+    
+    async def zrevrange(self, key: str, start: int, end: int) -> List[str]:
+        await self._tick()
+        ranked = list(reversed(self._ranked(key)))
+        return ranked[start:end + 1 if end != -1 else None]
+    
+    async def zremrangebyrank(self, key: str, start: int, end: int) -> int:
+        await self._tick()
+        ranked = self._ranked(key)
+        removed = ranked[start:end + 1 if end != -1 else None]
+        for member in removed:
+            del self.data[key][member]
+        return len(removed)
+    
+    async def sadd(self, key: str, *members: Any) -> int:
+        await self._tick()
+        self._alive(key)
+        current = self.data.setdefault(key, set())
+        added = len(set(members) - current)
+        current.update(members)
+        return added
+    
+    async def smembers(self, key: str) -> set:
+        await self._tick()
+        return set(self.data.get(key, set())) if self._alive(key) else set()
+    
+    async def expire(self, key: str, ttl: int) -> bool:
+        await self._tick()
+        if not self._alive(key):
+            return False
+        self.expires[key] = monotonic() + ttl
+        return True
+    
+    async def publish(self, channel: str, message: Any) -> int:
+        await self._tick()
+        queues = self.subscribers.get(channel, [])
+        for queue in queues:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(queues)
+    
+    def pubsub(self) -> "FakePubSub":
+        return FakePubSub(self)
+    
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePubSub:
+    """Подписка на каналы FakeAsyncRedis"""
+    
+    def __init__(self, redis: FakeAsyncRedis):
+        self.redis = redis
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.channels: List[str] = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        for channel in self.channels:
+            self.redis.subscribers[channel].remove(self.queue)
+        self.channels = []
+    
+    async def subscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self.redis.subscribers.setdefault(channel, []).append(self.queue)
+            self.channels.append(channel)
+            self.queue.put_nowait({"type": "subscribe", "channel": channel, "data": 1})
+    
+    async def _read(self, timeout: Optional[float]) -> Dict[str, Any]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            raise RedisTimeoutError("Timeout reading from fake redis") from None
+    
+    async def listen(self):
+        # Как в redis 5.0: блокирующее чтение ограничено socket_timeout соединения
+        while True:
+            yield await self._read(self.redis.socket_timeout)
+    
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: Optional[float] = 0.0):
+        # Явный таймаут заменяет socket_timeout, его истечение - не ошибка
+        try:
+            message = await self._read(timeout if timeout is not None else self.redis.socket_timeout)
+        except RedisTimeoutError:
+            if timeout is None:
+                raise
+            return None
+        if ignore_subscribe_messages and message["type"] != "message":
+            return None
+        return message
+
+
+class FakePipeline:
+    """Pipeline, выполняющий накопленные команды последовательно"""
+    
+    def __init__(self, redis: FakeAsyncRedis):
+        self.redis = redis
+        self.commands = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+    
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+    
+    async def execute(self) -> List[Any]:
+        commands, self.commands = self.commands, []
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in commands]
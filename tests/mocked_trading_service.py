@@ -114,4 +114,30 @@ class MockTradingService:
         service_instance.get_dynamics = self.get_dynamics
         service_instance.get_trading_result = self.get_trading_result
         
-        return service_instance
\ No newline at end of file
+        return service_instance
+
+
+async def add_trading_results(session, days: int = 5, per_day: int = 3, start: datetime = datetime(2024, 1, 1)):
+    """
+    Добавляет в БД по per_day результатов торгов на каждый из days дней начиная со start
+    
+    Args:
+        session: Сессия БД
+        days: Количество торговых дней
+        per_day: Количество записей на день
+        start: Первая торговая дата
+    """
+    for day in range(days):
+        for _ in range(per_day):
+            session.add(SpimexTradingResult(
+                trading_date=start + timedelta(days=day),
+                oil_id=1,
+                delivery_type_id=1,
+                delivery_basis_id=1,
+                volume=1.0,
+                price=1.0,
+                total_value=1.0,
+                created_at=start,
+                updated_at=start
+            ))
+    await session.commit()
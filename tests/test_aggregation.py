@@ -0,0 +1,111 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.aggregation import GroupField, TimeBucket, date_bucket, group_fields
+from app.models.database import SpimexTradingResult
+from app.services.trading import TradingService
+
+
+def result(date: datetime, oil_id: int, basis_id: int, volume: float, price: float) -> SpimexTradingResult:
+    """Результат торгов с заданными датой, ключами, объемом и ценой"""
+    return SpimexTradingResult(
+        trading_date=date,
+        oil_id=oil_id,
+        delivery_type_id=1,
+        delivery_basis_id=basis_id,
+        volume=volume,
+        price=price,
+        total_value=volume * price,
+        created_at=date,
+        updated_at=date
+    )
+
+
+@pytest.fixture
+async def trades(db_session):
+    """Сделки за 1-10 января 2024 (1 января - понедельник) по двум нефтепродуктам"""
+    db_session.add_all([
+        result(datetime(2024, 1, 1), 1, 1, 10, 100),
+        result(datetime(2024, 1, 1), 1, 2, 30, 120),
+        result(datetime(2024, 1, 3), 1, 1, 20, 90),
+        result(datetime(2024, 1, 7), 2, 1, 10, 130),
+        result(datetime(2024, 1, 8), 1, 1, 40, 110),
+        result(datetime(2024, 1, 10), 1, 1, 10, 105),
+    ])
+    await db_session.commit()
+    return TradingService(db_session)
+
+
+class TestDateBucket:
+    """Тесты выражения начала интервала"""
+
+    def test_group_fields_canonical_order(self):
+        """Тест того, что поля группировки упорядочиваются и не повторяются"""
+        assert group_fields(["delivery_basis_id", GroupField.OIL_ID, "delivery_basis_id"]) == [
+            GroupField.OIL_ID, GroupField.DELIVERY_BASIS_ID
+        ]
+
+    def test_postgres_date_trunc(self):
+        """Тест того, что в PostgreSQL интервал считается date_trunc"""
+        sql = str(select(date_bucket(TimeBucket.MONTH, SpimexTradingResult.trading_date)).compile(
+            dialect=postgresql.dialect()
+        ))
+
+        assert "date_trunc('month', spimex_tradinf_result.trading_date)" in sql
+
+    def test_bucket_in_compiled_cache_key(self):
+        """Тест того, что запросы с разными интервалами не делят скомпилированный SQL"""
+        day = select(date_bucket(TimeBucket.DAY, SpimexTradingResult.trading_date))
+        week = select(date_bucket(TimeBucket.WEEK, SpimexTradingResult.trading_date))
+
+        assert day._generate_cache_key() != week._generate_cache_key()
+
+
+class TestAggregates:
+    """Тесты агрегации результатов торгов в БД (SQLite)"""
+
+    async def test_daily_ohlc_without_grouping(self, trades):
+        """Тест итогов по дням: суммы, VWAP и OHLC по порядку записей"""
+        rows = await trades.get_aggregates(datetime(2024, 1, 1), datetime(2024, 1, 3))
+
+        assert [row._asdict() for row in rows] == [
+            {
+                "bucket": datetime(2024, 1, 3), "oil_id": None, "delivery_type_id": None,
+                "delivery_basis_id": None, "volume": 20.0, "total_value": 1800.0, "vwap": 90.0,
+                "open": 90.0, "high": 90.0, "low": 90.0, "close": 90.0, "deals": 1
+            },
+            {
+                "bucket": datetime(2024, 1, 1), "oil_id": None, "delivery_type_id": None,
+                "delivery_basis_id": None, "volume": 40.0, "total_value": 4600.0, "vwap": 115.0,
+                "open": 100.0, "high": 120.0, "low": 100.0, "close": 120.0, "deals": 2
+            },
+        ]
+
+    async def test_weekly_buckets_start_on_monday(self, trades):
+        """Тест недельных интервалов: воскресенье 7 января относится к неделе с 1 января"""
+        rows = await trades.get_aggregates(datetime(2024, 1, 1), datetime(2024, 1, 10), TimeBucket.WEEK)
+
+        assert [(row.bucket, row.open, row.close, row.high, row.low, row.deals) for row in rows] == [
+            (datetime(2024, 1, 8), 110.0, 105.0, 110.0, 105.0, 2),
+            (datetime(2024, 1, 1), 100.0, 130.0, 130.0, 90.0, 4),
+        ]
+
+    async def test_monthly_grouped_by_oil_and_basis(self, trades):
+        """Тест группировки по нефтепродукту и базису с фильтром"""
+        rows = await trades.get_aggregates(
+            datetime(2024, 1, 1),
+            datetime(2024, 1, 31),
+            TimeBucket.MONTH,
+            [GroupField.DELIVERY_BASIS_ID, GroupField.OIL_ID],
+            oil_id=1
+        )
+
+        assert [
+            (row.bucket, row.oil_id, row.delivery_type_id, row.delivery_basis_id, row.volume, row.open, row.close)
+            for row in rows
+        ] == [
+            (datetime(2024, 1, 1), 1, None, 1, 80.0, 100.0, 105.0),
+            (datetime(2024, 1, 1), 1, None, 2, 30.0, 120.0, 120.0),
+        ]
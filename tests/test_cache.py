@@ -1,10 +1,24 @@
+import asyncio
 import pytest
 from datetime import datetime, time
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import json
+import time as time_module
 
-from app.cache import RedisCache
+from app.cache import (
+    RedisCache,
+    AsyncRedisCache,
+    LocalCache,
+    TieredCache,
+    body_etag,
+    create_redis_pool,
+    get_period_ttl,
+    pack_entry,
+    unpack_entry
+)
+from app.compression import decompress
 from app.config import settings
+from tests.fake_redis import FakeAsyncRedis
 
 
 class TestRedisCache:
@@ -119,18 +133,506 @@ class TestRedisCache:
         assert args[1] == 3600
         assert json.loads(args[2]) == test_data
     
-    def test_invalidate_all(self, redis_mock):
-        """Тест очистки всего кеша"""
-        cache = RedisCache()
-        cache.invalidate_all()
-        
-        # Проверяем, что flushdb был вызван
-        redis_mock.flushdb.assert_called_once()
-    
     def test_invalidate_key(self, redis_mock):
         """Тест удаления конкретного ключа из кеша"""
         cache = RedisCache()
         cache.invalidate_key("test_key")
         
         # Проверяем, что delete был вызван с правильным ключом
-        redis_mock.delete.assert_called_with("test_key")
\ No newline at end of file
+        redis_mock.delete.assert_called_with("test_key")
+
+class TestAsyncRedisCache:
+    """Тесты для класса AsyncRedisCache"""
+
+    def test_pool_is_bounded_and_configurable(self):
+        """Тест создания ограниченного пула соединений из настроек"""
+        pool = create_redis_pool()
+
+        assert pool.max_connections == settings.REDIS_MAX_CONNECTIONS
+        assert pool.timeout == settings.REDIS_POOL_TIMEOUT
+        assert pool.connection_kwargs["health_check_interval"] == settings.REDIS_HEALTH_CHECK_INTERVAL
+        assert pool.connection_kwargs["socket_timeout"] == settings.REDIS_SOCKET_TIMEOUT
+
+    async def test_get_existing_data(self, async_redis_mock):
+        """Тест получения существующих данных из кеша"""
+        async_redis_mock.get.return_value = json.dumps({"test": "data"})
+
+        cache = AsyncRedisCache(redis_client=async_redis_mock)
+        result = await cache.get("test_key")
+
+        async_redis_mock.get.assert_awaited_with("test_key")
+        assert result == {"test": "data"}
+
+    async def test_set_with_custom_ttl(self, async_redis_mock):
+        """Тест установки данных в кеш с заданным TTL"""
+        cache = AsyncRedisCache(redis_client=async_redis_mock)
+
+        await cache.set("test_key", {"test": "data"}, ttl=3600)
+
+        args, kwargs = async_redis_mock.setex.call_args
+        blob, soft_expires_at = unpack_entry(args[2])
+        data = decompress(blob)
+        assert args[0] == "test_key"
+        # Запись хранится в Redis дольше на льготный период для отдачи устаревших данных
+        assert args[1] == 3600 + settings.CACHE_STALE_GRACE_SECONDS
+        assert json.loads(data) == {"test": "data"}
+        assert soft_expires_at == pytest.approx(time_module.time() + 3600, abs=5)
+
+    async def test_close_disconnects_pool(self, async_redis_mock):
+        """Тест закрытия клиента и пула при остановке приложения"""
+        async_redis_mock.connection_pool = MagicMock()
+        async_redis_mock.connection_pool.disconnect = AsyncMock()
+        cache = AsyncRedisCache(redis_client=async_redis_mock)
+
+        await cache.close()
+
+        async_redis_mock.aclose.assert_awaited_once()
+        async_redis_mock.connection_pool.disconnect.assert_awaited_once()
+
+    async def test_delete_multiple_keys(self, async_redis_mock):
+        """Тест удаления нескольких ключей одной командой"""
+        async_redis_mock.delete.return_value = 2
+        cache = AsyncRedisCache(redis_client=async_redis_mock)
+
+        deleted = await cache.delete("a", "b")
+
+        async_redis_mock.delete.assert_awaited_once_with("a", "b")
+        assert deleted == 2
+
+    async def test_mget(self, async_redis_mock):
+        """Тест пакетного получения значений с пропусками"""
+        async_redis_mock.mget.return_value = [json.dumps({"a": 1}), None]
+        cache = AsyncRedisCache(redis_client=async_redis_mock)
+
+        result = await cache.mget(["a", "b"])
+
+        async_redis_mock.mget.assert_awaited_once_with(["a", "b"])
+        assert result == [{"a": 1}, None]
+
+    @patch('app.cache.datetime')
+    def test_ttl_same_as_sync_cache_at_month_end(self, mock_datetime, async_redis_mock, redis_mock):
+        """Тест совпадения TTL с RedisCache, в том числе в последний день месяца"""
+        mock_datetime.now.return_value = datetime(2024, 1, 31, 15, 0, 0)
+        settings.CACHE_RESET_HOUR = 14
+        settings.CACHE_RESET_MINUTE = 11
+
+        async_ttl = AsyncRedisCache(redis_client=async_redis_mock)._get_ttl()
+
+        assert async_ttl == RedisCache()._get_ttl()
+        assert async_ttl == (23 * 60 * 60) + (11 * 60)
+
+
+class TestLocalCache:
+    """Тесты для локального LRU-кеша (L1)"""
+
+    def test_evicts_least_recently_used_by_entries(self):
+        """Тест вытеснения самой старой записи при превышении количества"""
+        cache = LocalCache(max_entries=2, max_bytes=1000)
+        cache.set("a", 1, size=1, ttl=60)
+        cache.set("b", 2, size=1, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, size=1, ttl=60)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_evicts_by_bytes(self):
+        """Тест вытеснения записей при превышении лимита по байтам"""
+        cache = LocalCache(max_entries=10, max_bytes=10)
+        cache.set("a", "x", size=6, ttl=60)
+        cache.set("b", "y", size=6, ttl=60)
+
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] == 6
+
+    @patch('app.cache.monotonic')
+    def test_expires_at_reset_deadline(self, mock_monotonic):
+        """Тест истечения записи в момент сброса кеша"""
+        mock_monotonic.return_value = 1000.0
+        cache = LocalCache(max_entries=10, max_bytes=1000)
+        with patch('app.cache.get_reset_ttl', return_value=30):
+            cache.set("a", 1, size=1)
+
+        mock_monotonic.return_value = 1029.0
+        assert cache.get("a") == 1
+        mock_monotonic.return_value = 1030.0
+        assert cache.get("a") is None
+
+
+class TestTieredCache:
+    """Тесты для двухуровневого кеша"""
+
+    async def test_l1_hit_skips_redis(self, async_redis_mock):
+        """Тест того, что повторное чтение обслуживается из L1 без обращения к Redis"""
+        async_redis_mock.get.return_value = json.dumps({"total": 1})
+        cache = TieredCache(AsyncRedisCache(redis_client=async_redis_mock), LocalCache(10, 1000))
+
+        assert await cache.get("k") == {"total": 1}
+        assert await cache.get("k") == {"total": 1}
+
+        assert async_redis_mock.get.await_count == 1
+        stats = cache.stats()
+        assert stats["l1"]["hits"] == 1 and stats["l1"]["misses"] == 1
+        assert stats["l2"]["hits"] == 1 and stats["l2"]["misses"] == 0
+
+    async def test_set_writes_both_tiers(self, async_redis_mock):
+        """Тест записи в Redis и в L1 в декодированном виде"""
+        cache = TieredCache(AsyncRedisCache(redis_client=async_redis_mock), LocalCache(10, 1000))
+
+        await cache.set("k", {"date": datetime(2024, 1, 1)}, ttl=60)
+
+        async_redis_mock.setex.assert_awaited_once()
+        assert await cache.get("k") == {"date": "2024-01-01T00:00:00"}
+        async_redis_mock.get.assert_not_awaited()
+
+    async def test_mget_queries_redis_only_for_l1_misses(self, async_redis_mock):
+        """Тест пакетного чтения с запросом в Redis только промахов L1"""
+        async_redis_mock.mget.return_value = [json.dumps(2)]
+        cache = TieredCache(AsyncRedisCache(redis_client=async_redis_mock), LocalCache(10, 1000))
+        cache.local_cache.set("a", json.dumps(1), size=1, ttl=60)
+
+        assert await cache.mget(["a", "b"]) == [1, 2]
+        async_redis_mock.mget.assert_awaited_once_with(["b"])
+
+
+
+class TestSingleFlight:
+    """Тесты объединения одновременных промахов кеша"""
+
+    async def test_concurrent_misses_compute_once(self):
+        """Тест того, что одновременные промахи в одном процессе выполняют вычисление один раз"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(10, 10000))
+        async def slow_query():
+            await asyncio.sleep(0.01)
+            return '{"total": 1}'
+
+        compute = AsyncMock(side_effect=slow_query)
+
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(50)))
+
+        assert compute.await_count == 1
+        assert all(result == b'{"total": 1}' for result in results)
+        assert cache.stats()["coalesced"] == 49
+
+    async def test_workers_share_redis_lock(self):
+        """Тест того, что второй воркер ждет результат первого вместо запроса в БД"""
+        redis = FakeAsyncRedis(latency=0.001)
+        worker_a = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        worker_b = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        async def slow_query():
+            await asyncio.sleep(0.05)
+            return '{"total": 1}'
+
+        compute = AsyncMock(side_effect=slow_query)
+
+        results = await asyncio.gather(
+            worker_a.get_or_compute("k", compute),
+            worker_b.get_or_compute("k", compute)
+        )
+
+        assert compute.await_count == 1
+        assert results == [b'{"total": 1}', b'{"total": 1}']
+        assert "lock:k" not in redis.data
+
+    async def test_error_propagates_to_waiters(self):
+        """Тест того, что ошибка вычисления получают все ожидающие и ключ не кешируется"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(10, 10000))
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("db down")
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("k", failing) for _ in range(3)),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await cache.get("k") is None
+
+    async def test_cancelled_leader_does_not_cancel_waiters(self):
+        """Тест того, что отмена запроса-лидера не отменяет ожидающих: один из них вычисляет заново"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(10, 10000))
+        started = asyncio.Event()
+
+        async def slow_query():
+            started.set()
+            await asyncio.sleep(0.01)
+            return '{"total": 1}'
+
+        compute = AsyncMock(side_effect=slow_query)
+        leader = asyncio.create_task(cache.get_or_compute("k", compute))
+        await started.wait()
+        waiters = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+
+        assert leader.cancelled()
+        assert results == [b'{"total": 1}'] * 5
+        assert compute.await_count == 2
+        assert not cache._inflight
+
+
+class TestStaleWhileRevalidate:
+    """Тесты отдачи устаревших данных с фоновым обновлением"""
+
+    def test_unpack_legacy_entry(self):
+        """Тест того, что запись без заголовка считается свежей"""
+        assert unpack_entry('{"a": 1}') == (b'{"a": 1}', None)
+        assert unpack_entry(pack_entry(b'{"a": 1}', 10.5)) == (b'{"a": 1}', 10.5)
+
+    async def test_stale_served_and_refreshed_once(self):
+        """Тест того, что устаревшее значение отдается сразу, а обновление запускается один раз"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        await redis.setex("k", 3600, pack_entry(b'{"v": "old"}', time_module.time() - 1))
+        compute = AsyncMock(return_value='{"v": "foreground"}')
+        refreshed = asyncio.Event()
+
+        async def refresh():
+            await asyncio.sleep(0.01)
+            refreshed.set()
+            return '{"v": "new"}'
+
+        refresh_mock = AsyncMock(side_effect=refresh)
+        results = await asyncio.gather(
+            *(cache.get_or_compute("k", compute, refresh=refresh_mock) for _ in range(20))
+        )
+        await asyncio.wait_for(refreshed.wait(), 1)
+        await asyncio.gather(*cache._refresh_tasks)
+
+        assert all(json.loads(result) == {"v": "old"} for result in results)
+        compute.assert_not_awaited()
+        assert refresh_mock.await_count == 1
+        assert await cache.get_or_compute("k", compute, refresh=refresh_mock) == b'{"v": "new"}'
+        assert cache.stats()["stale_served"] == 20
+
+    async def test_entry_etag_follows_served_body(self):
+        """Тест того, что ETag записи - хеш отдаваемого тела, а устаревшее значение помечено"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        await redis.setex("k", 3600, pack_entry(b'{"v": "old"}', time_module.time() - 1))
+        refresh = AsyncMock(return_value='{"v": "new"}')
+
+        stale = await cache.get_or_compute_entry("k", AsyncMock(), refresh=refresh)
+        await asyncio.gather(*cache._refresh_tasks)
+        fresh = await cache.get_or_compute_entry("k", AsyncMock(), refresh=refresh)
+
+        assert (stale.data, stale.etag, stale.stale) == (b'{"v": "old"}', body_etag(b'{"v": "old"}'), True)
+        assert (fresh.data, fresh.etag, fresh.stale) == (b'{"v": "new"}', body_etag(b'{"v": "new"}'), False)
+        # Хеш тела считается один раз и хранится вместе с записью L1
+        assert cache.local_cache._entries["k"][4] == fresh.etag
+
+    async def test_stale_without_refresh_is_recomputed(self):
+        """Тест того, что без refresh устаревшее значение вычисляется заново"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        await redis.setex("k", 3600, pack_entry(b'{"v": "old"}', time_module.time() - 1))
+
+        value = await cache.get_or_compute("k", AsyncMock(return_value='{"v": "new"}'))
+
+        assert value == b'{"v": "new"}'
+        assert await cache.get("k") == {"v": "new"}
+
+    @patch('app.cache.monotonic')
+    def test_local_entry_stale_until_hard_deadline(self, mock_monotonic):
+        """Тест того, что запись L1 после мягкого срока устаревает, а после льготного периода удаляется"""
+        mock_monotonic.return_value = 1000.0
+        cache = LocalCache(max_entries=10, max_bytes=1000)
+        cache.set("a", 1, size=1, ttl=30, grace=60)
+
+        mock_monotonic.return_value = 1031.0
+        assert cache.get("a") is None
+        assert cache.get_entry("a") == (1, True)
+        mock_monotonic.return_value = 1091.0
+        assert cache.get_entry("a") is None
+
+
+
+class TestTagInvalidation:
+    """Тесты точечной инвалидации по тегам"""
+
+    async def test_invalidates_only_tagged_entries(self):
+        """Тест того, что удаляются только записи с тегом, а остальные ключи Redis не трогаются"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        await redis.set("other_app:key", b"keep")
+        await cache.set_raw("a", '{"a": 1}', ttl=60, tags=["date:2024-05-10", "oil:12"])
+        await cache.set_raw("b", '{"b": 1}', ttl=60, tags=["date:2024-05-11", "oil:12"])
+        await cache.set_raw("c", '{"c": 1}', ttl=60, tags=["date:2024-05-11"])
+
+        deleted = await cache.invalidate_tags(["date:2024-05-10"])
+
+        assert deleted == ["a"]
+        assert await cache.get("a") is None
+        assert await cache.get("b") == {"b": 1}
+        assert "tag:date:2024-05-10" not in redis.data
+        # Множество тега может ссылаться на уже удаленные ключи - это безопасно
+        assert "b" in await cache.invalidate_tags(["oil:12"])
+        assert await cache.get("b") is None
+        assert await cache.get("c") == {"c": 1}
+        assert redis.data["other_app:key"] == b"keep"
+
+    async def test_tag_sets_expire_with_entries(self):
+        """Тест того, что множество тега живет не меньше записи и не остается навсегда"""
+        redis = FakeAsyncRedis()
+        cache = AsyncRedisCache(redis_client=redis)
+
+        await cache.set_raw("a", b"1", ttl=60, tags=["oil:1"])
+
+        assert redis.expires["tag:oil:1"] == pytest.approx(redis.expires["a"], abs=1)
+
+    async def test_one_sadd_and_expire_per_tag(self):
+        """Тест того, что пакетная запись регистрирует ключи одним SADD и одним EXPIRE на тег"""
+        redis = FakeAsyncRedis()
+        cache = AsyncRedisCache(redis_client=redis)
+        entries = {f"v0:day:{day}": b"[]" for day in range(3)}
+        tags = {key: ["oil:1", f"date:{day}"] for day, key in enumerate(entries)}
+
+        with patch.object(redis, "sadd", wraps=redis.sadd) as sadd, \
+                patch.object(redis, "expire", wraps=redis.expire) as expire:
+            await cache.set_many_raw(entries, ttl=60, tags=tags)
+
+        assert sadd.call_count == expire.call_count == 4
+        assert redis.data["v0:tag:oil:1"] == set(entries)
+
+    async def test_tag_sets_scoped_to_generation(self):
+        """Тест того, что множества тегов живут в поколении ключей и не читаются после его смены"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        old_key = await cache.namespaced("results")
+        await cache.set_raw(old_key, b"1", ttl=60, tags=["oil:1"])
+        closed_key = await cache.namespaced("dynamics_day", historical=True)
+        await cache.set_raw(closed_key, b"2", ttl=3600, tags=["oil:1"])
+
+        await cache.bump_generation()
+        new_key = await cache.namespaced("results")
+        await cache.set_raw(new_key, b"3", ttl=60, tags=["oil:1"])
+
+        assert redis.data["v0:tag:oil:1"] == {"v0:results"}
+        assert redis.expires["v0:tag:oil:1"] == pytest.approx(redis.expires[old_key], abs=1)
+        assert redis.expires["h0:tag:oil:1"] == pytest.approx(redis.expires[closed_key], abs=1)
+        assert await cache.invalidate_tags(["oil:1"]) == ["h0:dynamics_day", "v1:results"]
+        assert "v0:tag:oil:1" in redis.data
+
+    async def test_invalidation_reaches_other_workers_l1(self):
+        """Тест того, что удаленный ключ пропадает из L1 другого воркера"""
+        redis = FakeAsyncRedis()
+        worker_a = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        worker_b = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        await worker_a.set_raw("k", '{"v": 1}', ttl=60, tags=["oil:1"])
+        assert await worker_b.get("k") == {"v": 1}
+
+        listener = asyncio.create_task(worker_b.listen_invalidations())
+        try:
+            await asyncio.sleep(0)
+            await worker_a.invalidate_tags(["oil:1"])
+            await asyncio.sleep(0.01)
+        finally:
+            listener.cancel()
+
+        assert worker_b.local_cache.get("k") is None
+        assert await worker_b.get("k") is None
+
+    async def test_idle_subscription_keeps_l1(self):
+        """Тест того, что простой канала дольше socket_timeout не сбрасывает L1 и не рвет подписку"""
+        redis = FakeAsyncRedis(socket_timeout=0.02)
+        worker_a = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        worker_b = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        await worker_b.set_raw("k", '{"v": 1}', ttl=60, tags=["oil:1"])
+        await worker_b.set_raw("other", '{"v": 2}', ttl=60)
+
+        with patch("app.cache.INVALIDATION_POLL_SECONDS", 0.01):
+            listener = asyncio.create_task(worker_b.listen_invalidations())
+            try:
+                await asyncio.sleep(0.1)
+                assert worker_b.local_cache.get("k") == b'{"v": 1}'
+
+                await worker_a.invalidate_tags(["oil:1"])
+                await asyncio.sleep(0.05)
+            finally:
+                listener.cancel()
+
+        assert worker_b.local_cache.get("k") is None
+        assert worker_b.local_cache.get("other") == b'{"v": 2}'
+
+    def test_apply_invalidate_all_message(self):
+        """Тест того, что сообщение о полной очистке очищает L1"""
+        cache = TieredCache(AsyncRedisCache(redis_client=AsyncMock()), LocalCache(10, 10000))
+        cache.local_cache.set("a", b"1", size=1, ttl=60)
+
+        cache.apply_invalidation(json.dumps("*"))
+
+        assert cache.local_cache.get("a") is None
+
+
+class TestKeyGenerations:
+    """Тесты сброса кеша увеличением поколения ключей"""
+
+    async def test_bump_makes_old_keys_unreachable(self):
+        """Тест того, что после INCR поколения старые ключи не читаются и доживают по TTL"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        old_key = await cache.namespaced("trading_dates:10")
+        await cache.set_raw(old_key, '{"v": 1}', ttl=60)
+
+        assert await cache.bump_generation() == 1
+
+        new_key = await cache.namespaced("trading_dates:10")
+        assert (old_key, new_key) == ("v0:trading_dates:10", "v1:trading_dates:10")
+        assert await cache.get(new_key) is None
+        assert old_key in redis.expires
+
+    async def test_other_worker_sees_new_generation(self):
+        """Тест того, что другой воркер переходит на новое поколение по уведомлению"""
+        redis = FakeAsyncRedis()
+        worker_a = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        worker_b = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(10, 10000))
+        assert await worker_b.generation() == 0
+
+        listener = asyncio.create_task(worker_b.listen_invalidations())
+        try:
+            await asyncio.sleep(0)
+            await worker_a.bump_generation()
+            await asyncio.sleep(0.01)
+        finally:
+            listener.cancel()
+
+        assert await worker_b.generation() == 1
+
+    async def test_historical_namespace_survives_regular_bump(self):
+        """Тест того, что пространство закрытых дней сбрасывается только полным сбросом"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(10, 10000))
+        assert await cache.namespaced("dynamics_day:date=2024-01-01", historical=True) == "h0:dynamics_day:date=2024-01-01"
+
+        await cache.bump_generation()
+        assert await cache.namespaced("dynamics_day:date=2024-01-01", historical=True) == "h0:dynamics_day:date=2024-01-01"
+
+        assert await cache.bump_generation(historical=True) == 2
+        assert await cache.namespaced("dynamics_day:date=2024-01-01", historical=True) == "h1:dynamics_day:date=2024-01-01"
+
+    async def test_size_stats_ignore_generation(self):
+        """Тест того, что метрики объема группируются по префиксу без номера поколения"""
+        cache = AsyncRedisCache(redis_client=FakeAsyncRedis())
+
+        await cache.set_raw("v3:dynamics:2024-01-01", b"{}", ttl=60)
+        await cache.set_raw("h1:dynamics_day:date=2024-01-01", b"[]", ttl=60)
+
+        assert set(cache.stats()["bytes_by_prefix"]) == {"dynamics", "dynamics_day"}
+
+
+class TestPeriodTtl:
+    """Тесты выбора TTL по периоду данных"""
+
+    def test_closed_period_gets_historical_ttl(self):
+        """Тест того, что период до последней загруженной даты хранится долго"""
+        assert get_period_ttl(datetime(2024, 5, 9), datetime(2024, 5, 10)) == settings.CACHE_HISTORICAL_TTL_SECONDS
+
+    def test_current_period_keeps_daily_reset(self):
+        """Тест того, что период с последним днем, будущими днями или без данных сбрасывается ежедневно"""
+        assert get_period_ttl(datetime(2024, 5, 10, 23, 0), datetime(2024, 5, 10)) is None
+        assert get_period_ttl(datetime(2024, 5, 11), datetime(2024, 5, 10)) is None
+        assert get_period_ttl(datetime(2024, 5, 9), None) is None
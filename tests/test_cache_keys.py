@@ -0,0 +1,44 @@
+from datetime import date, datetime
+
+from app.cache_keys import (
+    MAX_KEY_LENGTH,
+    build_key,
+    dynamics_key,
+    trading_dates_key,
+    trading_day,
+    trading_results_key
+)
+
+
+class TestCacheKeys:
+    """Тесты канонических ключей кеша"""
+
+    def test_dates_normalized_to_trading_day(self):
+        """Тест того, что дата, полночь и момент внутри дня дают один ключ"""
+        keys = {
+            dynamics_key(date(2024, 1, 1), date(2024, 1, 31)),
+            dynamics_key(datetime(2024, 1, 1), datetime(2024, 1, 31)),
+            dynamics_key(datetime(2024, 1, 1, 0, 0, 0, 0), datetime(2024, 1, 31, 18, 30)),
+        }
+
+        assert keys == {"dynamics:end_date=2024-01-31:start_date=2024-01-01"}
+
+    def test_none_filters_omitted_and_params_sorted(self):
+        """Тест того, что None не попадает в ключ, а порядок параметров не важен"""
+        assert trading_results_key(limit=100) == "trading_results:limit=100"
+        assert trading_results_key(12, None, 3, 50) == "trading_results:delivery_basis_id=3:limit=50:oil_id=12"
+        assert build_key("x", b=1, a=2) == build_key("x", a=2, b=1)
+        assert trading_dates_key(10) == "trading_dates:limit=10"
+
+    def test_long_key_hashed_with_prefix(self):
+        """Тест того, что длинный ключ заменяется хешем с сохранением префикса"""
+        key = build_key("dynamics", filter="x" * MAX_KEY_LENGTH)
+
+        assert key.startswith("dynamics:h:")
+        assert len(key) < MAX_KEY_LENGTH
+        assert key == build_key("dynamics", filter="x" * MAX_KEY_LENGTH)
+
+    def test_trading_day(self):
+        """Тест приведения к полуночи торгового дня"""
+        assert trading_day(datetime(2024, 5, 10, 14, 11)) == datetime(2024, 5, 10)
+        assert trading_day(date(2024, 5, 10)) == datetime(2024, 5, 10)
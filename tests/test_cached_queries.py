@@ -0,0 +1,167 @@
+import json
+from datetime import datetime, timedelta
+from time import monotonic
+from unittest.mock import AsyncMock, MagicMock
+
+from app.cache import AsyncRedisCache, LocalCache, TieredCache, get_reset_ttl
+from app.cache_keys import trading_day
+from app.config import settings
+from app.models.database import SpimexTradingResult
+from app.services.cached_queries import load_dynamics
+from app.services.trading import TradingService
+from tests.fake_redis import FakeAsyncRedis
+from tests.mocked_trading_service import create_mock_trading_result
+
+
+def make_service(days: int, latest: datetime = datetime(2024, 2, 1)):
+    """Сервис, у которого по одной сделке в 15:30 на каждый день января 2024"""
+    rows = []
+    for i in range(days):
+        row = create_mock_trading_result(id=i + 1)
+        row.trading_date = datetime(2024, 1, 1, 15, 30) + timedelta(days=i)
+        rows.append(row)
+
+    async def get_dynamics(start_date, end_date, oil_id=None, delivery_type_id=None, delivery_basis_id=None):
+        # Как TradingService: период - целые торговые дни
+        selected = [
+            row for row in rows
+            if trading_day(start_date) <= row.trading_date < trading_day(end_date) + timedelta(days=1)
+        ]
+        return sorted(selected, key=lambda row: row.trading_date, reverse=True)
+
+    service = MagicMock()
+    service.get_dynamics = AsyncMock(side_effect=get_dynamics)
+    service.get_last_trading_dates = AsyncMock(return_value=[latest])
+    return service
+
+
+class TestDynamicsByDay:
+    """Тесты сборки динамики из фрагментов по торговым дням"""
+
+    async def test_overlapping_window_queries_only_new_day(self):
+        """Тест того, что окно на день длиннее запрашивает из БД только недостающий день"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(1000, 10 ** 7))
+        service = make_service(31)
+
+        first = json.loads(await load_dynamics(service, datetime(2024, 1, 1), datetime(2024, 1, 30), cache=cache))
+        second = json.loads(await load_dynamics(service, datetime(2024, 1, 1), datetime(2024, 1, 31), cache=cache))
+
+        assert first["total"] == 30 and second["total"] == 31
+        assert service.get_dynamics.await_args_list[1].args[:2] == (datetime(2024, 1, 31), datetime(2024, 1, 31))
+        assert [row["id"] for row in second["result"]] == list(range(31, 0, -1))
+
+    async def test_contained_window_is_pure_cache_assembly(self):
+        """Тест того, что период внутри уже загруженного не обращается к БД"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(1000, 10 ** 7))
+        service = make_service(31)
+        await load_dynamics(service, datetime(2024, 1, 1), datetime(2024, 1, 31), cache=cache)
+
+        body = json.loads(await load_dynamics(service, datetime(2024, 1, 10), datetime(2024, 1, 12), cache=cache))
+
+        assert service.get_dynamics.await_count == 1
+        assert [row["id"] for row in body["result"]] == [12, 11, 10]
+
+    async def test_missing_days_fetched_as_contiguous_runs(self):
+        """Тест того, что отсутствующие дни запрашиваются непрерывными периодами"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(1000, 10 ** 7))
+        service = make_service(31)
+        await load_dynamics(service, datetime(2024, 1, 10), datetime(2024, 1, 12), cache=cache)
+        service.get_dynamics.reset_mock()
+
+        body = json.loads(await load_dynamics(service, datetime(2024, 1, 8), datetime(2024, 1, 14), cache=cache))
+
+        assert [call.args[:2] for call in service.get_dynamics.await_args_list] == [
+            (datetime(2024, 1, 8), datetime(2024, 1, 9)),
+            (datetime(2024, 1, 13), datetime(2024, 1, 14))
+        ]
+        assert body["total"] == 7
+
+    async def test_invalidated_day_is_reloaded(self):
+        """Тест того, что после инвалидации даты из БД запрашивается только она"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(1000, 10 ** 7))
+        service = make_service(31)
+        await load_dynamics(service, datetime(2024, 1, 1), datetime(2024, 1, 5), cache=cache)
+        service.get_dynamics.reset_mock()
+
+        await cache.invalidate_tags(["date:2024-01-03"])
+        await load_dynamics(service, datetime(2024, 1, 1), datetime(2024, 1, 5), cache=cache)
+
+        service.get_dynamics.assert_awaited_once()
+        assert service.get_dynamics.await_args.args[:2] == (datetime(2024, 1, 3), datetime(2024, 1, 3))
+
+    async def test_closed_days_cached_long(self):
+        """Тест того, что фрагменты закрытых дней хранятся долго, а последнего дня - до сброса"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(1000, 10 ** 7))
+        service = make_service(31, latest=datetime(2024, 1, 31))
+
+        await load_dynamics(service, datetime(2024, 1, 30), datetime(2024, 1, 31), cache=cache)
+
+        expires = {key: deadline - monotonic() for key, deadline in redis.expires.items()}
+        closed = next(ttl for key, ttl in expires.items() if "date=2024-01-30" in key)
+        current = next(ttl for key, ttl in expires.items() if "date=2024-01-31" in key)
+        assert closed > settings.CACHE_HISTORICAL_TTL_SECONDS - 10
+        assert current <= get_reset_ttl() + settings.CACHE_STALE_GRACE_SECONDS
+
+    async def test_closed_days_survive_load_bump(self):
+        """Тест того, что после сброса поколения из БД загружается только последний день"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(1000, 10 ** 7))
+        service = make_service(31, latest=datetime(2024, 1, 31))
+        await load_dynamics(service, datetime(2024, 1, 1), datetime(2024, 1, 31), cache=cache)
+
+        await cache.bump_generation()
+        service.get_dynamics.reset_mock()
+        body = json.loads(await load_dynamics(service, datetime(2024, 1, 1), datetime(2024, 1, 31), cache=cache))
+
+        assert body["total"] == 31
+        assert [call.args[:2] for call in service.get_dynamics.await_args_list] == [
+            (datetime(2024, 1, 31), datetime(2024, 1, 31))
+        ]
+
+
+class TestDynamicsByDayOnDatabase:
+    """Тесты сборки динамики из фрагментов на реальной БД (записи с временем торгов)"""
+
+    async def add_afternoon_results(self, session, days: int) -> None:
+        """По одной сделке в 15:30 на каждый из days дней начиная с 1 января 2024"""
+        for i in range(days):
+            trading_date = datetime(2024, 1, 1, 15, 30) + timedelta(days=i)
+            session.add(SpimexTradingResult(
+                trading_date=trading_date,
+                oil_id=1,
+                delivery_type_id=1,
+                delivery_basis_id=1,
+                volume=1.0,
+                price=1.0,
+                total_value=1.0,
+                created_at=trading_date,
+                updated_at=trading_date
+            ))
+        await session.commit()
+
+    async def test_cold_window_returns_every_day(self, db_session):
+        """Тест того, что холодное окно возвращает записи всех дней, включая последний"""
+        await self.add_afternoon_results(db_session, 10)
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(1000, 10 ** 7))
+
+        body = json.loads(await load_dynamics(
+            TradingService(db_session), datetime(2024, 1, 1), datetime(2024, 1, 10), cache=cache
+        ))
+
+        assert body["total"] == 10
+
+    async def test_single_day_fragments_are_not_empty(self, db_session):
+        """Тест того, что фрагменты, загруженные запросами по одному дню, содержат записи дня"""
+        await self.add_afternoon_results(db_session, 10)
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(1000, 10 ** 7))
+        service = TradingService(db_session)
+        for i in range(10):
+            day = datetime(2024, 1, 1) + timedelta(days=i)
+            await load_dynamics(service, day, day, cache=cache)
+
+        body = json.loads(await load_dynamics(service, datetime(2024, 1, 1), datetime(2024, 1, 10), cache=cache))
+
+        assert body["total"] == 10
+        assert [row["trading_date"][:10] for row in body["result"]] == [
+            (datetime(2024, 1, 10) - timedelta(days=i)).date().isoformat() for i in range(10)
+        ]
@@ -0,0 +1,59 @@
+import json
+import pytest
+from unittest.mock import patch
+
+from app import compression
+from app.cache import AsyncRedisCache, unpack_entry
+from app.compression import CODEC_NONE, CODEC_ZLIB, compress, decompress, get_codec
+from tests.fake_redis import FakeAsyncRedis
+
+
+class TestCompression:
+    """Тесты сжатия значений кеша"""
+
+    def test_zlib_roundtrip_with_header(self):
+        """Тест сжатия zlib с байт-заголовком кодека"""
+        data = json.dumps({"result": [{"price": 50.0}] * 500}).encode()
+
+        blob = compress(data, CODEC_ZLIB, min_size=100)
+
+        assert blob[:1] == CODEC_ZLIB
+        assert len(blob) < len(data)
+        assert decompress(blob) == data
+
+    def test_small_values_not_compressed(self):
+        """Тест того, что данные меньше порога сохраняются без сжатия"""
+        blob = compress(b'{"total": 0}', CODEC_ZLIB, min_size=100)
+
+        assert blob == CODEC_NONE + b'{"total": 0}'
+        assert decompress(blob) == b'{"total": 0}'
+
+    def test_values_without_header_returned_as_is(self):
+        """Тест чтения значений, записанных до включения сжатия"""
+        assert decompress(b'{"total": 0}') == b'{"total": 0}'
+
+    def test_unknown_codec(self):
+        """Тест ошибки для неизвестного кодека в настройках"""
+        with pytest.raises(ValueError):
+            get_codec("brotli")
+
+    def test_lz4_requires_package(self):
+        """Тест понятной ошибки, если lz4 выбран, но не установлен"""
+        with patch.object(compression, "lz4_frame", None):
+            with pytest.raises(RuntimeError):
+                get_codec("lz4")
+
+    async def test_cache_reports_raw_and_stored_bytes_by_prefix(self):
+        """Тест метрик исходного и сохраненного объема по префиксам ключей"""
+        redis = FakeAsyncRedis()
+        cache = AsyncRedisCache(redis_client=redis, codec=CODEC_ZLIB)
+        data = json.dumps({"result": [{"price": 50.0}] * 500})
+
+        await cache.set_raw("dynamics:2024-01-01", data, ttl=60)
+
+        sizes = cache.stats()["bytes_by_prefix"]["dynamics"]
+        assert sizes["writes"] == 1
+        assert sizes["raw_bytes"] == len(data)
+        assert sizes["stored_bytes"] < sizes["raw_bytes"]
+        assert unpack_entry(redis.data["dynamics:2024-01-01"])[0][:1] == CODEC_ZLIB
+        assert await cache.get_raw("dynamics:2024-01-01") == data.encode()
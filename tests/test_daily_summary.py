@@ -0,0 +1,133 @@
+from datetime import datetime
+from sqlalchemy import delete, select, update
+
+from app.daily_summary import install, is_installed, postgres_ddl, rebuild
+from app.models.database import SpimexTradingResult, TradingDailySummary
+from app.services.trading import TradingService
+
+
+def result(day: int, oil_id: int, basis_id: int, volume: float, price: float, hour: int = 0) -> SpimexTradingResult:
+    """Результат торгов за день января 2024 года (в заданный час)"""
+    return SpimexTradingResult(
+        trading_date=datetime(2024, 1, day, hour),
+        oil_id=oil_id,
+        delivery_type_id=1,
+        delivery_basis_id=basis_id,
+        volume=volume,
+        price=price,
+        total_value=volume * price,
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1)
+    )
+
+
+async def summary_rows(session):
+    """Содержимое таблицы итогов, упорядоченное по ключу"""
+    query = select(TradingDailySummary.__table__).order_by(
+        TradingDailySummary.trading_date, TradingDailySummary.oil_id, TradingDailySummary.delivery_basis_id
+    )
+    return [tuple(row) for row in (await session.execute(query)).all()]
+
+
+class TestDailySummaryMaintenance:
+    """Тесты поддержки дневных итогов триггерами (SQLite)"""
+
+    async def test_install_backfills_existing_rows(self, db_session):
+        """Тест заполнения итогов по уже загруженным результатам"""
+        db_session.add_all([result(1, 1, 1, 10, 100), result(1, 1, 1, 30, 120), result(1, 2, 1, 5, 90)])
+        await db_session.commit()
+
+        assert await install(db_session.bind) == 2
+        assert await summary_rows(db_session) == [
+            (1, 1, datetime(2024, 1, 1), 40.0, 4600.0, 100.0, 120.0, 2),
+            (2, 1, datetime(2024, 1, 1), 5.0, 450.0, 90.0, 90.0, 1),
+        ]
+
+    async def test_triggers_match_rebuild(self, db_session):
+        """Тест того, что итоги после вставки, изменения и удаления совпадают с полным пересчетом"""
+        await install(db_session.bind)
+        db_session.add_all([
+            result(1, 1, 1, 10, 100), result(1, 1, 1, 30, 120), result(2, 1, 1, 20, 110),
+            result(2, 1, 2, 15, 105), result(3, 2, 1, 5, 90)
+        ])
+        await db_session.commit()
+
+        await db_session.execute(
+            update(SpimexTradingResult).where(SpimexTradingResult.price == 120).values(price=80, total_value=2400)
+        )
+        await db_session.execute(
+            update(SpimexTradingResult).where(SpimexTradingResult.price == 105).values(delivery_basis_id=3)
+        )
+        await db_session.execute(delete(SpimexTradingResult).where(SpimexTradingResult.oil_id == 2))
+        await db_session.commit()
+        maintained = await summary_rows(db_session)
+
+        await rebuild(await db_session.connection())
+
+        assert maintained == await summary_rows(db_session)
+        assert maintained == [
+            (1, 1, datetime(2024, 1, 1), 40.0, 3400.0, 80.0, 100.0, 2),
+            (1, 1, datetime(2024, 1, 2), 20.0, 2200.0, 110.0, 110.0, 1),
+            (1, 3, datetime(2024, 1, 2), 15.0, 1575.0, 105.0, 105.0, 1),
+        ]
+
+    def test_postgres_triggers_are_per_statement(self):
+        """Тест того, что в PostgreSQL итоги обновляются раз на запрос по переходным таблицам"""
+        ddl = postgres_ddl()
+
+        triggers = [statement for statement in ddl if statement.startswith("CREATE TRIGGER")]
+        assert len(triggers) == 3
+        assert all("FOR EACH STATEMENT" in trigger for trigger in triggers)
+        assert "FROM new_rows GROUP BY date_trunc('day', trading_date), oil_id, delivery_basis_id ON CONFLICT" in ddl[0]
+        # Строки пересчитываемого дня выбираются полуинтервалом по индексу, а не функцией от колонки
+        assert "r.trading_date < c.trading_date + interval '1 day'" in ddl[0]
+
+    async def test_rows_with_time_of_day_form_one_day(self, db_session):
+        """Тест того, что записи одного дня с разным временем дают одну строку итогов"""
+        await install(db_session.bind)
+        db_session.add_all([result(10, 1, 1, 10, 100, hour=10), result(10, 1, 1, 30, 120, hour=15)])
+        await db_session.commit()
+
+        assert await summary_rows(db_session) == [(1, 1, datetime(2024, 1, 10), 40.0, 4600.0, 100.0, 120.0, 2)]
+
+        await db_session.execute(delete(SpimexTradingResult).where(SpimexTradingResult.price == 100))
+        await db_session.commit()
+        assert await summary_rows(db_session) == [(1, 1, datetime(2024, 1, 10), 30.0, 3600.0, 120.0, 120.0, 1)]
+
+    async def test_rebuild_period_includes_whole_end_day(self, db_session):
+        """Тест того, что пересчет за период учитывает записи конечного дня после полуночи"""
+        db_session.add_all([result(9, 1, 1, 5, 90, hour=12), result(10, 1, 1, 10, 100, hour=15)])
+        await db_session.commit()
+        await install(db_session.bind)
+        await db_session.execute(delete(TradingDailySummary))
+
+        assert await rebuild(await db_session.connection(), datetime(2024, 1, 10), datetime(2024, 1, 10)) == 1
+        assert await summary_rows(db_session) == [(1, 1, datetime(2024, 1, 10), 10.0, 1000.0, 100.0, 100.0, 1)]
+
+    async def test_is_installed(self, db_session):
+        """Тест проверки триггеров: таблица итогов из create_all без install не считается установленной"""
+        assert not await is_installed(await db_session.connection())
+
+        await install(db_session.bind)
+
+        assert await is_installed(await db_session.connection())
+
+
+class TestDailySummaryService:
+    """Тесты чтения дневных итогов"""
+
+    async def test_get_daily_summary(self, db_session):
+        """Тест выборки итогов за период с фильтром и средневзвешенной ценой"""
+        await install(db_session.bind)
+        db_session.add_all([
+            result(1, 1, 1, 10, 100), result(1, 1, 1, 30, 120), result(2, 1, 1, 20, 110),
+            result(2, 1, 2, 0, 105), result(5, 1, 1, 1, 1)
+        ])
+        await db_session.commit()
+
+        rows = await TradingService(db_session).get_daily_summary(datetime(2024, 1, 1), datetime(2024, 1, 2), oil_id=1)
+
+        assert [(row.trading_date.day, row.delivery_basis_id, row.vwap) for row in rows] == [
+            (2, 1, 110.0), (2, 2, None), (1, 1, 115.0)
+        ]
+        assert rows[-1].deals == 2
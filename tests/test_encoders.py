@@ -0,0 +1,60 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+from app import encoders
+from app.encoders import get_encoder
+
+AVAILABLE = [name for name in ("orjson", "ujson", "json") if encoders._AVAILABLE[name]()]
+
+
+class TestEncoders:
+    """Тесты подключаемых JSON-кодировщиков"""
+
+    @pytest.mark.parametrize("name", AVAILABLE)
+    def test_same_output_for_records(self, name):
+        """Тест того, что все кодировщики дают одинаковый компактный JSON с датами в ISO 8601"""
+        value = {
+            "result": [{"id": 1, "trading_date": datetime(2024, 1, 1, 10, 30), "price": 5100.0}],
+            "note": "нефть/газ"
+        }
+
+        body = get_encoder(name).dumps(value)
+
+        assert body == (
+            '{"result":[{"id":1,"trading_date":"2024-01-01T10:30:00","price":5100.0}],'
+            '"note":"нефть/газ"}'
+        ).encode("utf-8")
+
+    @pytest.mark.parametrize("name", AVAILABLE)
+    def test_loads_str_and_bytes(self, name):
+        """Тест разбора JSON из str и bytes"""
+        encoder = get_encoder(name)
+
+        assert encoder.loads(b'{"a":[1,2]}') == encoder.loads('{"a":[1,2]}') == {"a": [1, 2]}
+
+    def test_auto_prefers_orjson(self):
+        """Тест выбора самого быстрого установленного кодировщика"""
+        assert get_encoder("auto").name == AVAILABLE[0]
+
+    def test_auto_falls_back_to_stdlib(self):
+        """Тест отката на json без orjson и ujson"""
+        with patch.object(encoders, "orjson", None), patch.object(encoders, "ujson", None):
+            assert get_encoder("auto").name == "json"
+
+    def test_unknown_encoder(self):
+        """Тест ошибки для неизвестного имени"""
+        with pytest.raises(ValueError):
+            get_encoder("simplejson")
+
+    def test_missing_package(self):
+        """Тест ошибки для неустановленного пакета"""
+        with patch.object(encoders, "ujson", None):
+            with pytest.raises(RuntimeError):
+                get_encoder("ujson")
+
+    def test_response_class_uses_encoder(self):
+        """Тест того, что ответы FastAPI по умолчанию сериализуются кодировщиком из настроек"""
+        response = encoders.EncodedJSONResponse({"date": datetime(2024, 1, 1), "message": "Кеш"})
+
+        assert response.body == '{"date":"2024-01-01T00:00:00","message":"Кеш"}'.encode("utf-8")
@@ -1,9 +1,20 @@
+import asyncio
+import json
+import time
+import httpx
 import pytest
 from datetime import datetime, timedelta
 from fastapi import status
 from unittest.mock import patch, MagicMock, AsyncMock
 
 from app.services.trading import TradingService
+from tests.mocked_trading_service import add_trading_results, create_mock_trading_result
+from app.cache import AsyncRedisCache, TieredCache, get_cache, namespace_key, pack_entry, unpack_entry
+from app.cache_keys import trading_results_key
+from app.daily_summary import install as install_daily_summary
+from app.warmup import get_warmer
+from main import app
+from tests.fake_redis import FakeAsyncRedis
 
 
 class TestTradingEndpoints:
@@ -43,7 +54,7 @@ class TestTradingEndpoints:
             "dates": ["2024-01-01T00:00:00", "2023-12-31T00:00:00"],
             "total": 2
         }
-        mock_cache_get.return_value = mock_cache_data
+        mock_cache_get.return_value = json.dumps(mock_cache_data)
         
         # Выполняем запрос к API
         response = test_client.get("/api/trading/dates?limit=5")
@@ -55,7 +66,25 @@ class TestTradingEndpoints:
         data = response.json()
         assert data == mock_cache_data
     
-    def test_get_dynamics(self, test_client, mock_cache_get, mock_cache_set):
+    def test_get_trading_results_caches_response_body(self, test_client, mock_cache_get, mock_cache_set,
+                                                      mock_latest_trading_date):
+        """Тест того, что в кеш сохраняется готовое тело ответа, и оно же отдается клиенту"""
+        mock_cache_get.return_value = None
+        results = [create_mock_trading_result(id=1)]
+
+        with patch.object(TradingService, 'get_trading_result',
+                          return_value=results, new_callable=AsyncMock):
+            response = test_client.get("/api/trading/results?limit=5")
+
+        cached_body = next(
+            call.args[1] for call in mock_cache_set.call_args_list if "trading_results" in call.args[0]
+        ).decode()
+        assert response.status_code == status.HTTP_200_OK
+        assert response.text == cached_body
+        assert response.json()["result"][0]["id"] == 1
+        assert "created_at" not in response.json()["result"][0]
+
+    def test_get_dynamics(self, test_client, mock_cache_get, mock_cache_set, mock_latest_trading_date):
         """Тест получения динамики торгов за период"""
         # Проверяем, что кеш проверялся
         mock_cache_get.return_value = None
@@ -84,7 +113,8 @@ class TestTradingEndpoints:
         assert "start_date" in data
         assert "end_date" in data
     
-    def test_get_dynamics_with_filters(self, test_client, mock_cache_get, mock_cache_set):
+    def test_get_dynamics_with_filters(self, test_client, mock_cache_get, mock_cache_set,
+                                       mock_latest_trading_date):
         """Тест получения динамики торгов за период с фильтрацией"""
         # Проверяем, что кеш проверялся
         mock_cache_get.return_value = None
@@ -133,7 +163,17 @@ class TestTradingEndpoints:
         # Проверяем статус ответа (должен быть код ошибки)
         assert response.status_code == status.HTTP_400_BAD_REQUEST
     
-    def test_get_trading_results(self, test_client, mock_cache_get, mock_cache_set):
+    def test_period_limit_counts_whole_days(self, test_client):
+        """Тест того, что ограничение периода считается по торговым дням, а не по времени"""
+        # Между моментами 365 дней и 18 часов, но период захватывает 367 торговых дней
+        response = test_client.get(
+            "/api/trading/dynamics?start_date=2024-01-01T12:00:00&end_date=2025-01-01T06:00:00"
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_get_trading_results(self, test_client, mock_cache_get, mock_cache_set,
+                                 mock_latest_trading_date):
         """Тест получения результатов торгов"""
         # Проверяем, что кеш проверялся
         mock_cache_get.return_value = None
@@ -156,7 +196,8 @@ class TestTradingEndpoints:
         assert "result" in data
         assert "total" in data
     
-    def test_get_trading_results_with_filters(self, test_client, mock_cache_get, mock_cache_set):
+    def test_get_trading_results_with_filters(self, test_client, mock_cache_get, mock_cache_set,
+                                              mock_latest_trading_date):
         """Тест получения результатов торгов с фильтрацией"""
         # Проверяем, что кеш проверялся
         mock_cache_get.return_value = None
@@ -177,17 +218,78 @@ class TestTradingEndpoints:
         # Проверяем статус ответа
         assert response.status_code == status.HTTP_200_OK
     
-    def test_invalidate_cache(self, test_client, override_get_cache):
-        """Тест принудительного сброса кеша"""
-        # Выполняем запрос к API
-        response = test_client.post("/api/cache/invalidate")
-        
+    def test_invalidate_cache(self, test_client, fake_cache, override_get_db, mock_latest_trading_date):
+        """Тест принудительного сброса кеша: поколение ключей увеличивается, без FLUSHDB"""
+        cache, redis = fake_cache
+        redis.data["other_app:key"] = b"keep"
+        url = "/api/trading/results?limit=100"
+        with patch.object(TradingService, 'get_trading_result',
+                          return_value=[], new_callable=AsyncMock) as mock_method:
+            test_client.get(url)
+            test_client.get(url)
+            assert mock_method.await_count == 1
+
+            # Выполняем запрос к API
+            response = test_client.post("/api/cache/invalidate")
+            test_client.get(url)
+
         # Проверяем статус ответа
         assert response.status_code == status.HTTP_200_OK
-        
-        # Проверяем, что метод invalidate_all был вызван
-        override_get_cache.flushdb.assert_called_once()
+        assert response.json()["generation"] == 1
+        assert mock_method.await_count == 2
+        assert namespace_key(0, trading_results_key(limit=100)) in redis.data
+        assert namespace_key(1, trading_results_key(limit=100)) in redis.data
+        assert redis.data["other_app:key"] == b"keep"
+
+    def test_invalidate_cache_by_date(self, test_client, fake_cache):
+        """Тест сброса кеша только за торговую дату"""
+        cache, redis = fake_cache
+        asyncio.run(cache.set_raw("may_10", "{}", ttl=60, tags=["date:2024-05-10"]))
+        asyncio.run(cache.set_raw("may_11", "{}", ttl=60, tags=["date:2024-05-11"]))
+
+        response = test_client.post("/api/cache/invalidate/date?trading_date=2024-05-10")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["deleted"] == 1
+        assert "may_10" not in redis.data
+        assert "may_11" in redis.data
+
+    def test_invalidate_cache_by_oil(self, test_client, fake_cache):
+        """Тест сброса кеша по нефтепродукту, включая запросы без фильтра"""
+        cache, redis = fake_cache
+        asyncio.run(cache.set_raw("oil_12", "{}", ttl=60, tags=["oil:12"]))
+        asyncio.run(cache.set_raw("all_oils", "{}", ttl=60, tags=["oil:all"]))
+        asyncio.run(cache.set_raw("oil_13", "{}", ttl=60, tags=["oil:13"]))
+
+        response = test_client.post("/api/cache/invalidate/oil?oil_id=12")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["deleted"] == 2
+        assert "oil_13" in redis.data
+
+    def test_dynamics_response_tagged_by_dates(self, test_client, fake_cache, override_get_db,
+                                               mock_latest_trading_date):
+        """Тест того, что ответ динамики регистрируется под тегами каждой даты периода"""
+        cache, redis = fake_cache
+        with patch.object(TradingService, 'get_dynamics', return_value=[], new_callable=AsyncMock):
+            test_client.get("/api/trading/dynamics?start_date=2024-05-09&end_date=2024-05-11&oil_id=12")
+
+        for tag in ("date:2024-05-09", "date:2024-05-10", "date:2024-05-11", "oil:12"):
+            assert f"v0:tag:{tag}" in redis.data
+        assert not any(key.startswith("tag:") for key in redis.data)
     
+    def test_cache_stats(self, test_client, override_get_cache):
+        """Тест получения счетчиков попаданий по уровням кеша"""
+        override_get_cache.get.return_value = None
+
+        test_client.get("/api/cache/stats")
+        response = test_client.get("/api/cache/stats")
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert {"l1", "l2"} <= set(data)
+        assert "hits" in data["l1"] and "misses" in data["l2"]
+
     def test_root_endpoint(self, test_client):
         """Тест корневого эндпоинта"""
         # Выполняем запрос к API
@@ -200,4 +302,387 @@ class TestTradingEndpoints:
         data = response.json()
         assert "message" in data
         assert "version" in data
-        assert "endpoints" in data
\ No newline at end of file
+        assert "endpoints" in data
+
+class TestLifespan:
+    """Тесты жизненного цикла приложения"""
+
+    def test_shared_cache_created_once(self, test_client):
+        """Тест того, что кеш создается один раз на процесс и переиспользуется"""
+        first = app.state.cache
+        test_client.get("/")
+
+        assert isinstance(first, TieredCache)
+        assert app.state.cache is first
+
+
+class TestRequestCoalescing:
+    """Тесты объединения одновременных одинаковых запросов"""
+
+    async def test_concurrent_identical_requests_hit_db_once(self, override_get_db, mock_latest_trading_date):
+        """Тест того, что 500 одновременных одинаковых запросов выполняют один запрос к БД"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis(latency=0.001)))
+        app.dependency_overrides[get_cache] = lambda: cache
+
+        async def slow_dynamics(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return []
+
+        url = "/api/trading/dynamics?start_date=2024-01-01&end_date=2024-01-31&oil_id=1"
+        try:
+            with patch.object(TradingService, 'get_dynamics',
+                              side_effect=slow_dynamics, new_callable=AsyncMock) as mock_method:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    responses = await asyncio.gather(*(client.get(url) for _ in range(500)))
+        finally:
+            del app.dependency_overrides[get_cache]
+
+        assert mock_method.await_count == 1
+        assert all(response.status_code == status.HTTP_200_OK for response in responses)
+
+
+class TestCacheKeyNormalization:
+    """Тесты совместного использования записи кеша эквивалентными запросами"""
+
+    def test_equivalent_dynamics_queries_share_entry(self, test_client, fake_cache, override_get_db,
+                                                     mock_latest_trading_date):
+        """Тест того, что разные записи одной даты и порядок параметров дают одно попадание в кеш"""
+        cache, redis = fake_cache
+        urls = [
+            "/api/trading/dynamics?start_date=2024-01-01&end_date=2024-01-31&oil_id=1",
+            "/api/trading/dynamics?start_date=2024-01-01T00:00:00&end_date=2024-01-31&oil_id=1",
+            "/api/trading/dynamics?oil_id=1&start_date=2024-01-01T00:00:00.000&end_date=2024-01-31T00:00:00",
+            "/api/trading/dynamics?end_date=2024-01-31T18:30:00&start_date=2024-01-01T09:15:00&oil_id=1",
+        ]
+        lookups = []
+        get_entry_raw = cache.get_entry_raw
+
+        async def tracked_get_entry_raw(key):
+            entry = await get_entry_raw(key)
+            if ":dynamics:" in key:
+                lookups.append(entry is not None)
+            return entry
+
+        with patch.object(TradingService, 'get_dynamics',
+                          return_value=[], new_callable=AsyncMock) as mock_method, \
+             patch.object(cache, 'get_entry_raw', side_effect=tracked_get_entry_raw):
+            responses = [test_client.get(url) for url in urls]
+
+        assert all(response.status_code == status.HTTP_200_OK for response in responses)
+        assert mock_method.await_count == 1
+        # В сервис передаются торговые дни, конечный день выбирается целиком
+        assert mock_method.await_args.args[:2] == (datetime(2024, 1, 1), datetime(2024, 1, 31))
+        assert len({response.text for response in responses}) == 1
+        # Промах только у первого запроса, остальные попадают в ту же запись
+        assert sum(lookups) / len(urls) == 0.75
+
+
+class TestDynamicsPaginationEndpoint:
+    """Тесты параметров пагинации эндпоинта динамики"""
+
+    def test_page_returns_next_cursor(self, test_client, fake_cache, override_get_db, mock_latest_trading_date):
+        """Тест того, что при наличии следующей страницы возвращается next_cursor"""
+        rows = [create_mock_trading_result(id=i) for i in (3, 2, 1)]
+        with patch.object(TradingService, 'get_dynamics', return_value=rows, new_callable=AsyncMock) as mock_method:
+            response = test_client.get(
+                "/api/trading/dynamics?start_date=2024-01-01&end_date=2024-01-31&page_size=2"
+            )
+
+        data = response.json()
+        assert response.status_code == status.HTTP_200_OK
+        assert [row["id"] for row in data["result"]] == [3, 2]
+        assert data["next_cursor"] is not None
+        assert mock_method.await_args.kwargs == {"limit": 3, "after": None}
+
+    def test_invalid_cursor_rejected(self, test_client, fake_cache, override_get_db):
+        """Тест отклонения некорректного курсора и курсора без page_size"""
+        base = "/api/trading/dynamics?start_date=2024-01-01&end_date=2024-01-31"
+
+        assert test_client.get(f"{base}&page_size=10&cursor=broken").status_code == status.HTTP_400_BAD_REQUEST
+        assert test_client.get(f"{base}&cursor=broken").status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestStreamingEndpoints:
+    """Тесты потоковой выдачи результатов"""
+
+    async def test_dynamics_ndjson(self, test_client, app_db_session):
+        """Тест выдачи динамики построчно в NDJSON"""
+        await add_trading_results(app_db_session, days=3, per_day=2)
+
+        response = test_client.get(
+            "/api/trading/dynamics?start_date=2024-01-01&end_date=2024-01-03&stream=ndjson"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == [6, 5, 4, 3, 2, 1]
+
+    async def test_results_json_array(self, test_client, app_db_session):
+        """Тест выдачи последних результатов JSON-массивом по частям"""
+        await add_trading_results(app_db_session, days=2, per_day=3)
+
+        response = test_client.get("/api/trading/results?limit=4&stream=json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 4
+
+    async def test_empty_json_array(self, test_client, app_db_session):
+        """Тест того, что пустой результат - корректный пустой массив"""
+        response = test_client.get(
+            "/api/trading/dynamics?start_date=2024-01-01&end_date=2024-01-03&stream=json"
+        )
+
+        assert response.json() == []
+
+
+class TestExportEndpoint:
+    """Тесты колоночной выгрузки (Arrow IPC / Parquet)"""
+
+    async def test_arrow_stream(self, test_client, app_db_session):
+        """Тест выгрузки в Arrow IPC stream"""
+        pa = pytest.importorskip("pyarrow")
+
+        await add_trading_results(app_db_session, days=3, per_day=2)
+
+        response = test_client.get("/api/trading/export?start_date=2024-01-01&end_date=2024-01-02")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+        assert 'filename="dynamics_20240101_20240102.arrows"' in response.headers["content-disposition"]
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.column("id").to_pylist() == [4, 3, 2, 1]
+        assert table.column("trading_date").to_pylist()[0] == datetime(2024, 1, 2)
+
+    async def test_parquet(self, test_client, app_db_session):
+        """Тест выгрузки в Parquet с фильтром"""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet
+
+        await add_trading_results(app_db_session, days=2, per_day=2)
+
+        response = test_client.get(
+            "/api/trading/export?start_date=2024-01-01&end_date=2024-01-02&oil_id=2&format=parquet"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        table = pa.parquet.read_table(pa.BufferReader(response.content))
+        assert table.num_rows == 0
+        assert table.column_names[:2] == ["id", "trading_date"]
+
+    def test_invalid_period(self, test_client):
+        """Тест проверки периода выгрузки"""
+        pytest.importorskip("pyarrow")
+
+        response = test_client.get("/api/trading/export?start_date=2024-01-10&end_date=2024-01-01")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_pyarrow_missing(self, test_client):
+        """Тест ответа 501 без установленного pyarrow"""
+        with patch('app.export.pa', None):
+            response = test_client.get("/api/trading/export?start_date=2024-01-01&end_date=2024-01-02")
+
+        assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+
+class TestDailySummaryEndpoint:
+    """Тесты эндпоинта дневных итогов"""
+
+    async def test_daily_summary(self, test_client, fake_cache, app_db_session):
+        """Тест одной записи итогов на торговый день и их кеширования"""
+        await install_daily_summary(app_db_session.bind)
+        await add_trading_results(app_db_session, days=3, per_day=4)
+
+        url = "/api/trading/dynamics/summary?start_date=2024-01-01&end_date=2024-01-02&oil_id=1"
+        response = test_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["total"] == 2
+        assert data["result"][0] == {
+            "trading_date": "2024-01-02T00:00:00",
+            "oil_id": 1,
+            "delivery_basis_id": 1,
+            "volume": 4.0,
+            "total_value": 4.0,
+            "vwap": 1.0,
+            "min_price": 1.0,
+            "max_price": 1.0,
+            "deals": 4
+        }
+        with patch.object(TradingService, "get_daily_summary", new_callable=AsyncMock) as mock_method:
+            assert test_client.get(url).json() == data
+        mock_method.assert_not_called()
+
+    async def test_not_installed(self, test_client, fake_cache, app_db_session):
+        """Тест того, что без триггеров итогов эндпоинт отвечает 503 и не кеширует пустой результат"""
+        await add_trading_results(app_db_session, days=1, per_day=1)
+
+        response = test_client.get("/api/trading/dynamics/summary?start_date=2024-01-01&end_date=2024-01-01")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert "install" in response.json()["detail"]
+        cache, redis = fake_cache
+        assert not any("daily_summary" in key for key in redis.data)
+
+    def test_invalid_period(self, test_client):
+        """Тест проверки периода итогов"""
+        response = test_client.get("/api/trading/dynamics/summary?start_date=2024-01-01&end_date=2025-06-01")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestAggregateEndpoint:
+    """Тесты эндпоинта агрегатов"""
+
+    async def test_weekly_grouped(self, test_client, fake_cache, app_db_session):
+        """Тест недельных агрегатов с группировкой и одного ключа кеша для любого порядка полей"""
+        await add_trading_results(app_db_session, days=10, per_day=2)
+
+        response = test_client.get(
+            "/api/trading/aggregate?start_date=2024-01-01&end_date=2024-01-10"
+            "&bucket=week&group_by=delivery_basis_id&group_by=oil_id"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["bucket"], data["group_by"], data["total"]) == ("week", ["oil_id", "delivery_basis_id"], 2)
+        assert data["result"][1] == {
+            "bucket": "2024-01-01T00:00:00",
+            "oil_id": 1,
+            "delivery_type_id": None,
+            "delivery_basis_id": 1,
+            "volume": 14.0,
+            "total_value": 14.0,
+            "vwap": 1.0,
+            "open": 1.0,
+            "high": 1.0,
+            "low": 1.0,
+            "close": 1.0,
+            "deals": 14
+        }
+        with patch.object(TradingService, "get_aggregates", new_callable=AsyncMock) as mock_method:
+            cached = test_client.get(
+                "/api/trading/aggregate?start_date=2024-01-01&end_date=2024-01-10"
+                "&bucket=week&group_by=oil_id&group_by=delivery_basis_id"
+            )
+        assert cached.json() == data
+        mock_method.assert_not_called()
+
+    def test_invalid_parameters(self, test_client):
+        """Тест проверки интервала, поля группировки и периода"""
+        base = "/api/trading/aggregate?start_date=2024-01-01&end_date=2024-01-10"
+
+        assert test_client.get(base + "&bucket=year").status_code == 422
+        assert test_client.get(base + "&group_by=price").status_code == 422
+        response = test_client.get("/api/trading/aggregate?start_date=2024-01-10&end_date=2024-01-01")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestConditionalRequests:
+    """Тесты условных запросов (ETag / Last-Modified) и заголовков HTTP-кеширования"""
+
+    def test_etag_match_returns_304_without_query(self, test_client, fake_cache, override_get_db,
+                                                  mock_latest_trading_date):
+        """Тест того, что совпавший If-None-Match дает 304 без выполнения основного запроса"""
+        mock_latest_trading_date.return_value = [datetime(2024, 5, 10)]
+        url = "/api/trading/results?limit=100"
+        with patch.object(TradingService, 'get_trading_result',
+                          return_value=[], new_callable=AsyncMock) as mock_method:
+            first = test_client.get(url)
+            etag = first.headers["etag"]
+            second = test_client.get(url, headers={"If-None-Match": etag})
+            mismatched = test_client.get(url, headers={"If-None-Match": '"other"'})
+
+        assert first.status_code == status.HTTP_200_OK
+        assert etag.startswith('"') and etag.endswith('"')
+        assert first.headers["last-modified"] == "Fri, 10 May 2024 00:00:00 GMT"
+        assert second.status_code == status.HTTP_304_NOT_MODIFIED
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+        assert mismatched.status_code == status.HTTP_200_OK
+        assert mock_method.await_count == 1
+
+    @pytest.mark.parametrize("invalidate_url", [
+        "/api/cache/invalidate",
+        "/api/cache/invalidate/oil?oil_id=1",
+        "/api/cache/invalidate/date?trading_date=2024-05-10"
+    ])
+    def test_etag_changes_with_body_after_invalidation(self, invalidate_url, test_client, fake_cache,
+                                                       override_get_db, mock_latest_trading_date):
+        """Тест того, что после сброса кеша с новыми данными ETag меняется вместе с телом"""
+        mock_latest_trading_date.return_value = [datetime(2024, 5, 10)]
+        url = "/api/trading/dynamics?start_date=2024-05-01&end_date=2024-05-10&oil_id=1"
+        with patch.object(TradingService, 'get_dynamics', return_value=[], new_callable=AsyncMock) as mock_method:
+            etag = test_client.get(url).headers["etag"]
+            unchanged = test_client.get(url, headers={"If-None-Match": etag})
+            test_client.post(invalidate_url)
+            row = create_mock_trading_result(id=1)
+            row.trading_date = datetime(2024, 5, 10, 15, 30)
+            mock_method.return_value = [row]
+            response = test_client.get(url, headers={"If-None-Match": etag})
+
+        assert unchanged.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total"] == 1
+        assert response.headers["etag"] != etag
+
+    def test_stale_body_sent_without_validators(self, test_client, fake_cache, override_get_db,
+                                                mock_latest_trading_date):
+        """Тест того, что устаревшее тело отдается без ETag и с no-cache, а не подтверждается 304"""
+        cache, redis = fake_cache
+        url = "/api/trading/results?limit=100"
+        with patch.object(TradingService, 'get_trading_result', return_value=[], new_callable=AsyncMock):
+            etag = test_client.get(url).headers["etag"]
+            cache.local_cache.clear()
+            for key in list(redis.data):
+                if "trading_results" in key:
+                    blob, _ = unpack_entry(redis.data[key])
+                    redis.data[key] = pack_entry(blob, time.time() - 1)
+            response = test_client.get(url, headers={"If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "etag" not in response.headers
+        assert "last-modified" not in response.headers
+        assert response.headers["cache-control"] == "no-cache"
+
+    def test_if_modified_since(self, test_client, fake_cache, override_get_db, mock_latest_trading_date):
+        """Тест If-Modified-Since относительно последней торговой даты"""
+        mock_latest_trading_date.return_value = [datetime(2024, 5, 10)]
+        url = "/api/trading/results?limit=100"
+        with patch.object(TradingService, 'get_trading_result', return_value=[], new_callable=AsyncMock):
+            fresh = test_client.get(url, headers={"If-Modified-Since": "Sat, 11 May 2024 00:00:00 GMT"})
+            outdated = test_client.get(url, headers={"If-Modified-Since": "Thu, 09 May 2024 00:00:00 GMT"})
+
+        assert fresh.status_code == status.HTTP_304_NOT_MODIFIED
+        assert outdated.status_code == status.HTTP_200_OK
+
+    @patch('app.http_cache.get_reset_ttl', return_value=600)
+    def test_cache_control_aligned_to_reset(self, mock_get_reset_ttl, test_client, fake_cache,
+                                            override_get_db, mock_latest_trading_date):
+        """Тест того, что время жизни ответа заканчивается в момент сброса кеша"""
+        with patch.object(TradingService, 'get_trading_result', return_value=[], new_callable=AsyncMock):
+            response = test_client.get("/api/trading/results?limit=100")
+
+        assert response.headers["cache-control"] == "public, max-age=600"
+        assert "expires" in response.headers
+
+
+class TestWarmupEndpoint:
+    """Тесты запуска прогрева кеша"""
+
+    def test_warmup_cache(self, test_client):
+        """Тест ручного запуска прогрева кеша"""
+        warmer = MagicMock()
+        warmer.start = AsyncMock(return_value=["dates?limit=10"])
+        app.dependency_overrides[get_warmer] = lambda: warmer
+        try:
+            response = test_client.post("/api/cache/warmup")
+        finally:
+            del app.dependency_overrides[get_warmer]
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["queries"] == ["dates?limit=10"]
+        warmer.start.assert_awaited_once()
@@ -0,0 +1,23 @@
+import pytest
+from datetime import datetime
+
+from app.models.database import SpimexTradingResult
+from app.pagination import decode_cursor, encode_cursor
+
+
+class TestPagination:
+    """Тесты курсоров пагинации"""
+
+    def test_cursor_roundtrip(self):
+        """Тест кодирования и разбора курсора"""
+        assert decode_cursor(encode_cursor(datetime(2024, 1, 5), 42)) == (datetime(2024, 1, 5), 42)
+
+    def test_invalid_cursor(self):
+        """Тест того, что поврежденный курсор отклоняется"""
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_composite_index_declared(self):
+        """Тест наличия составного индекса под сортировку пагинации"""
+        indexes = {tuple(column.name for column in index.columns) for index in SpimexTradingResult.__table__.indexes}
+        assert ("trading_date", "id") in indexes
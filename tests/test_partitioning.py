@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import pytest
+from datetime import date, datetime
+from unittest.mock import patch
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import partitioning
+from app.models.database import Base
+from app.partitioning import (
+    CHANGE_LOG,
+    TABLE,
+    add_months,
+    change_capture_ddl,
+    ensure_partitions,
+    is_partitioned,
+    maintain_partitions,
+    migrate_to_partitioned,
+    month_range,
+    partition_ddl,
+    partition_name
+)
+from app.services.trading import TradingService
+from tests.mocked_trading_service import add_trading_results
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+TEST_SCHEMA = "spimex_partition_test"
+
+
+class TestPartitionLayout:
+    """Тесты разбиения по месяцам"""
+
+    def test_add_months_crosses_year(self):
+        """Тест перехода через границу года"""
+        assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+        assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+    def test_month_range_inclusive(self):
+        """Тест списка месяцев периода, включая месяц конечной даты"""
+        assert month_range(date(2024, 11, 15), date(2025, 1, 1)) == [
+            date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1)
+        ]
+
+    def test_partition_ddl_bounds(self):
+        """Тест границ секции: [1-е число месяца, 1-е число следующего)"""
+        ddl = partition_ddl(date(2024, 12, 1))
+
+        assert partition_name(date(2024, 12, 1)) == "spimex_tradinf_result_y2024m12"
+        assert ddl == (
+            "CREATE TABLE IF NOT EXISTS spimex_tradinf_result_y2024m12 PARTITION OF spimex_tradinf_result "
+            "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')"
+        )
+
+    def test_change_capture_covers_all_writes(self):
+        """Тест того, что на время переноса журналируются вставки, изменения и удаления"""
+        ddl = change_capture_ddl()
+
+        triggers = [statement for statement in ddl if statement.startswith("CREATE TRIGGER")]
+        assert [trigger.split(" AFTER ")[1].split()[0] for trigger in triggers] == ["INSERT", "UPDATE", "DELETE"]
+        assert all("FOR EACH STATEMENT" in trigger for trigger in triggers)
+        assert f"INSERT INTO {CHANGE_LOG} SELECT id FROM old_rows UNION SELECT id FROM new_rows" in ddl[1]
+
+
+class TestPartitioningWithoutPostgres:
+    """Тесты поведения секционирования на БД, отличной от PostgreSQL"""
+
+    async def test_not_partitioned_on_sqlite(self, db_session):
+        """Тест того, что таблица SQLite считается несекционированной"""
+        assert not await is_partitioned(await db_session.connection())
+
+    async def test_migrate_requires_postgres(self, db_session):
+        """Тест отказа переноса на SQLite"""
+        with pytest.raises(RuntimeError):
+            await migrate_to_partitioned(db_session.bind)
+
+    async def test_maintenance_is_noop_without_partitioning(self, db_session):
+        """Тест того, что фоновая задача не создает секций для несекционированной таблицы"""
+        with patch.object(partitioning, "ensure_partitions") as ensure, \
+                patch("app.partitioning.asyncio.sleep", side_effect=asyncio.CancelledError):
+            with pytest.raises(asyncio.CancelledError):
+                await maintain_partitions(db_session.bind)
+
+        ensure.assert_not_called()
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(POSTGRES_URL is None, reason="TEST_POSTGRES_URL не задан")
+class TestPostgresPartitioning:
+    """Перенос таблицы в секции и отсечение секций в PostgreSQL (в отдельной схеме)"""
+
+    @pytest.fixture
+    async def pg_engine(self):
+        admin = create_async_engine(POSTGRES_URL, isolation_level="AUTOCOMMIT")
+        async with admin.connect() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+        engine = create_async_engine(
+            POSTGRES_URL, connect_args={"server_settings": {"search_path": TEST_SCHEMA}}
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        yield engine
+        await engine.dispose()
+        async with admin.connect() as conn:
+            await conn.execute(text(f"DROP SCHEMA {TEST_SCHEMA} CASCADE"))
+        await admin.dispose()
+
+    async def test_migrate_and_prune(self, pg_engine):
+        """Тест переноса строк и того, что запрос за период читает только его секции"""
+        factory = sessionmaker(pg_engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as session:
+            await add_trading_results(session, days=90, per_day=3, start=datetime(2024, 1, 1))
+
+        copied = await migrate_to_partitioned(pg_engine, months_ahead=2, today=date(2024, 3, 15))
+
+        assert copied == 270
+        async with pg_engine.begin() as conn:
+            assert await is_partitioned(conn)
+            assert await ensure_partitions(conn, today=date(2024, 5, 1), months_ahead=1) == [
+                "spimex_tradinf_result_y2024m06"
+            ]
+            query = TradingService(None)._dynamics_query(datetime(2024, 1, 10), datetime(2024, 1, 20), 1)
+            sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            explain = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+            plan = json.dumps(explain if isinstance(explain, list) else json.loads(explain))
+
+        assert "spimex_tradinf_result_y2024m01" in plan
+        assert "spimex_tradinf_result_y2024m02" not in plan
+        assert "spimex_tradinf_result_default" not in plan
+
+        # Новые строки продолжают нумерацию прежней последовательности id
+        async with factory() as session:
+            await add_trading_results(session, days=1, per_day=1, start=datetime(2024, 4, 1))
+            rows = await TradingService(session).get_dynamics(datetime(2024, 4, 1), datetime(2024, 4, 1))
+            assert [row.id for row in rows] == [271]
+            assert len(await TradingService(session).get_dynamics(datetime(2024, 1, 1), datetime(2024, 3, 31))) == 270
+
+    async def test_writes_during_copy_are_reconciled(self, pg_engine):
+        """Тест того, что изменения, удаления и запоздалые вставки во время копирования не теряются"""
+        factory = sessionmaker(pg_engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as session:
+            await add_trading_results(session, days=40, per_day=3, start=datetime(2024, 1, 1))
+        copy = partitioning._create_and_copy
+
+        async def copy_then_write(*args):
+            await copy(*args)
+            # Запись в прежнюю таблицу после того, как ее месяцы уже скопированы
+            async with pg_engine.begin() as conn:
+                await conn.execute(text(f"UPDATE {TABLE} SET price = 99, trading_date = '2024-02-05' WHERE id = 1"))
+                await conn.execute(text(f"DELETE FROM {TABLE} WHERE id = 2"))
+                await conn.execute(text(
+                    f"INSERT INTO {TABLE} (id, trading_date, oil_id, delivery_type_id, delivery_basis_id, "
+                    "volume, price, total_value, created_at, updated_at) "
+                    "VALUES (0, '2024-01-03', 1, 1, 1, 1, 1, 1, '2024-01-03', '2024-01-03')"
+                ))
+
+        with patch.object(partitioning, "_create_and_copy", side_effect=copy_then_write):
+            total = await migrate_to_partitioned(pg_engine, months_ahead=1, today=date(2024, 2, 1))
+
+        assert total == 120
+        async with pg_engine.connect() as conn:
+            rows = dict((await conn.execute(
+                text(f"SELECT id, price FROM {TABLE} WHERE id IN (0, 1, 2) AND trading_date >= '2024-01-01'")
+            )).all())
+            assert rows == {0: 1.0, 1: 99.0}
+            assert (await conn.execute(text("SELECT to_regclass(:name)"), {"name": CHANGE_LOG})).scalar() is None
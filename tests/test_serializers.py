@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app import serializers
+from app.models.response import (
+    LastTradingDatesResponse,
+    TradingDynamicsResponse,
+    TradingResultsResponse
+)
+from app.services.trading import TradingService
+from main import app
+from tests.mocked_trading_service import add_trading_results, create_mock_trading_result
+
+
+class TestDirectSerializers:
+    """Тесты прямой сериализации тел ответов без валидации моделями"""
+
+    def test_results_body_matches_response_model(self):
+        """Тест того, что тело совпадает с сериализацией TradingResultsResponse"""
+        rows = [create_mock_trading_result(i, days_ago=i) for i in range(1, 4)]
+
+        body = serializers.trading_results_body(serializers.result_records(rows))
+        expected = TradingResultsResponse(result=rows, total=len(rows)).model_dump_json()
+
+        assert json.loads(body) == json.loads(expected)
+
+    def test_dynamics_body_matches_response_model(self):
+        """Тест того, что тело динамики (с курсором) совпадает с TradingDynamicsResponse"""
+        rows = [create_mock_trading_result(1), create_mock_trading_result(2)]
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 31)
+
+        body = serializers.dynamics_body(serializers.result_records(rows), start, end, "abc")
+        expected = TradingDynamicsResponse(
+            result=rows, total=2, start_date=start, end_date=end, next_cursor="abc"
+        ).model_dump_json()
+
+        assert json.loads(body) == json.loads(expected)
+
+    async def test_rows_serialized_positionally(self, db_session):
+        """Тест того, что строки Row из TradingService сериализуются как модель ответа"""
+        await add_trading_results(db_session, days=2, per_day=2)
+        rows = await TradingService(db_session).get_trading_result(limit=4)
+
+        body = serializers.trading_results_body(serializers.result_records(rows))
+        expected = TradingResultsResponse(result=rows, total=len(rows)).model_dump_json()
+
+        assert json.loads(body) == json.loads(expected)
+
+    def test_dates_body_matches_response_model(self):
+        """Тест того, что тело списка дат совпадает с LastTradingDatesResponse"""
+        dates = [datetime(2024, 1, 2), datetime(2024, 1, 1, 10, 30)]
+
+        body = serializers.trading_dates_body(dates)
+
+        assert body == LastTradingDatesResponse(dates=dates, total=2).model_dump_json().encode("utf-8")
+
+    def test_openapi_keeps_response_models(self):
+        """Тест того, что схема OpenAPI по-прежнему описывает ответы моделями"""
+        paths = TestClient(app).get("/openapi.json").json()["paths"]
+
+        for path, model in (
+            ("/api/trading/dates", "LastTradingDatesResponse"),
+            ("/api/trading/dynamics", "TradingDynamicsResponse"),
+            ("/api/trading/results", "TradingResultsResponse"),
+        ):
+            schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+            assert schema["$ref"].endswith(model)
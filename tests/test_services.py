@@ -1,10 +1,16 @@
+import json
 import pytest
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, patch, MagicMock
 from sqlalchemy import select, desc
 
+from app.config import settings
 from app.services.trading import TradingService
 from app.models.database import SpimexTradingResult
+from app.trading_days import install
+from app.models.response import TradingResult, TradingResultsResponse
+from app.services.cached_queries import load_dynamics_page
+from tests.mocked_trading_service import add_trading_results
 
 pytestmark = pytest.mark.asyncio
 
@@ -50,7 +56,8 @@ class TestTradingService:
         
         # Патчим select, чтобы не зависеть от реальной реализации
         with patch('app.services.trading.select', return_value=MagicMock()) as mock_select, \
-             patch('app.services.trading.desc', return_value=MagicMock()) as mock_desc:
+             patch('app.services.trading.desc', return_value=MagicMock()) as mock_desc, \
+             patch.object(settings, 'TRADING_DATES_SOURCE', 'table'):
             
             # Настраиваем возвращаемое значение для execute
             mock_result = MagicMock()
@@ -98,7 +105,8 @@ class TestTradingService:
         
         # Патчим sqlalchemy функции
         with patch('app.services.trading.select') as mock_select, \
-             patch('app.services.trading.desc') as mock_desc:
+             patch('app.services.trading.desc') as mock_desc, \
+             patch.object(settings, 'TRADING_DATES_SOURCE', 'table'):
             
             # Создаем экземпляр сервиса с моком
             service = TradingService(mock_session)
@@ -112,4 +120,168 @@ class TestTradingService:
             mock_desc.assert_called_once()
             
             # Проверяем, что execute был вызван
-            mock_session.execute.assert_called_once()
\ No newline at end of file
+            mock_session.execute.assert_called_once()
+
+class TestDynamicsPagination:
+    """Тесты курсорной пагинации динамики на реальной БД"""
+
+    async def test_walk_all_pages(self, db_session):
+        """Тест того, что обход страниц по курсору возвращает все записи ровно один раз и по порядку"""
+        await add_trading_results(db_session)
+        service = TradingService(db_session)
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 5)
+        expected = [row.id for row in await service.get_dynamics(start, end)]
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = json.loads(await load_dynamics_page(service, start, end, None, None, None, 4, cursor))
+            seen.extend(row["id"] for row in page["result"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == expected
+        assert len(seen) == 15 and pages == 4
+
+    async def test_keyset_breaks_ties_by_id(self, db_session):
+        """Тест того, что страница, разрывающая торговый день, продолжается с нужного id"""
+        await add_trading_results(db_session, days=1, per_day=5)
+        service = TradingService(db_session)
+        day = datetime(2024, 1, 1)
+
+        first = await service.get_dynamics(day, day, limit=2)
+        rest = await service.get_dynamics(day, day, after=(first[-1].trading_date, first[-1].id))
+
+        assert [row.id for row in first] == [5, 4]
+        assert [row.id for row in rest] == [3, 2, 1]
+
+
+class TestWholeTradingDays:
+    """Тесты выборки периода целыми торговыми днями"""
+
+    async def test_end_day_rows_after_midnight_included(self, db_session):
+        """Тест того, что записи конечного дня с ненулевым временем попадают в период"""
+        await add_trading_results(db_session, days=3, per_day=1, start=datetime(2024, 1, 1, 15, 30))
+        service = TradingService(db_session)
+
+        rows = await service.get_dynamics(datetime(2024, 1, 1, 18, 0), datetime(2024, 1, 2))
+        aggregates = await service.get_aggregates(datetime(2024, 1, 1, 18, 0), datetime(2024, 1, 2))
+
+        assert [row.trading_date for row in rows] == [datetime(2024, 1, 2, 15, 30), datetime(2024, 1, 1, 15, 30)]
+        assert [row.deals for row in aggregates] == [1, 1]
+
+    async def test_time_of_bounds_does_not_change_result(self, db_session):
+        """Тест того, что время в границах периода не влияет на выбранные строки"""
+        await add_trading_results(db_session, days=3, per_day=2, start=datetime(2024, 1, 1, 10, 0))
+        service = TradingService(db_session)
+
+        midnight = await service.get_dynamics(datetime(2024, 1, 2), datetime(2024, 1, 3))
+        with_time = await service.get_dynamics(datetime(2024, 1, 2, 23, 59), datetime(2024, 1, 3, 0, 1))
+
+        assert [row.id for row in midnight] == [row.id for row in with_time] == [6, 5, 4, 3]
+
+
+class TestRowReads:
+    """Тесты чтения результатов строками Row без ORM-объектов"""
+
+    async def test_get_dynamics_returns_api_columns_only(self, db_session):
+        """Тест того, что динамика читается колонками TradingResult и не заполняет identity map"""
+        await add_trading_results(db_session, days=2, per_day=2)
+        db_session.expunge_all()
+
+        rows = await TradingService(db_session).get_dynamics(datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+        assert not isinstance(rows[0], SpimexTradingResult)
+        assert list(rows[0]._fields) == list(TradingResult.model_fields)
+        assert len(db_session.identity_map) == 0
+
+    async def test_trading_result_rows_feed_response_model(self, db_session):
+        """Тест того, что строки Row напрямую читаются моделью ответа"""
+        await add_trading_results(db_session, days=1, per_day=3)
+
+        rows = await TradingService(db_session).get_trading_result(limit=2)
+        response = TradingResultsResponse(result=rows, total=len(rows))
+
+        assert [item.id for item in response.result] == [rows[0].id, rows[1].id]
+        assert response.result[0].trading_date == datetime(2024, 1, 1)
+
+
+class TestStreaming:
+    """Тесты потокового чтения результатов серверным курсором"""
+
+    async def test_stream_dynamics_yields_all_rows_in_order(self, db_session):
+        """Тест того, что поток отдает те же записи, что и get_dynamics, не накапливая их в сессии"""
+        await add_trading_results(db_session, days=10, per_day=20)
+        service = TradingService(db_session)
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 10)
+        expected = [row.id for row in await service.get_dynamics(start, end)]
+        db_session.expunge_all()
+
+        streamed, max_identity_map = [], 0
+        with patch.object(settings, "STREAM_CHUNK_SIZE", 50):
+            async for row in service.stream_dynamics(start, end):
+                streamed.append(row.id)
+                max_identity_map = max(max_identity_map, len(db_session.identity_map))
+
+        assert streamed == expected
+        # Строки Row не попадают в identity map сессии
+        assert max_identity_map == 0
+
+    async def test_stream_trading_result_respects_limit(self, db_session):
+        """Тест того, что поток последних результатов учитывает limit"""
+        await add_trading_results(db_session, days=3, per_day=5)
+
+        rows = [row async for row in TradingService(db_session).stream_trading_result(limit=7)]
+
+        assert len(rows) == 7
+
+
+class TestLastTradingDates:
+    """Тесты источников списка последних торговых дат на реальной БД"""
+
+    @pytest.mark.parametrize("source", ["skip_scan", "distinct"])
+    async def test_sources_agree(self, source, db_session):
+        """Тест того, что skip-scan и DISTINCT возвращают одни и те же даты"""
+        await add_trading_results(db_session, days=10, per_day=3)
+
+        with patch.object(settings, "TRADING_DATES_SOURCE", source):
+            dates = await TradingService(db_session).get_last_trading_dates(4)
+
+        assert dates == [datetime(2024, 1, day) for day in (10, 9, 8, 7)]
+
+    async def test_skip_scan_shorter_history(self, db_session):
+        """Тест skip-scan, когда дат меньше лимита, и на пустой таблице"""
+        service = TradingService(db_session)
+        with patch.object(settings, "TRADING_DATES_SOURCE", "skip_scan"):
+            assert await service.get_last_trading_dates(5) == []
+            await add_trading_results(db_session, days=2, per_day=3)
+            assert await service.get_last_trading_dates(5) == [datetime(2024, 1, 2), datetime(2024, 1, 1)]
+
+    async def test_table_maintained_by_triggers(self, db_session):
+        """Тест справочника trading_days: заполнение при установке и поддержка триггерами"""
+        await add_trading_results(db_session, days=3, per_day=2)
+        assert await install(db_session.bind) == 3
+        service = TradingService(db_session)
+
+        await add_trading_results(db_session, days=1, per_day=2, start=datetime(2024, 2, 1))
+        await db_session.execute(
+            SpimexTradingResult.__table__.delete().where(SpimexTradingResult.trading_date == datetime(2024, 1, 3))
+        )
+        # Дата остается, пока за нее есть хотя бы одна строка
+        first = (await db_session.execute(
+            select(SpimexTradingResult.id).where(SpimexTradingResult.trading_date == datetime(2024, 1, 2)).limit(1)
+        )).scalar()
+        await db_session.execute(
+            SpimexTradingResult.__table__.delete().where(SpimexTradingResult.id == first)
+        )
+        await db_session.execute(
+            SpimexTradingResult.__table__.update()
+            .where(SpimexTradingResult.trading_date == datetime(2024, 1, 1))
+            .values(trading_date=datetime(2024, 1, 15))
+        )
+
+        with patch.object(settings, "TRADING_DATES_SOURCE", "table"):
+            dates = await service.get_last_trading_dates(10)
+
+        assert dates == [datetime(2024, 2, 1), datetime(2024, 1, 15), datetime(2024, 1, 2)]
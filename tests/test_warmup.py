@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.cache import AsyncRedisCache, LocalCache, TieredCache, POPULARITY_KEY, namespace_key
+from app.config import settings
+from app.cache_keys import dynamics_key, trading_dates_key, trading_results_key
+from app.services.trading import TradingService
+from app.warmup import CacheWarmer, dynamics_spec, format_spec, parse_spec, resolve_spec
+from tests.fake_redis import FakeAsyncRedis
+
+
+class FakeSession:
+    """Сессия-заглушка: запросы к БД подменяются патчами TradingService"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class TestWarmupSpecs:
+    """Тесты описаний запросов для прогрева"""
+
+    def test_format_spec_is_canonical(self):
+        """Тест того, что параметры сортируются, а None опускаются"""
+        spec = format_spec("results", oil_id=12, delivery_type_id=None, limit=100, delivery_basis_id=3)
+
+        assert spec == "results?delivery_basis_id=3&limit=100&oil_id=12"
+        assert parse_spec(spec) == ("results", {"delivery_basis_id": "3", "limit": "100", "oil_id": "12"})
+
+    def test_recent_dynamics_window_is_relative(self):
+        """Тест того, что окно до сегодняшнего дня запоминается как последние N дней"""
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+
+        assert dynamics_spec(today - timedelta(days=30), today, oil_id=1) == "dynamics?days=30&oil_id=1"
+        assert dynamics_spec(datetime(2024, 1, 1), datetime(2024, 1, 31)).startswith(
+            "dynamics?end_date=2024-01-31"
+        )
+
+    def test_resolve_spec_matches_handler_keys(self):
+        """Тест того, что прогрев заполняет те же ключи, что и эндпоинты"""
+        service = MagicMock()
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+
+        assert resolve_spec("dates?limit=5", service)[0] == trading_dates_key(5)
+        assert resolve_spec("results?limit=100&oil_id=12", service)[0] == trading_results_key(12, None, None, 100)
+        assert resolve_spec("dynamics?days=7", service)[0] == dynamics_key(today - timedelta(days=7), today)
+
+    def test_resolve_spec_unknown_endpoint(self):
+        """Тест ошибки для неизвестного эндпоинта"""
+        with pytest.raises(ValueError):
+            resolve_spec("unknown?limit=1", MagicMock())
+
+
+class TestCacheWarmer:
+    """Тесты прогрева кеша"""
+
+    async def test_warms_configured_and_learned_queries(self):
+        """Тест прогрева настроенных и популярных запросов"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(100, 100000))
+        cache.popularity["results?limit=50&oil_id=12"] += 3
+        await cache.flush_popularity()
+        warmer = CacheWarmer(cache, FakeSession)
+
+        with patch.object(settings, "WARMUP_QUERIES", "dates?limit=10"), \
+             patch.object(TradingService, "get_last_trading_dates", new_callable=AsyncMock, return_value=[]), \
+             patch.object(TradingService, "get_trading_result", new_callable=AsyncMock, return_value=[]) as results:
+            warmed = await warmer.run()
+
+        assert warmed == 2
+        results.assert_awaited_once_with(12, None, None, 50)
+        assert namespace_key(0, trading_dates_key(10)) in redis.data
+        assert namespace_key(0, trading_results_key(12, None, None, 50)) in redis.data
+
+    async def test_concurrency_is_bounded(self):
+        """Тест того, что одновременно выполняется не больше WARMUP_CONCURRENCY запросов"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(100, 100000))
+        warmer = CacheWarmer(cache, FakeSession)
+        running = 0
+        peak = 0
+
+        async def slow_dates(limit):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return []
+
+        specs = [f"dates?limit={limit}" for limit in range(1, 11)]
+        with patch.object(settings, "WARMUP_CONCURRENCY", 3), \
+             patch.object(TradingService, "get_last_trading_dates", side_effect=slow_dates):
+            warmed = await warmer.warm(specs)
+
+        assert warmed == 10
+        assert peak == 3
+
+    async def test_failed_query_does_not_stop_warmup(self):
+        """Тест того, что ошибка одного запроса не прерывает прогрев остальных"""
+        cache = TieredCache(AsyncRedisCache(redis_client=FakeAsyncRedis()), LocalCache(100, 100000))
+        warmer = CacheWarmer(cache, FakeSession)
+
+        with patch.object(TradingService, "get_last_trading_dates", new_callable=AsyncMock, return_value=[]):
+            warmed = await warmer.warm(["dates?limit=1", "unknown", "dynamics?start_date=bad"])
+
+        assert warmed == 1
+
+    async def test_popularity_recorded_on_requests(self):
+        """Тест учета популярности запросов и выгрузки счетчиков в Redis"""
+        redis = FakeAsyncRedis()
+        cache = TieredCache(AsyncRedisCache(redis_client=redis), LocalCache(100, 100000))
+        compute = AsyncMock(return_value='{"total": 0}')
+
+        for _ in range(3):
+            await cache.get_or_compute("trading_dates:5", compute, spec="dates?limit=5")
+        await cache.flush_popularity()
+
+        assert redis.data[POPULARITY_KEY] == {"dates?limit=5": 3}
+        assert not cache.popularity